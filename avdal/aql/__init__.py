@@ -1,68 +1,90 @@
 import re
+import hashlib
+import functools
 import operator
+import threading
 import json, sys
-from lark import Lark
-from lark import Transformer
+from collections import OrderedDict
 from datetime import datetime
-from lark.visitors import Discard
+from .nodes import And, Or, Not, Compare, Len, Null, In
+from .planner import optimize, cost, may_raise, AdaptiveChain
 
-parser = Lark(
-    """
+GRAMMAR = r"""
 start: exp
 
-exp: selector ATOMIC_OP atom                 -> exp_compare
-   | selector STRING_OP STRING               -> exp_compare
-   | len ATOMIC_OP NUMBER                    -> len_compare
+?exp: exp BIN_OP unary_exp                   -> exp_binop
+    | unary_exp
+
+?unary_exp: "!" unary_exp                    -> exp_not
+    | "(" exp ")"
+    | cmp_exp
+
+cmp_exp: selector atomic_op atom             -> exp_compare
+   | selector string_op STRING               -> exp_compare
+   | len atomic_op SIGNED_INT                -> len_compare
    | selector LIST_OP "[" atoms "]"          -> exp_compare
    | selector NULL_OP "null"                 -> exp_compare
-   | "(" exp ")"                             -> exp_group 
-   | exp BIN_OP exp                          -> exp_binop
-   | "!" exp                                 -> exp_not
 
-len: "len" "(" selector ")"
+len: LEN "(" selector ")"
 atom: SIGNED_INT | SIGNED_FLOAT | DATE
-atoms: ints | strings | floats 
+atoms: ints | strings | floats
 ints: SIGNED_INT                            -> list_head
-    | SIGNED_INT "," ints                   -> list_cons
+    | ints "," SIGNED_INT                   -> list_snoc
 strings: STRING                             -> list_head
-    | STRING "," strings                    -> list_cons
+    | strings "," STRING                    -> list_snoc
 floats: SIGNED_FLOAT                        -> list_head
-    | SIGNED_FLOAT "," floats               -> list_cons
-
-selector : ANY_KEY | dot_selector | dot_selector "." ANY_KEY
-dot_selector: key                               -> list_head
-    | key "." dot_selector                      -> list_cons
-key: CNAME | NON_EMPTY_STRING
-
-BIN_OP: "|" | "&"                                    
-ATOMIC_OP: "=" | "!=" | "<" | ">" | "<=" | ">="     
-STRING_OP: "=" | "!=" | "~" | "!~" | "~" | "*=" | "=*" | "%"   
-LIST_OP: "in" | "not_in"                    
-NULL_OP: "is" | "is_not"                                 
-STRING: /'[^']*'|"[^"]*"/ 
-NON_EMPTY_STRING: /'[^']+'/                                   
+    | floats "," SIGNED_FLOAT               -> list_snoc
+
+selector : ANY_KEY | path | path "." ANY_KEY
+path: key                                   -> list_head
+    | path "." key                          -> list_snoc
+key: CNAME | NON_EMPTY_STRING | LEN
+
+atomic_op: EQ | NE | LT | GT | LE | GE
+string_op: EQ | NE | IEQ | INE | PREFIX | SUFFIX | REGEX
+
+BIN_OP: "|" | "&"
+EQ: "="
+NE: "!="
+LT: "<"
+GT: ">"
+LE: "<="
+GE: ">="
+IEQ: "~"
+INE: "!~"
+PREFIX: "*="
+SUFFIX: "=*"
+REGEX: "%"
+LIST_OP: "not_in" | "in"
+NULL_OP: "is_not" | "is"
+STRING: /'[^']*'|"[^"]*"/
+NON_EMPTY_STRING: /'[^']+'/
 ANY_KEY: "*"
+LEN: "len"
 DATE.1: /\d{4}-\d{2}-\d{2}/
 
-%import common.NUMBER
 %import common.SIGNED_INT
 %import common.SIGNED_FLOAT
 %import common.WS
 %import common.CNAME
 %ignore WS
 """
-)
 
 
-class _visitor(Transformer):
-    def __init__(self, visit_tokens: bool = True) -> None:
-        super().__init__(visit_tokens)
+class _visitor:
+    """
+    Builds the expression nodes while the LALR parser reduces, instead of
+    building a parse tree and transforming it afterwards. Lists grow in place
+    as their left-recursive rules reduce, and `&`/`|` chains collect their
+    operands into one node, so both are built in linear time.
+    """
 
+    def __init__(self) -> None:
         def get_val(token):
             return token.value
 
         def get_typed_val(token):
-            if token.type in ["NUMBER", "SIGNED_INT"]:
+            if token.type == "SIGNED_INT":
                 return int(token.value)
             if token.type == "SIGNED_FLOAT":
                 return float(token.value)
@@ -73,7 +95,6 @@ class _visitor(Transformer):
 
             raise Exception(f"{token.type}: unknown token type")
 
-        self.NUMBER = get_typed_val
         self.SIGNED_INT = get_typed_val
         self.SIGNED_FLOAT = get_typed_val
         self.STRING = get_typed_val
@@ -82,14 +103,12 @@ class _visitor(Transformer):
 
         self.BIN_OP = get_val
         self.LIST_OP = get_val
-        self.ATOMIC_OP = get_val
-        self.STRING_OP = get_val
         self.NULL_OP = get_val
         self.CNAME = get_val
-        self.KEY = get_val
+        self.LEN = get_val
 
-    def WS(self, _):
-        return Discard
+        for op in ["EQ", "NE", "LT", "GT", "LE", "GE", "IEQ", "INE", "PREFIX", "SUFFIX", "REGEX"]:
+            setattr(self, op, get_val)
 
     def ANY_KEY(self, children):
         return ["*"]
@@ -106,8 +125,15 @@ class _visitor(Transformer):
     def list_head(self, children):
         return [children[0]]
 
-    def list_cons(self, children):
-        return [children[0]] + children[1]
+    def list_snoc(self, children):
+        children[0].append(children[1])
+        return children[0]
+
+    def atomic_op(self, children):
+        return children[0]
+
+    def string_op(self, children):
+        return children[0]
 
     def atom(self, children):
         return children[0]
@@ -116,57 +142,95 @@ class _visitor(Transformer):
         return children[0]
 
     def len(self, children):
-        return children[0]
+        return children[1]
 
     def len_compare(self, children):
-        return {
-            "selector": {
-                "key": children[0],
-                "type": "len",
-            },
-            "op": children[1],
-            "value": None if len(children) < 3 else children[2],
-        }
+        return Len(children[0], children[1], children[2])
 
     def exp_compare(self, children):
-        return {
-            "selector": {
-                "key": children[0],
-                "type": "plain",
-            },
-            "op": children[1],
-            "value": None if len(children) < 3 else children[2],
-        }
-
-    def exp_group(self, children):
-        return children[0]
+        key, op = children[0], children[1]
+
+        if op in ["is", "is_not"]:
+            return Null(key, op)
+        if op in ["in", "not_in"]:
+            return In(key, op, children[2])
+
+        return Compare(key, op, children[2])
 
     def exp_binop(self, children):
-        return {
-            "arg1": children[0],
-            "op": children[1],
-            "arg2": children[2],
-        }
+        arg1, op, arg2 = children
+        chain = And if op == "&" else Or
+
+        # the left operand was built by this parse alone, so it can grow in place
+        if type(arg1) is chain:
+            arg1.args.append(arg2)
+            return arg1
+
+        return chain([arg1, arg2])
 
     def exp_not(self, children):
-        return {
-            "op": "!",
-            "arg1": children[0],
-        }
+        return Not(children[0])
 
     def start(self, children):
         return children[0]
 
 
+_parser = None
+_parser_lock = threading.Lock()
+
+
+def _grammar_sha256():
+    return hashlib.sha256(GRAMMAR.encode()).hexdigest()
+
+
+def _build_parser(transformer=None):
+    from lark import Lark
+
+    return Lark(GRAMMAR, parser="lalr", transformer=transformer)
+
+
+def _load_parser():
+    """
+    Loads the LALR parser from the parse table serialized in `_parser_table`,
+    falling back to building it from the grammar when the table was generated
+    for another grammar or lark version.
+    """
+    import lark
+    from . import _parser_table as table
+
+    if table.GRAMMAR_SHA256 == _grammar_sha256() and table.LARK_VERSION == lark.__version__:
+        return lark.Lark._load_from_dict(table.DATA, table.MEMO, transformer=_visitor())
+
+    return _build_parser(_visitor())
+
+
+def get_parser():
+    global _parser
+
+    if _parser is None:
+        with _parser_lock:
+            if _parser is None:
+                _parser = _load_parser()
+
+    return _parser
+
+
+def __getattr__(name):
+    if name == "parser":
+        return get_parser()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def _eval_exp(obj, exp) -> bool:
-    op = exp["op"]
+    op = exp.op
 
     if op == "|":
-        return _eval_exp(obj, exp["arg1"]) or _eval_exp(obj, exp["arg2"])
+        return any(_eval_exp(obj, arg) for arg in exp.args)
     elif op == "&":
-        return _eval_exp(obj, exp["arg1"]) and _eval_exp(obj, exp["arg2"])
+        return all(_eval_exp(obj, arg) for arg in exp.args)
     elif op == "!":
-        return not _eval_exp(obj, exp["arg1"])
+        return not _eval_exp(obj, exp.arg)
 
     return _eval_cmp(obj, exp)
 
@@ -210,12 +274,10 @@ def compare(obj, stype, key, op, expected_value):
 
 
 def _eval_cmp(obj, exp) -> bool:
-    op = exp["op"]
-    expected_value = exp.get("value")
-
-    selector = exp.get("selector")
-    stype = selector["type"]
-    skey = selector["key"]
+    op = exp.op
+    expected_value = exp.value
+    stype = exp.stype
+    skey = list(exp.key)
     for key in skey[:-1]:
         if key not in obj or type(obj[key]) is not dict:
             return False
@@ -253,19 +315,330 @@ def _eval_cmp(obj, exp) -> bool:
     return compare(obj, stype, field, op, expected_value)
 
 
+def _cmp_iequal(b):
+    b = b.lower()
+    return lambda a: a.lower() == b
+
+
+def _cmp_inotequal(b):
+    b = b.lower()
+    return lambda a: a.lower() != b
+
+
+def _cmp_regex(b):
+    pattern = re.compile(b)
+    return lambda a: pattern.match(a) is not None
+
+
+_cmp_factories = {
+    "=": lambda b: lambda a: a == b,
+    "~": _cmp_iequal,
+    "!=": lambda b: lambda a: a != b,
+    "!~": _cmp_inotequal,
+    "*=": lambda b: lambda a: a.startswith(b),
+    "=*": lambda b: lambda a: a.endswith(b),
+    "%": _cmp_regex,
+    ">": lambda b: lambda a: a > b,
+    ">=": lambda b: lambda a: a >= b,
+    "<": lambda b: lambda a: a < b,
+    "<=": lambda b: lambda a: a <= b,
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_prefix(prefix):
+    try:
+        return datetime.strptime(prefix, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _parse_date(value):
+    """
+    Parses a record value as a date the way `compare` does, from the first
+    10 characters of a string. Returns None if it is not a date.
+    """
+    if type(value) is datetime:
+        return value
+    if not isinstance(value, str):
+        return None
+
+    return _parse_date_prefix(value[:10])
+
+
+def _match_all(obj) -> bool:
+    return True
+
+
+def _compile_value_check(stype, op, expected_value):
+    """Returns a predicate over a single field value, equivalent to `compare`."""
+    cmp = _cmp_factories[op](expected_value)
+    expected_type = type(expected_value)
+
+    if stype == "len":
+        def check_len(actual_value):
+            if actual_value is None or not hasattr(actual_value, "__len__"):
+                return False
+            actual_value = len(actual_value)
+            return type(actual_value) is expected_type and cmp(actual_value)
+
+        return check_len
+
+    if expected_type is datetime:
+        def check_date(actual_value):
+            actual_value = _parse_date(actual_value)
+            return actual_value is not None and cmp(actual_value)
+
+        return check_date
+
+    def check(actual_value):
+        return type(actual_value) is expected_type and cmp(actual_value)
+
+    return check
+
+
+def _compile_resolver(path):
+    """Returns a function that walks `path` down nested dicts, or None on a dead end."""
+    if not path:
+        return None
+
+    def resolve(obj):
+        for key in path:
+            obj = obj.get(key)
+            if type(obj) is not dict:
+                return None
+        return obj
+
+    return resolve
+
+
+def _compile_null(op, field, wildcard):
+    """Returns the leaf of an `is`/`is_not` null comparison."""
+    if op == "is":
+        if wildcard:
+            return lambda obj: None in obj.values()
+        return lambda obj: obj.get(field, None) is None
+
+    if wildcard:
+        return lambda obj: None not in obj.values()
+    return lambda obj: obj.get(field, None) is not None
+
+
+def _compile_in(op, field, wildcard, expected_value):
+    """Returns the leaf of an `in`/`not_in` list comparison."""
+    expected_values = frozenset(expected_value)
+
+    if wildcard:
+        def contains(obj):
+            return not expected_values.isdisjoint(set(obj.values()))
+    else:
+        def contains(obj):
+            if field not in obj:
+                return False
+            try:
+                return obj[field] in expected_values
+            except TypeError:
+                # unhashable values never equal a list constant
+                return False
+
+    if op == "in":
+        return contains
+
+    return lambda obj: not contains(obj)
+
+
+def _compile_value(exp, field, wildcard):
+    """Returns the leaf of a comparison with a single constant."""
+    check = _compile_value_check(exp.stype, exp.op, exp.value)
+
+    if wildcard:
+        def leaf(obj):
+            for value in obj.values():
+                if check(value):
+                    return True
+            return False
+    else:
+        def leaf(obj):
+            return check(obj.get(field))
+
+    return leaf
+
+
+def _compile_cmp(exp):
+    field = exp.key[-1]
+    wildcard = field == "*"
+
+    if exp.op in ["is", "is_not"]:
+        leaf = _compile_null(exp.op, field, wildcard)
+    elif isinstance(exp, In):
+        leaf = _compile_in(exp.op, field, wildcard, exp.value)
+    else:
+        leaf = _compile_value(exp, field, wildcard)
+
+    resolve = _compile_resolver(exp.key[:-1])
+    if resolve is None:
+        return leaf
+
+    def nested(obj):
+        obj = resolve(obj)
+        return obj is not None and leaf(obj)
+
+    return nested
+
+
+def _compile_chain(op, checks):
+    if len(checks) == 2:
+        arg1, arg2 = checks
+        if op == "|":
+            return lambda obj: arg1(obj) or arg2(obj)
+        return lambda obj: arg1(obj) and arg2(obj)
+
+    if op == "|":
+        def any_of(obj):
+            for check in checks:
+                if check(obj):
+                    return True
+            return False
+
+        return any_of
+
+    def all_of(obj):
+        for check in checks:
+            if not check(obj):
+                return False
+        return True
+
+    return all_of
+
+
+def _compile_exp(exp, warmup=0):
+    """
+    Compiles an expression produced by `_visitor`, or a plan produced by
+    `planner.optimize`, into a tree of closures. The selector path, operator
+    and typed constant of every comparison are bound once, so evaluating the
+    result is a single call per object. With `warmup`, every `&`/`|` chain
+    re-sorts its operands by the selectivity it observes on its first
+    `warmup` objects.
+    """
+    op = exp.op
+
+    if op in ["|", "&"]:
+        checks = [_compile_exp(arg, warmup) for arg in exp.args]
+
+        if warmup > 0:
+            return AdaptiveChain(op, checks, map(cost, exp.args), warmup, map(may_raise, exp.args))
+
+        return _compile_chain(op, checks)
+    elif op == "!":
+        arg1 = _compile_exp(exp.arg, warmup)
+        return lambda obj: not arg1(obj)
+
+    return _compile_cmp(exp)
+
+
+class _ParseCache:
+    """
+    A bounded, thread-safe LRU cache of parsed and compiled filters keyed by
+    the filter string. Entries are shared by every `Filter` built from the same
+    string, so they must never be mutated.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, filter_str):
+        with self.lock:
+            entry = self.entries.get(filter_str)
+            if entry is not None:
+                self.entries.move_to_end(filter_str)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        exp = get_parser().parse(filter_str)
+        entry = (exp, _compile_exp(optimize(exp)))
+
+        with self.lock:
+            self.entries[filter_str] = entry
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return entry
+
+    def resize(self, maxsize):
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+            }
+
+
+_parse_cache = _ParseCache()
+
+
+def parse_cache_info():
+    return _parse_cache.info()
+
+
+def parse_cache_clear():
+    _parse_cache.clear()
+
+
+def parse_cache_resize(maxsize):
+    _parse_cache.resize(maxsize)
+
+
 class Filter:
-    def __init__(self, filter_str):
+    def __init__(self, filter_str, warmup=0):
+        """
+        Parses `filter_str`. The operands of `&` and `|` are evaluated
+        cheapest first; with `warmup`, this filter also re-sorts them by the
+        selectivity it observes over its first `warmup` matches.
+        """
+        self.filter_str = filter_str
+
         if not filter_str:
             self.exp = None
+            self._match = _match_all
             return
-        tree = parser.parse(filter_str)
-        self.exp = _visitor(visit_tokens=True).transform(tree)
+        self.exp, self._match = _parse_cache.get(filter_str)
+
+        if warmup > 0:
+            self._match = _compile_exp(optimize(self.exp), warmup)
 
     def match(self, obj, debug=False) -> bool:
         if debug:
-            json.dump(self.exp, sys.stdout, indent=4, default=str)
+            json.dump(self.exp and self.exp.to_dict(), sys.stdout, indent=4, default=str)
+
+        return self._match(obj)
+
+    def mask(self, columns, size=None):
+        """
+        Matches columnar records, a dict of equally long lists or numpy arrays,
+        and returns a boolean numpy mask. Requires numpy.
+        """
+        from .vector import mask
+
+        return mask(self.exp, columns, size)
 
-        if self.exp is None:
-            return True
 
-        return _eval_exp(obj, self.exp)
+from .stream import filter_stream  # noqa: E402
+from .collection import Collection  # noqa: E402
@@ -0,0 +1,30 @@
+import sys
+import json
+import argparse
+from .stream import filter_stream, CHUNK_SIZE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m avdal.aql",
+                                     description="Print the records of a JSON Lines file that match an AQL filter.")
+    parser.add_argument("filter", help="AQL filter, e.g. \"status = 'active' & len(tags) > 0\"")
+    parser.add_argument("file", nargs="?", default="-", help="JSON Lines file, or - for stdin (default)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="match byte ranges of FILE in N processes")
+    parser.add_argument("-u", "--unordered", action="store_true", help="with --workers, print matches as shards finish")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="read size in bytes")
+    args = parser.parse_args(argv)
+
+    matches = filter_stream(args.filter, args.file,
+                            workers=args.workers,
+                            ordered=not args.unordered,
+                            chunk_size=args.chunk_size)
+
+    try:
+        for obj in matches:
+            sys.stdout.write(json.dumps(obj) + "\n")
+    except BrokenPipeError:
+        sys.stderr.close()
+
+
+if __name__ == "__main__":
+    main()
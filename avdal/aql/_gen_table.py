@@ -0,0 +1,37 @@
+import os
+import lark
+from pprint import pformat
+from lark.grammar import Rule
+from lark.lexer import TerminalDef
+from . import _build_parser, _grammar_sha256
+
+TABLE_FILE = os.path.join(os.path.dirname(__file__), "_parser_table.py")
+
+
+def _plain(obj):
+    """Strips lark's str subclasses (e.g. Token) so the table is a plain literal."""
+    if isinstance(obj, dict):
+        return {_plain(k): _plain(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_plain(v) for v in obj)
+    if isinstance(obj, str):
+        return str(obj)
+    return obj
+
+
+def render_table():
+    data, memo = map(_plain, _build_parser().memo_serialize([TerminalDef, Rule]))
+
+    return "\n".join([
+        "# Generated by `python -m avdal.aql._gen_table` from avdal.aql.GRAMMAR. Do not edit.",
+        f"LARK_VERSION = {lark.__version__!r}",
+        f"GRAMMAR_SHA256 = {_grammar_sha256()!r}",
+        f"DATA = {pformat(data, width=120)}",
+        f"MEMO = {pformat(memo, width=120)}",
+        "",
+    ])
+
+
+if __name__ == "__main__":
+    with open(TABLE_FILE, "w") as f:
+        f.write(render_table())
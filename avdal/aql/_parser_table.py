@@ -0,0 +1,1157 @@
+# Generated by `python -m avdal.aql._gen_table` from avdal.aql.GRAMMAR. Do not edit.
+LARK_VERSION = '1.1.8'
+GRAMMAR_SHA256 = '329f0edbfc0d18502b8924f3df37ad7099c4076c7ab90ab2c352527ba120744f'
+DATA = {'__type__': 'Lark',
+ 'options': {'_plugins': {},
+             'ambiguity': 'auto',
+             'cache': False,
+             'debug': False,
+             'edit_terminals': None,
+             'g_regex_flags': 0,
+             'import_paths': [],
+             'keep_all_tokens': False,
+             'lexer': 'contextual',
+             'lexer_callbacks': {},
+             'maybe_placeholders': True,
+             'ordered_sets': True,
+             'parser': 'lalr',
+             'postlex': None,
+             'priority': 'normal',
+             'propagate_positions': False,
+             'regex': False,
+             'source_path': None,
+             'start': ['start'],
+             'strict': False,
+             'transformer': None,
+             'tree_class': None,
+             'use_bytes': False},
+ 'parser': {'__type__': 'ParsingFrontend',
+            'lexer_conf': {'__type__': 'LexerConf',
+                           'g_regex_flags': 0,
+                           'ignore': ['WS'],
+                           'lexer_type': 'contextual',
+                           'terminals': [{'@': 0},
+                                         {'@': 1},
+                                         {'@': 2},
+                                         {'@': 3},
+                                         {'@': 4},
+                                         {'@': 5},
+                                         {'@': 6},
+                                         {'@': 7},
+                                         {'@': 8},
+                                         {'@': 9},
+                                         {'@': 10},
+                                         {'@': 11},
+                                         {'@': 12},
+                                         {'@': 13},
+                                         {'@': 14},
+                                         {'@': 15},
+                                         {'@': 16},
+                                         {'@': 17},
+                                         {'@': 18},
+                                         {'@': 19},
+                                         {'@': 20},
+                                         {'@': 21},
+                                         {'@': 22},
+                                         {'@': 23},
+                                         {'@': 24},
+                                         {'@': 25},
+                                         {'@': 26},
+                                         {'@': 27},
+                                         {'@': 28},
+                                         {'@': 29},
+                                         {'@': 30}],
+                           'use_bytes': False},
+            'parser': {'end_states': {'start': 61},
+                       'start_states': {'start': 34},
+                       'states': {0: {0: (0, 52), 1: (1, {'@': 31})},
+                                  1: {0: (1, {'@': 40}), 1: (1, {'@': 40}), 2: (1, {'@': 40})},
+                                  2: {3: (0, 56)},
+                                  3: {4: (1, {'@': 68}), 5: (1, {'@': 68}), 6: (1, {'@': 68})},
+                                  4: {2: (1, {'@': 56}),
+                                      7: (0, 22),
+                                      8: (1, {'@': 56}),
+                                      9: (1, {'@': 56}),
+                                      10: (1, {'@': 56}),
+                                      11: (1, {'@': 56}),
+                                      12: (1, {'@': 56}),
+                                      13: (1, {'@': 56}),
+                                      14: (1, {'@': 56}),
+                                      15: (1, {'@': 56}),
+                                      16: (1, {'@': 56}),
+                                      17: (1, {'@': 56}),
+                                      18: (1, {'@': 56}),
+                                      19: (1, {'@': 56}),
+                                      20: (1, {'@': 56})},
+                                  5: {21: (0, 30), 22: (1, {'@': 48})},
+                                  6: {2: (1, {'@': 57}),
+                                      8: (1, {'@': 57}),
+                                      9: (1, {'@': 57}),
+                                      10: (1, {'@': 57}),
+                                      11: (1, {'@': 57}),
+                                      12: (1, {'@': 57}),
+                                      13: (1, {'@': 57}),
+                                      14: (1, {'@': 57}),
+                                      15: (1, {'@': 57}),
+                                      16: (1, {'@': 57}),
+                                      17: (1, {'@': 57}),
+                                      18: (1, {'@': 57}),
+                                      19: (1, {'@': 57}),
+                                      20: (1, {'@': 57})},
+                                  7: {2: (1, {'@': 60}),
+                                      7: (1, {'@': 60}),
+                                      8: (1, {'@': 60}),
+                                      9: (1, {'@': 60}),
+                                      10: (1, {'@': 60}),
+                                      11: (1, {'@': 60}),
+                                      12: (1, {'@': 60}),
+                                      13: (1, {'@': 60}),
+                                      14: (1, {'@': 60}),
+                                      15: (1, {'@': 60}),
+                                      16: (1, {'@': 60}),
+                                      17: (1, {'@': 60}),
+                                      18: (1, {'@': 60}),
+                                      19: (1, {'@': 60}),
+                                      20: (1, {'@': 60})},
+                                  8: {4: (1, {'@': 67}), 5: (1, {'@': 67}), 6: (1, {'@': 67})},
+                                  9: {6: (1, {'@': 63})},
+                                  10: {4: (1, {'@': 65}), 5: (1, {'@': 65}), 6: (1, {'@': 65})},
+                                  11: {3: (1, {'@': 74})},
+                                  12: {0: (1, {'@': 39}), 1: (1, {'@': 39}), 2: (1, {'@': 39})},
+                                  13: {4: (0, 16), 5: (0, 44), 6: (0, 29), 23: (0, 41)},
+                                  14: {2: (0, 50)},
+                                  15: {0: (1, {'@': 38}), 1: (1, {'@': 38}), 2: (1, {'@': 38})},
+                                  16: {0: (1, {'@': 45}), 1: (1, {'@': 45}), 2: (1, {'@': 45})},
+                                  17: {7: (1, {'@': 62}),
+                                       8: (1, {'@': 62}),
+                                       9: (1, {'@': 62}),
+                                       10: (1, {'@': 62}),
+                                       11: (1, {'@': 62}),
+                                       12: (1, {'@': 62}),
+                                       13: (1, {'@': 62}),
+                                       14: (1, {'@': 62}),
+                                       15: (1, {'@': 62}),
+                                       16: (1, {'@': 62}),
+                                       17: (1, {'@': 62}),
+                                       18: (1, {'@': 62}),
+                                       19: (1, {'@': 62}),
+                                       20: (1, {'@': 62}),
+                                       24: (0, 51)},
+                                  18: {25: (0, 53)},
+                                  19: {21: (1, {'@': 50}), 22: (1, {'@': 50})},
+                                  20: {3: (1, {'@': 71})},
+                                  21: {2: (1, {'@': 59}),
+                                       7: (1, {'@': 59}),
+                                       8: (1, {'@': 59}),
+                                       9: (1, {'@': 59}),
+                                       10: (1, {'@': 59}),
+                                       11: (1, {'@': 59}),
+                                       12: (1, {'@': 59}),
+                                       13: (1, {'@': 59}),
+                                       14: (1, {'@': 59}),
+                                       15: (1, {'@': 59}),
+                                       16: (1, {'@': 59}),
+                                       17: (1, {'@': 59}),
+                                       18: (1, {'@': 59}),
+                                       19: (1, {'@': 59}),
+                                       20: (1, {'@': 59})},
+                                  22: {26: (0, 6), 27: (0, 57), 28: (0, 7), 29: (0, 45), 30: (0, 21)},
+                                  23: {0: (1, {'@': 32}), 1: (1, {'@': 32}), 2: (1, {'@': 32})},
+                                  24: {21: (1, {'@': 49}), 22: (1, {'@': 49})},
+                                  25: {21: (0, 60), 22: (1, {'@': 46})},
+                                  26: {2: (1, {'@': 55}),
+                                       8: (1, {'@': 55}),
+                                       9: (1, {'@': 55}),
+                                       10: (1, {'@': 55}),
+                                       11: (1, {'@': 55}),
+                                       12: (1, {'@': 55}),
+                                       13: (1, {'@': 55}),
+                                       14: (1, {'@': 55}),
+                                       15: (1, {'@': 55}),
+                                       16: (1, {'@': 55}),
+                                       17: (1, {'@': 55}),
+                                       18: (1, {'@': 55}),
+                                       19: (1, {'@': 55}),
+                                       20: (1, {'@': 55})},
+                                  27: {6: (1, {'@': 64})},
+                                  28: {21: (0, 2), 22: (1, {'@': 47})},
+                                  29: {0: (1, {'@': 43}), 1: (1, {'@': 43}), 2: (1, {'@': 43})},
+                                  30: {5: (0, 31)},
+                                  31: {21: (1, {'@': 54}), 22: (1, {'@': 54})},
+                                  32: {0: (1, {'@': 36}), 1: (1, {'@': 36}), 2: (1, {'@': 36})},
+                                  33: {2: (1, {'@': 58}),
+                                       7: (1, {'@': 58}),
+                                       8: (1, {'@': 58}),
+                                       9: (1, {'@': 58}),
+                                       10: (1, {'@': 58}),
+                                       11: (1, {'@': 58}),
+                                       12: (1, {'@': 58}),
+                                       13: (1, {'@': 58}),
+                                       14: (1, {'@': 58}),
+                                       15: (1, {'@': 58}),
+                                       16: (1, {'@': 58}),
+                                       17: (1, {'@': 58}),
+                                       18: (1, {'@': 58}),
+                                       19: (1, {'@': 58}),
+                                       20: (1, {'@': 58})},
+                                  34: {24: (0, 39),
+                                       26: (0, 26),
+                                       27: (0, 57),
+                                       28: (0, 7),
+                                       29: (0, 17),
+                                       30: (0, 33),
+                                       31: (0, 66),
+                                       32: (0, 65),
+                                       33: (0, 61),
+                                       34: (0, 32),
+                                       35: (0, 0),
+                                       36: (0, 4),
+                                       37: (0, 43),
+                                       38: (0, 35)},
+                                  35: {24: (0, 39),
+                                       26: (0, 26),
+                                       27: (0, 57),
+                                       28: (0, 7),
+                                       29: (0, 17),
+                                       30: (0, 33),
+                                       31: (0, 66),
+                                       32: (0, 65),
+                                       34: (0, 32),
+                                       36: (0, 4),
+                                       37: (0, 48),
+                                       38: (0, 35)},
+                                  36: {6: (0, 12)},
+                                  37: {3: (1, {'@': 69}), 4: (1, {'@': 63}), 5: (1, {'@': 63}), 6: (1, {'@': 63})},
+                                  38: {39: (0, 62)},
+                                  39: {24: (0, 39),
+                                       26: (0, 26),
+                                       27: (0, 57),
+                                       28: (0, 7),
+                                       29: (0, 17),
+                                       30: (0, 33),
+                                       31: (0, 66),
+                                       32: (0, 65),
+                                       34: (0, 32),
+                                       35: (0, 55),
+                                       36: (0, 4),
+                                       37: (0, 43),
+                                       38: (0, 35)},
+                                  40: {3: (1, {'@': 75})},
+                                  41: {0: (1, {'@': 37}), 1: (1, {'@': 37}), 2: (1, {'@': 37})},
+                                  42: {21: (1, {'@': 53}), 22: (1, {'@': 53})},
+                                  43: {0: (1, {'@': 33}), 1: (1, {'@': 33}), 2: (1, {'@': 33})},
+                                  44: {0: (1, {'@': 44}), 1: (1, {'@': 44}), 2: (1, {'@': 44})},
+                                  45: {2: (1, {'@': 62}),
+                                       7: (1, {'@': 62}),
+                                       8: (1, {'@': 62}),
+                                       9: (1, {'@': 62}),
+                                       10: (1, {'@': 62}),
+                                       11: (1, {'@': 62}),
+                                       12: (1, {'@': 62}),
+                                       13: (1, {'@': 62}),
+                                       14: (1, {'@': 62}),
+                                       15: (1, {'@': 62}),
+                                       16: (1, {'@': 62}),
+                                       17: (1, {'@': 62}),
+                                       18: (1, {'@': 62}),
+                                       19: (1, {'@': 62}),
+                                       20: (1, {'@': 62})},
+                                  46: {0: (1, {'@': 35}), 1: (1, {'@': 35}), 2: (1, {'@': 35})},
+                                  47: {4: (1, {'@': 66}), 5: (1, {'@': 66}), 6: (1, {'@': 66})},
+                                  48: {0: (1, {'@': 34}), 1: (1, {'@': 34}), 2: (1, {'@': 34})},
+                                  49: {3: (1, {'@': 73})},
+                                  50: {8: (1, {'@': 42}),
+                                       11: (1, {'@': 42}),
+                                       14: (1, {'@': 42}),
+                                       15: (1, {'@': 42}),
+                                       16: (1, {'@': 42}),
+                                       20: (1, {'@': 42})},
+                                  51: {26: (0, 26),
+                                       27: (0, 57),
+                                       28: (0, 7),
+                                       29: (0, 45),
+                                       30: (0, 33),
+                                       32: (0, 14),
+                                       36: (0, 4)},
+                                  52: {24: (0, 39),
+                                       26: (0, 26),
+                                       27: (0, 57),
+                                       28: (0, 7),
+                                       29: (0, 17),
+                                       30: (0, 33),
+                                       31: (0, 66),
+                                       32: (0, 65),
+                                       34: (0, 32),
+                                       36: (0, 4),
+                                       37: (0, 23),
+                                       38: (0, 35)},
+                                  53: {0: (1, {'@': 41}), 1: (1, {'@': 41}), 2: (1, {'@': 41})},
+                                  54: {21: (1, {'@': 51}), 22: (1, {'@': 51})},
+                                  55: {0: (0, 52), 2: (0, 46)},
+                                  56: {21: (1, {'@': 52}), 22: (1, {'@': 52})},
+                                  57: {2: (1, {'@': 61}),
+                                       7: (1, {'@': 61}),
+                                       8: (1, {'@': 61}),
+                                       9: (1, {'@': 61}),
+                                       10: (1, {'@': 61}),
+                                       11: (1, {'@': 61}),
+                                       12: (1, {'@': 61}),
+                                       13: (1, {'@': 61}),
+                                       14: (1, {'@': 61}),
+                                       15: (1, {'@': 61}),
+                                       16: (1, {'@': 61}),
+                                       17: (1, {'@': 61}),
+                                       18: (1, {'@': 61}),
+                                       19: (1, {'@': 61}),
+                                       20: (1, {'@': 61})},
+                                  58: {3: (0, 15)},
+                                  59: {3: (1, {'@': 72})},
+                                  60: {6: (0, 19)},
+                                  61: {},
+                                  62: {3: (0, 54),
+                                       5: (0, 42),
+                                       6: (0, 24),
+                                       40: (0, 5),
+                                       41: (0, 25),
+                                       42: (0, 63),
+                                       43: (0, 28)},
+                                  63: {22: (0, 1)},
+                                  64: {3: (1, {'@': 70}), 4: (1, {'@': 64}), 5: (1, {'@': 64}), 6: (1, {'@': 64})},
+                                  65: {8: (0, 3),
+                                       9: (0, 18),
+                                       10: (0, 38),
+                                       11: (0, 47),
+                                       12: (0, 20),
+                                       13: (0, 40),
+                                       14: (0, 10),
+                                       15: (0, 37),
+                                       16: (0, 8),
+                                       17: (0, 11),
+                                       18: (0, 49),
+                                       19: (0, 59),
+                                       20: (0, 64),
+                                       44: (0, 58),
+                                       45: (0, 13)},
+                                  66: {8: (0, 3),
+                                       11: (0, 47),
+                                       14: (0, 10),
+                                       15: (0, 9),
+                                       16: (0, 8),
+                                       20: (0, 27),
+                                       45: (0, 36)}},
+                       'tokens': {0: 'BIN_OP',
+                                  1: '$END',
+                                  2: 'RPAR',
+                                  3: 'STRING',
+                                  4: 'DATE',
+                                  5: 'SIGNED_FLOAT',
+                                  6: 'SIGNED_INT',
+                                  7: 'DOT',
+                                  8: 'GE',
+                                  9: 'NULL_OP',
+                                  10: 'LIST_OP',
+                                  11: 'GT',
+                                  12: 'IEQ',
+                                  13: 'REGEX',
+                                  14: 'LT',
+                                  15: 'EQ',
+                                  16: 'LE',
+                                  17: 'SUFFIX',
+                                  18: 'PREFIX',
+                                  19: 'INE',
+                                  20: 'NE',
+                                  21: 'COMMA',
+                                  22: 'RSQB',
+                                  23: 'atom',
+                                  24: 'LPAR',
+                                  25: 'NULL',
+                                  26: 'ANY_KEY',
+                                  27: 'NON_EMPTY_STRING',
+                                  28: 'CNAME',
+                                  29: 'LEN',
+                                  30: 'key',
+                                  31: 'len',
+                                  32: 'selector',
+                                  33: 'start',
+                                  34: 'cmp_exp',
+                                  35: 'exp',
+                                  36: 'path',
+                                  37: 'unary_exp',
+                                  38: 'BANG',
+                                  39: 'LSQB',
+                                  40: 'floats',
+                                  41: 'ints',
+                                  42: 'atoms',
+                                  43: 'strings',
+                                  44: 'string_op',
+                                  45: 'atomic_op'}},
+            'parser_conf': {'__type__': 'ParserConf',
+                            'parser_type': 'lalr',
+                            'rules': [{'@': 31},
+                                      {'@': 32},
+                                      {'@': 33},
+                                      {'@': 34},
+                                      {'@': 35},
+                                      {'@': 36},
+                                      {'@': 37},
+                                      {'@': 38},
+                                      {'@': 39},
+                                      {'@': 40},
+                                      {'@': 41},
+                                      {'@': 42},
+                                      {'@': 43},
+                                      {'@': 44},
+                                      {'@': 45},
+                                      {'@': 46},
+                                      {'@': 47},
+                                      {'@': 48},
+                                      {'@': 49},
+                                      {'@': 50},
+                                      {'@': 51},
+                                      {'@': 52},
+                                      {'@': 53},
+                                      {'@': 54},
+                                      {'@': 55},
+                                      {'@': 56},
+                                      {'@': 57},
+                                      {'@': 58},
+                                      {'@': 59},
+                                      {'@': 60},
+                                      {'@': 61},
+                                      {'@': 62},
+                                      {'@': 63},
+                                      {'@': 64},
+                                      {'@': 65},
+                                      {'@': 66},
+                                      {'@': 67},
+                                      {'@': 68},
+                                      {'@': 69},
+                                      {'@': 70},
+                                      {'@': 71},
+                                      {'@': 72},
+                                      {'@': 73},
+                                      {'@': 74},
+                                      {'@': 75}],
+                            'start': ['start']}},
+ 'rules': [{'@': 31},
+           {'@': 32},
+           {'@': 33},
+           {'@': 34},
+           {'@': 35},
+           {'@': 36},
+           {'@': 37},
+           {'@': 38},
+           {'@': 39},
+           {'@': 40},
+           {'@': 41},
+           {'@': 42},
+           {'@': 43},
+           {'@': 44},
+           {'@': 45},
+           {'@': 46},
+           {'@': 47},
+           {'@': 48},
+           {'@': 49},
+           {'@': 50},
+           {'@': 51},
+           {'@': 52},
+           {'@': 53},
+           {'@': 54},
+           {'@': 55},
+           {'@': 56},
+           {'@': 57},
+           {'@': 58},
+           {'@': 59},
+           {'@': 60},
+           {'@': 61},
+           {'@': 62},
+           {'@': 63},
+           {'@': 64},
+           {'@': 65},
+           {'@': 66},
+           {'@': 67},
+           {'@': 68},
+           {'@': 69},
+           {'@': 70},
+           {'@': 71},
+           {'@': 72},
+           {'@': 73},
+           {'@': 74},
+           {'@': 75}]}
+MEMO = {0: {'__type__': 'TerminalDef',
+     'name': 'SIGNED_INT',
+     'pattern': {'__type__': 'PatternRE',
+                 '_width': [1, 18446744073709551616],
+                 'flags': [],
+                 'raw': None,
+                 'value': '(?:(?:\\+|\\-))?(?:[0-9])+'},
+     'priority': 0},
+ 1: {'__type__': 'TerminalDef',
+     'name': 'SIGNED_FLOAT',
+     'pattern': {'__type__': 'PatternRE',
+                 '_width': [2, 18446744073709551616],
+                 'flags': [],
+                 'raw': None,
+                 'value': '(?:(?:\\+|\\-))?(?:(?:[0-9])+(?:e|E)(?:(?:\\+|\\-))?(?:[0-9])+|(?:(?:[0-9])+\\.(?:(?:[0-9])+)?|\\.(?:[0-9])+)(?:(?:e|E)(?:(?:\\+|\\-))?(?:[0-9])+)?)'},
+     'priority': 0},
+ 2: {'__type__': 'TerminalDef',
+     'name': 'CNAME',
+     'pattern': {'__type__': 'PatternRE',
+                 '_width': [1, 18446744073709551616],
+                 'flags': [],
+                 'raw': None,
+                 'value': '(?:(?:[A-Z]|[a-z])|_)(?:(?:(?:[A-Z]|[a-z])|[0-9]|_))*'},
+     'priority': 0},
+ 3: {'__type__': 'TerminalDef',
+     'name': 'WS',
+     'pattern': {'__type__': 'PatternRE',
+                 '_width': [1, 18446744073709551616],
+                 'flags': [],
+                 'raw': None,
+                 'value': '(?:[ \t\x0c\r\n])+'},
+     'priority': 0},
+ 4: {'__type__': 'TerminalDef',
+     'name': 'BIN_OP',
+     'pattern': {'__type__': 'PatternRE', '_width': [1, 1], 'flags': [], 'raw': None, 'value': '(?:\\||\\&)'},
+     'priority': 0},
+ 5: {'__type__': 'TerminalDef',
+     'name': 'EQ',
+     'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"="', 'value': '='},
+     'priority': 0},
+ 6: {'__type__': 'TerminalDef',
+     'name': 'NE',
+     'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"!="', 'value': '!='},
+     'priority': 0},
+ 7: {'__type__': 'TerminalDef',
+     'name': 'LT',
+     'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"<"', 'value': '<'},
+     'priority': 0},
+ 8: {'__type__': 'TerminalDef',
+     'name': 'GT',
+     'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '">"', 'value': '>'},
+     'priority': 0},
+ 9: {'__type__': 'TerminalDef',
+     'name': 'LE',
+     'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"<="', 'value': '<='},
+     'priority': 0},
+ 10: {'__type__': 'TerminalDef',
+      'name': 'GE',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '">="', 'value': '>='},
+      'priority': 0},
+ 11: {'__type__': 'TerminalDef',
+      'name': 'IEQ',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"~"', 'value': '~'},
+      'priority': 0},
+ 12: {'__type__': 'TerminalDef',
+      'name': 'INE',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"!~"', 'value': '!~'},
+      'priority': 0},
+ 13: {'__type__': 'TerminalDef',
+      'name': 'PREFIX',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"*="', 'value': '*='},
+      'priority': 0},
+ 14: {'__type__': 'TerminalDef',
+      'name': 'SUFFIX',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"=*"', 'value': '=*'},
+      'priority': 0},
+ 15: {'__type__': 'TerminalDef',
+      'name': 'REGEX',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"%"', 'value': '%'},
+      'priority': 0},
+ 16: {'__type__': 'TerminalDef',
+      'name': 'LIST_OP',
+      'pattern': {'__type__': 'PatternRE', '_width': [2, 6], 'flags': [], 'raw': None, 'value': '(?:not_in|in)'},
+      'priority': 0},
+ 17: {'__type__': 'TerminalDef',
+      'name': 'NULL_OP',
+      'pattern': {'__type__': 'PatternRE', '_width': [2, 6], 'flags': [], 'raw': None, 'value': '(?:is_not|is)'},
+      'priority': 0},
+ 18: {'__type__': 'TerminalDef',
+      'name': 'STRING',
+      'pattern': {'__type__': 'PatternRE',
+                  '_width': [2, 18446744073709551616],
+                  'flags': [],
+                  'raw': '/\'[^\']*\'|"[^"]*"/',
+                  'value': '\'[^\']*\'|"[^"]*"'},
+      'priority': 0},
+ 19: {'__type__': 'TerminalDef',
+      'name': 'NON_EMPTY_STRING',
+      'pattern': {'__type__': 'PatternRE',
+                  '_width': [3, 18446744073709551616],
+                  'flags': [],
+                  'raw': "/'[^']+'/",
+                  'value': "'[^']+'"},
+      'priority': 0},
+ 20: {'__type__': 'TerminalDef',
+      'name': 'ANY_KEY',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"*"', 'value': '*'},
+      'priority': 0},
+ 21: {'__type__': 'TerminalDef',
+      'name': 'LEN',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"len"', 'value': 'len'},
+      'priority': 0},
+ 22: {'__type__': 'TerminalDef',
+      'name': 'DATE',
+      'pattern': {'__type__': 'PatternRE',
+                  '_width': [10, 10],
+                  'flags': [],
+                  'raw': '/\\d{4}-\\d{2}-\\d{2}/',
+                  'value': '\\d{4}-\\d{2}-\\d{2}'},
+      'priority': 1},
+ 23: {'__type__': 'TerminalDef',
+      'name': 'BANG',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"!"', 'value': '!'},
+      'priority': 0},
+ 24: {'__type__': 'TerminalDef',
+      'name': 'LPAR',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"("', 'value': '('},
+      'priority': 0},
+ 25: {'__type__': 'TerminalDef',
+      'name': 'RPAR',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '")"', 'value': ')'},
+      'priority': 0},
+ 26: {'__type__': 'TerminalDef',
+      'name': 'LSQB',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"["', 'value': '['},
+      'priority': 0},
+ 27: {'__type__': 'TerminalDef',
+      'name': 'RSQB',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"]"', 'value': ']'},
+      'priority': 0},
+ 28: {'__type__': 'TerminalDef',
+      'name': 'NULL',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"null"', 'value': 'null'},
+      'priority': 0},
+ 29: {'__type__': 'TerminalDef',
+      'name': 'COMMA',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '","', 'value': ','},
+      'priority': 0},
+ 30: {'__type__': 'TerminalDef',
+      'name': 'DOT',
+      'pattern': {'__type__': 'PatternStr', 'flags': [], 'raw': '"."', 'value': '.'},
+      'priority': 0},
+ 31: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'exp'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'start'}},
+ 32: {'__type__': 'Rule',
+      'alias': 'exp_binop',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'exp'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'BIN_OP'},
+                    {'__type__': 'NonTerminal', 'name': 'unary_exp'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': True,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'exp'}},
+ 33: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'unary_exp'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': True,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'exp'}},
+ 34: {'__type__': 'Rule',
+      'alias': 'exp_not',
+      'expansion': [{'__type__': 'Terminal', 'filter_out': True, 'name': 'BANG'},
+                    {'__type__': 'NonTerminal', 'name': 'unary_exp'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': True,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'unary_exp'}},
+ 35: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': True, 'name': 'LPAR'},
+                    {'__type__': 'NonTerminal', 'name': 'exp'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'RPAR'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': True,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'unary_exp'}},
+ 36: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'cmp_exp'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': True,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'unary_exp'}},
+ 37: {'__type__': 'Rule',
+      'alias': 'exp_compare',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'selector'},
+                    {'__type__': 'NonTerminal', 'name': 'atomic_op'},
+                    {'__type__': 'NonTerminal', 'name': 'atom'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'cmp_exp'}},
+ 38: {'__type__': 'Rule',
+      'alias': 'exp_compare',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'selector'},
+                    {'__type__': 'NonTerminal', 'name': 'string_op'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'STRING'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'cmp_exp'}},
+ 39: {'__type__': 'Rule',
+      'alias': 'len_compare',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'len'},
+                    {'__type__': 'NonTerminal', 'name': 'atomic_op'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_INT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'cmp_exp'}},
+ 40: {'__type__': 'Rule',
+      'alias': 'exp_compare',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'selector'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'LIST_OP'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'LSQB'},
+                    {'__type__': 'NonTerminal', 'name': 'atoms'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'RSQB'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 3,
+      'origin': {'__type__': 'NonTerminal', 'name': 'cmp_exp'}},
+ 41: {'__type__': 'Rule',
+      'alias': 'exp_compare',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'selector'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'NULL_OP'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'NULL'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 4,
+      'origin': {'__type__': 'NonTerminal', 'name': 'cmp_exp'}},
+ 42: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'LEN'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'LPAR'},
+                    {'__type__': 'NonTerminal', 'name': 'selector'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'RPAR'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'len'}},
+ 43: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_INT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atom'}},
+ 44: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_FLOAT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atom'}},
+ 45: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'DATE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atom'}},
+ 46: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'ints'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atoms'}},
+ 47: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'strings'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atoms'}},
+ 48: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'floats'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atoms'}},
+ 49: {'__type__': 'Rule',
+      'alias': 'list_head',
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_INT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'ints'}},
+ 50: {'__type__': 'Rule',
+      'alias': 'list_snoc',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'ints'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'COMMA'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_INT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'ints'}},
+ 51: {'__type__': 'Rule',
+      'alias': 'list_head',
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'STRING'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'strings'}},
+ 52: {'__type__': 'Rule',
+      'alias': 'list_snoc',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'strings'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'COMMA'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'STRING'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'strings'}},
+ 53: {'__type__': 'Rule',
+      'alias': 'list_head',
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_FLOAT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'floats'}},
+ 54: {'__type__': 'Rule',
+      'alias': 'list_snoc',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'floats'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'COMMA'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'SIGNED_FLOAT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'floats'}},
+ 55: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'ANY_KEY'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'selector'}},
+ 56: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'path'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'selector'}},
+ 57: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'path'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'DOT'},
+                    {'__type__': 'Terminal', 'filter_out': False, 'name': 'ANY_KEY'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'selector'}},
+ 58: {'__type__': 'Rule',
+      'alias': 'list_head',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'key'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'path'}},
+ 59: {'__type__': 'Rule',
+      'alias': 'list_snoc',
+      'expansion': [{'__type__': 'NonTerminal', 'name': 'path'},
+                    {'__type__': 'Terminal', 'filter_out': True, 'name': 'DOT'},
+                    {'__type__': 'NonTerminal', 'name': 'key'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'path'}},
+ 60: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'CNAME'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'key'}},
+ 61: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'NON_EMPTY_STRING'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'key'}},
+ 62: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'LEN'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'key'}},
+ 63: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'EQ'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 64: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'NE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 65: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'LT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 66: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'GT'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 3,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 67: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'LE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 4,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 68: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'GE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 5,
+      'origin': {'__type__': 'NonTerminal', 'name': 'atomic_op'}},
+ 69: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'EQ'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 0,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 70: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'NE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 1,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 71: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'IEQ'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 2,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 72: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'INE'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 3,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 73: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'PREFIX'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 4,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 74: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'SUFFIX'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 5,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}},
+ 75: {'__type__': 'Rule',
+      'alias': None,
+      'expansion': [{'__type__': 'Terminal', 'filter_out': False, 'name': 'REGEX'}],
+      'options': {'__type__': 'RuleOptions',
+                  'empty_indices': (),
+                  'expand1': False,
+                  'keep_all_tokens': False,
+                  'priority': None,
+                  'template_source': None},
+      'order': 6,
+      'origin': {'__type__': 'NonTerminal', 'name': 'string_op'}}}
@@ -0,0 +1,250 @@
+import bisect
+import threading
+from datetime import datetime
+from . import Filter, _parse_date
+from .planner import flatten
+
+_range_ops = {"=", "<", "<=", ">", ">="}
+
+
+def _resolve(obj, path):
+    for key in path[:-1]:
+        obj = obj.get(key)
+        if type(obj) is not dict:
+            return None
+
+    return obj.get(path[-1])
+
+
+class HashIndex:
+    """Maps field values to record ids; answers `=` and `in`."""
+
+    def __init__(self):
+        self.buckets = {}
+
+    def add(self, id, value):
+        try:
+            self.buckets.setdefault(value, set()).add(id)
+        except TypeError:
+            # unhashable values never equal a filter constant
+            pass
+
+    def remove(self, id, value):
+        try:
+            bucket = self.buckets.get(value)
+        except TypeError:
+            return
+
+        if bucket is not None:
+            bucket.discard(id)
+            if not bucket:
+                del self.buckets[value]
+
+    def lookup(self, stype, op, value):
+        if stype != "plain" or type(value) is datetime:
+            return None
+
+        if op == "=":
+            buckets = [self.buckets.get(value, ())]
+        elif op == "in":
+            buckets = [self.buckets.get(v, ()) for v in value]
+        else:
+            return None
+
+        return sum(map(len, buckets)), lambda: set().union(*buckets)
+
+
+class SortedIndex:
+    """
+    Keeps (value, id) pairs sorted per value type; answers `=`, `<`, `<=`,
+    `>` and `>=` on numbers and dates. Strings that parse as dates are also
+    indexed as dates, like the filter compares them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def keys(self, value):
+        if type(value) in [int, float, str] and value == value:
+            yield type(value), value
+
+        date = _parse_date(value)
+        if date is not None and date.tzinfo is None:
+            yield datetime, date
+
+    def add(self, id, value):
+        for group, key in self.keys(value):
+            bisect.insort(self.entries.setdefault(group, []), (key, id))
+
+    def remove(self, id, value):
+        for group, key in self.keys(value):
+            entries = self.entries[group]
+            i = bisect.bisect_left(entries, (key, id))
+            if i < len(entries) and entries[i] == (key, id):
+                del entries[i]
+
+    def lookup(self, stype, op, value):
+        if stype != "plain" or op not in _range_ops:
+            return None
+
+        return self.range(type(value), op, value)
+
+    def range(self, group, op, value):
+        entries = self.entries.get(group, [])
+        lo, hi = 0, len(entries)
+
+        if op in ["=", ">="]:
+            lo = bisect.bisect_left(entries, (value,))
+        elif op == ">":
+            lo = bisect.bisect_right(entries, (value, float("inf")))
+
+        if op in ["=", "<="]:
+            hi = bisect.bisect_right(entries, (value, float("inf")))
+        elif op == "<":
+            hi = bisect.bisect_left(entries, (value,))
+
+        return max(hi - lo, 0), lambda: {id for _, id in entries[lo:hi]}
+
+
+class LenIndex(SortedIndex):
+    """Keeps the lengths of field values sorted; answers `len()` comparisons."""
+
+    def keys(self, value):
+        if hasattr(value, "__len__"):
+            yield int, len(value)
+
+    def lookup(self, stype, op, value):
+        if stype != "len" or op not in _range_ops:
+            return None
+
+        return self.range(int, op, value)
+
+
+_index_types = {
+    "hash": HashIndex,
+    "sorted": SortedIndex,
+    "len": LenIndex,
+}
+
+
+class Collection:
+    """
+    An in-memory collection of dict records with optional indexes on selector
+    paths such as "a.b.c". `query` looks up the comparisons an index covers,
+    narrowing `&` to its most selective operand and taking the union for `|`,
+    and matches only those candidates against the whole filter; it scans
+    everything when no index applies. Records must be changed through `update`, which keeps the
+    indexes current.
+    """
+
+    def __init__(self, records=()):
+        self.records = {}
+        self.indexes = {}
+        self.next_id = 0
+        self.lock = threading.RLock()
+
+        for record in records:
+            self.insert(record)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(list(self.records.values()))
+
+    def get(self, id):
+        return self.records.get(id)
+
+    def add_index(self, path, kind="hash"):
+        """Indexes the records by the value at `path`; `kind` is one of hash, sorted or len."""
+        if kind not in _index_types:
+            raise ValueError(f"{kind}: unknown index kind, expected one of {list(_index_types)}")
+
+        path = tuple(path.split(".") if isinstance(path, str) else path)
+
+        with self.lock:
+            if (path, kind) in self.indexes:
+                return
+
+            index = _index_types[kind]()
+            for id, record in self.records.items():
+                value = _resolve(record, path)
+                if value is not None:
+                    index.add(id, value)
+
+            self.indexes[(path, kind)] = index
+
+    def _index(self, id, record, add):
+        for (path, _), index in self.indexes.items():
+            value = _resolve(record, path)
+            if value is not None:
+                (index.add if add else index.remove)(id, value)
+
+    def insert(self, record) -> int:
+        with self.lock:
+            id = self.next_id
+            self.next_id += 1
+            self.records[id] = record
+            self._index(id, record, True)
+
+            return id
+
+    def update(self, id, record):
+        with self.lock:
+            if id not in self.records:
+                raise KeyError(id)
+
+            self._index(id, self.records[id], False)
+            self.records[id] = record
+            self._index(id, record, True)
+
+    def delete(self, id):
+        with self.lock:
+            record = self.records.pop(id)
+            self._index(id, record, False)
+
+    def _candidates(self, exp):
+        """
+        Returns (count, fetch) where fetch() returns a superset of the ids
+        matching `exp` of about `count` ids, or None if no index covers it.
+        Every candidate is matched against the whole filter anyway, so an `&`
+        only fetches the ids of its most selective covered operand.
+        """
+        op = exp.op
+
+        if op == "&":
+            covered = [c for c in map(self._candidates, exp.args) if c is not None]
+            return min(covered, key=lambda c: c[0], default=None)
+        elif op == "|":
+            covered = list(map(self._candidates, exp.args))
+            if any(c is None for c in covered):
+                return None
+            return sum(c[0] for c in covered), lambda: set().union(*(fetch() for _, fetch in covered))
+        elif op == "!":
+            return None
+
+        for (index_path, _), index in self.indexes.items():
+            if index_path == exp.key:
+                candidates = index.lookup(exp.stype, op, exp.value)
+                if candidates is not None:
+                    return candidates
+
+        return None
+
+    def query(self, filter, ids=False) -> list:
+        """
+        Returns the records matching `filter`, a `Filter` or a filter string,
+        in insertion order, or their ids if `ids` is set.
+        """
+        f = filter if isinstance(filter, Filter) else Filter(filter)
+
+        with self.lock:
+            candidates = self._candidates(flatten(f.exp)) if f.exp is not None else None
+            candidates = self.records.keys() if candidates is None else candidates[1]()
+
+            matches = sorted(id for id in candidates if f.match(self.records[id]))
+
+            if ids:
+                return matches
+
+            return [self.records[id] for id in matches]
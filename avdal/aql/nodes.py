@@ -0,0 +1,109 @@
+class Node:
+    """
+    Base class of the expression nodes `_visitor` builds. Nodes are shared by
+    every `Filter` parsed from the same string, so they must never be mutated
+    once parsed; `to_dict` returns the nested dict form for debugging.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Chain(Node):
+    """An `&` or `|` of two or more operands, evaluated left to right."""
+
+    __slots__ = ("args",)
+    op = None
+
+    def __init__(self, args):
+        self.args = list(args)
+
+    def to_dict(self):
+        # chains are left-associative, so fold them back into nested pairs
+        d = self.args[0].to_dict()
+        for arg in self.args[1:]:
+            d = {"arg1": d, "op": self.op, "arg2": arg.to_dict()}
+
+        return d
+
+
+class And(Chain):
+    __slots__ = ()
+    op = "&"
+
+
+class Or(Chain):
+    __slots__ = ()
+    op = "|"
+
+
+class Not(Node):
+    __slots__ = ("arg",)
+    op = "!"
+
+    def __init__(self, arg):
+        self.arg = arg
+
+    def to_dict(self):
+        return {"op": "!", "arg1": self.arg.to_dict()}
+
+
+class Leaf(Node):
+    """
+    A comparison of the value at selector `key`, a tuple of keys whose last
+    one may be "*", against a typed constant `value`.
+    """
+
+    __slots__ = ("key", "op", "value")
+    stype = "plain"
+
+    def __init__(self, key, op, value=None):
+        self.key = tuple(key)
+        self.op = op
+        self.value = value
+
+    def to_dict(self):
+        return {
+            "selector": {
+                "key": list(self.key),
+                "type": self.stype,
+            },
+            "op": self.op,
+            "value": self.value,
+        }
+
+
+class Compare(Leaf):
+    """`=`, `!=`, `<`, `<=`, `>`, `>=`, `~`, `!~`, `*=`, `=*` and `%`."""
+
+    __slots__ = ()
+
+
+class Len(Leaf):
+    """A comparison of the length of the value at `key`."""
+
+    __slots__ = ()
+    stype = "len"
+
+
+class Null(Leaf):
+    """`is null` and `is_not null`."""
+
+    __slots__ = ()
+
+
+class In(Leaf):
+    """`in` and `not_in`; `value` is a tuple."""
+
+    __slots__ = ()
+
+    def __init__(self, key, op, value):
+        super().__init__(key, op, tuple(value))
+
+    def to_dict(self):
+        return dict(super().to_dict(), value=list(self.value))
@@ -0,0 +1,174 @@
+from datetime import datetime
+from .nodes import Chain, Not
+
+_op_costs = {
+    "is": 1,
+    "is_not": 1,
+    "=": 2,
+    "!=": 2,
+    ">": 2,
+    ">=": 2,
+    "<": 2,
+    "<=": 2,
+    "in": 3,
+    "not_in": 3,
+    "~": 4,
+    "!~": 4,
+    "*=": 4,
+    "=*": 4,
+    "%": 16,
+}
+
+
+def cost(exp) -> float:
+    """
+    Estimates the relative cost of evaluating `exp` on one object: null and
+    equality checks are cheapest, then `in`, string operators and dates, and
+    regex matches are the most expensive. Nested and wildcard selectors make
+    a comparison more expensive.
+    """
+    if isinstance(exp, Chain):
+        return sum(cost(arg) for arg in exp.args)
+    elif isinstance(exp, Not):
+        return cost(exp.arg)
+
+    skey = exp.key
+    c = _op_costs[exp.op]
+
+    if exp.stype == "len":
+        c += 1
+    elif type(exp.value) is datetime:
+        c += 2
+
+    c += len(skey) - 1
+    if skey[-1] == "*":
+        c *= 4
+
+    return c
+
+
+def may_raise(exp) -> bool:
+    """
+    Tells whether evaluating `exp` can raise on some object: wildcard `in`
+    and `not_in` hash every value of the object, and dates compare with
+    timezone-aware datetimes found in it.
+    """
+    if isinstance(exp, Chain):
+        return any(may_raise(arg) for arg in exp.args)
+    elif isinstance(exp, Not):
+        return may_raise(exp.arg)
+
+    if exp.op in ["in", "not_in"]:
+        return exp.key[-1] == "*"
+
+    return type(exp.value) is datetime
+
+
+def _sort_between(items, key, pinned):
+    """
+    Sorts `items` by `key`, leaving every pinned item where it is and moving
+    no item across one, so that whatever raised before still raises first.
+    """
+    result, run = [], []
+
+    for item, pin in zip(items, pinned):
+        if pin:
+            result.extend(sorted(run, key=key))
+            result.append(item)
+            run = []
+        else:
+            run.append(item)
+
+    result.extend(sorted(run, key=key))
+    return result
+
+
+def flatten(exp):
+    """
+    Rewrites nested chains of the same operator, e.g. `a & (b & c)`, into a
+    single chain `And([a, b, c])`. Returns new nodes and leaves `exp` as is.
+    """
+    if isinstance(exp, Not):
+        return Not(flatten(exp.arg))
+    elif not isinstance(exp, Chain):
+        return exp
+
+    args = []
+    for arg in map(flatten, exp.args):
+        if type(arg) is type(exp):
+            args.extend(arg.args)
+        else:
+            args.append(arg)
+
+    return type(exp)(args)
+
+
+def optimize(exp):
+    """
+    Returns an equivalent plan for `exp` in which the operands of every `&`
+    and `|` chain are evaluated cheapest first. Since operands have no side
+    effects, the order only changes how soon a chain short-circuits, except
+    for operands that may raise, which keep their place.
+    """
+    exp = flatten(exp)
+
+    if isinstance(exp, Not):
+        return Not(optimize(exp.arg))
+    elif not isinstance(exp, Chain):
+        return exp
+
+    args = [optimize(arg) for arg in exp.args]
+    return type(exp)(_sort_between(args, cost, [may_raise(arg) for arg in args]))
+
+
+class AdaptiveChain:
+    """
+    Evaluates an `&` or `|` chain while counting, over the first `warmup`
+    objects, how often each operand decides the result (False for `&`, True
+    for `|`). It then re-sorts the operands by cost per decision, which is the
+    order that minimizes the expected cost of the chain. Operands that may
+    raise are `pinned` in place, as in `optimize`.
+    """
+
+    def __init__(self, op, checks, costs, warmup, pinned=None):
+        self.op = op
+        self.decisive = op == "|"
+        self.checks = list(checks)
+        self.costs = list(costs)
+        self.pinned = list(pinned) if pinned is not None else [False] * len(self.checks)
+        self.calls = [0] * len(self.checks)
+        self.decisions = [0] * len(self.checks)
+        self.remaining = warmup
+        self.order = None
+
+    def rank(self, i):
+        if self.calls[i] == 0:
+            return self.costs[i]
+
+        decided = self.decisions[i] / self.calls[i]
+        if decided == 0:
+            return float("inf")
+
+        return self.costs[i] / decided
+
+    def __call__(self, obj):
+        if self.order is not None:
+            for check in self.order:
+                if bool(check(obj)) is self.decisive:
+                    return self.decisive
+            return not self.decisive
+
+        result = not self.decisive
+        for i, check in enumerate(self.checks):
+            self.calls[i] += 1
+            if bool(check(obj)) is self.decisive:
+                self.decisions[i] += 1
+                result = self.decisive
+                break
+
+        self.remaining -= 1
+        if self.remaining <= 0:
+            ranked = _sort_between(range(len(self.checks)), self.rank, self.pinned)
+            self.order = [self.checks[i] for i in ranked]
+
+        return result
@@ -0,0 +1,305 @@
+import re
+from datetime import datetime
+from . import Filter
+from .planner import flatten
+
+_cname = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+_sql_types = {int: "integer", float: "real", str: "text"}
+_sql_ops = {"=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+_mongo_types = {int: ["int", "long"], float: "double", str: "string"}
+_mongo_ops = {"=": "$eq", "!=": "$ne", "<": "$lt", "<=": "$lte", ">": "$gt", ">=": "$gte"}
+_not_array = {"$not": {"$type": "array"}}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def _unparse_key(key):
+    if key == "*" or _cname.fullmatch(key):
+        return key
+
+    return f"'{key}'"
+
+
+def _unparse_value(value):
+    if type(value) is tuple:
+        return "[" + ", ".join(map(_unparse_value, value)) + "]"
+    if type(value) is datetime:
+        return value.strftime("%Y-%m-%d")
+    if type(value) is str:
+        return f'"{value}"' if "'" in value else f"'{value}'"
+
+    return repr(value)
+
+
+def unparse(exp) -> str:
+    """Renders an expression or plan back into an AQL filter string."""
+    op = exp.op
+
+    if op in ["&", "|"]:
+        return f" {op} ".join(f"({unparse(arg)})" if arg.op in ["&", "|"] else unparse(arg) for arg in exp.args)
+    elif op == "!":
+        return f"!({unparse(exp.arg)})"
+
+    selector = ".".join(map(_unparse_key, exp.key))
+    if exp.stype == "len":
+        selector = f"len({selector})"
+
+    if op in ["is", "is_not"]:
+        return f"{selector} {op} null"
+
+    return f"{selector} {op} {_unparse_value(exp.value)}"
+
+
+class Pushdown:
+    """
+    The part of a filter that a backend can evaluate, as `query` (with a dict
+    of `params` for SQL), and the `residual` filter that still has to be matched
+    in Python on the rows the query returns. `unpushed` lists the top-level
+    conjuncts that make up the residual, as AQL.
+    """
+
+    def __init__(self, query, params, unpushed):
+        self.query = query
+        self.params = params
+        self.unpushed = unpushed
+        self.residual = Filter(" & ".join(f"({q})" for q in unpushed)) if unpushed else None
+
+    def match(self, obj) -> bool:
+        return self.residual is None or self.residual.match(obj)
+
+
+def _split(filter, translate):
+    f = filter if isinstance(filter, Filter) else Filter(filter)
+    if f.exp is None:
+        return [], []
+
+    exp = flatten(f.exp)
+    conjuncts = exp.args if exp.op == "&" else [exp]
+    pushed, unpushed = [], []
+
+    for conjunct in conjuncts:
+        try:
+            pushed.append(translate(conjunct))
+        except Unsupported:
+            unpushed.append(unparse(conjunct))
+
+    return pushed, unpushed
+
+
+def _leaf_selector(exp):
+    skey = exp.key
+
+    if skey[-1] == "*":
+        raise Unsupported("wildcard selector")
+    if exp.op in ["~", "!~", "%"]:
+        raise Unsupported(f"{exp.op} operator")
+    if type(exp.value) is datetime:
+        raise Unsupported("date comparison")
+
+    return skey
+
+
+class _SQLTranslator:
+    """
+    Translates expressions to SQLite predicates. Top-level selector keys are
+    columns unless `column` names a JSON column holding the whole record;
+    the remaining keys are a JSON path into that column. Every predicate
+    evaluates to 0 or 1, never NULL, so that NOT keeps the filter semantics.
+    """
+
+    def __init__(self, column=None, start=0):
+        self.column = column
+        self.start = start
+        self.params = {}
+
+    def param(self, value):
+        name = f"p{self.start + len(self.params)}"
+        self.params[name] = value
+        return f":{name}"
+
+    @staticmethod
+    def ident(name):
+        return '"' + name.replace('"', '""') + '"'
+
+    def json_path(self, keys):
+        if any('"' in key for key in keys):
+            raise Unsupported("double quote in key")
+
+        path = "$" + "".join(f'."{key}"' for key in keys)
+        for name, value in self.params.items():
+            if value == path:
+                return f":{name}"
+
+        return self.param(path)
+
+    def ref(self, skey):
+        """Returns (column, keys into the column's JSON or None)."""
+        if self.column is not None:
+            return self.ident(self.column), list(skey)
+        if len(skey) == 1:
+            return self.ident(skey[0]), None
+
+        return self.ident(skey[0]), list(skey[1:])
+
+    def guards(self, column, keys):
+        """Requires every object along the JSON path to be an object, as the filter does."""
+        if keys is None:
+            return []
+
+        prefixes = [keys[:i] for i in range(len(keys))]
+        if self.column is not None:
+            prefixes = prefixes[1:]
+
+        return [f"json_type({column}, {self.json_path(prefix)}) IS 'object'" for prefix in prefixes]
+
+    def in_list(self, exp, typ, val, plain):
+        values = ", ".join(self.param(v) for v in exp.value)
+        # a unary + drops the column's affinity, which would otherwise convert the values, e.g. 1 to '1'
+        pred = f"{typ} IN ('integer', 'real', 'text', 'true', 'false') AND {'+' if plain else ''}{val} IN ({values})"
+        if exp.op == "not_in":
+            pred = f"NOT IFNULL({pred}, 0)"
+
+        return pred
+
+    def length(self, typ, val, column, keys):
+        if keys is None:
+            return f"CASE {typ} WHEN 'text' THEN length({val}) END"
+
+        return (f"CASE {typ} WHEN 'text' THEN length({val}) "
+                f"WHEN 'array' THEN json_array_length({column}, {self.json_path(keys)}) "
+                f"WHEN 'object' THEN (SELECT count(*) FROM json_each({column}, {self.json_path(keys)})) END")
+
+    def leaf(self, exp):
+        skey = _leaf_selector(exp)
+        op = exp.op
+        value = exp.value
+        column, keys = self.ref(skey)
+        guards = self.guards(column, keys)
+
+        if keys is None:
+            typ, val = f"typeof({column})", column
+        else:
+            typ, val = f"json_type({column}, {self.json_path(keys)})", f"json_extract({column}, {self.json_path(keys)})"
+
+        if op == "is":
+            pred = f"{val} IS NULL"
+        elif op == "is_not":
+            pred = f"{val} IS NOT NULL"
+        elif op in ["in", "not_in"]:
+            pred = self.in_list(exp, typ, val, keys is None)
+        elif exp.stype == "len":
+            pred = f"{self.length(typ, val, column, keys)} {_sql_ops[op]} {self.param(value)}"
+        elif op == "*=":
+            pred = f"{typ} IS 'text' AND substr({val}, 1, length({self.param(value)})) = {self.param(value)}"
+        elif op == "=*":
+            pred = f"{typ} IS 'text'"
+            if value:
+                pred += f" AND substr({val}, -length({self.param(value)})) = {self.param(value)}"
+        else:
+            pred = f"{typ} IS '{_sql_types[type(value)]}' AND {val} {_sql_ops[op]} {self.param(value)}"
+
+        return f"IFNULL({' AND '.join(guards + [pred])}, 0)"
+
+    def translate(self, exp):
+        op = exp.op
+
+        if op in ["&", "|"]:
+            joiner = " AND " if op == "&" else " OR "
+            return "(" + joiner.join(map(self.translate, exp.args)) + ")"
+        elif op == "!":
+            return f"NOT {self.translate(exp.arg)}"
+
+        return self.leaf(exp)
+
+
+def to_sql(filter, column=None) -> Pushdown:
+    """
+    Translates `filter` into a SQLite WHERE fragment with named parameters,
+    using the JSON1 functions for dotted selectors. With `column`, selectors
+    are paths into that JSON column; otherwise the first key of a selector
+    names a column. Regex, case-insensitive and date comparisons and wildcard
+    selectors are left in the residual.
+    """
+    params = {}
+
+    def translate(exp):
+        translator = _SQLTranslator(column, len(params))
+        sql = translator.translate(exp)
+        params.update(translator.params)
+        return sql
+
+    pushed, unpushed = _split(filter, translate)
+
+    return Pushdown(" AND ".join(pushed) or "1", params, unpushed)
+
+
+def _mongo_leaf(exp):
+    skey = _leaf_selector(exp)
+    op = exp.op
+    value = exp.value
+
+    if exp.stype == "len":
+        raise Unsupported("len()")
+    if any("." in key or key.startswith("$") for key in skey):
+        raise Unsupported("key with . or $")
+
+    field = ".".join(skey)
+    guards = [{".".join(skey[:i]): {"$type": "object"}} for i in range(1, len(skey))]
+
+    if op in ["is", "is_not"]:
+        doc = {field: {"$eq": None, **_not_array}}
+        if op == "is_not":
+            doc = {"$nor": [doc]}
+    elif op in ["in", "not_in"]:
+        if any(type(v) is not str for v in value):
+            # python matches True against 1 and 1.0 in a list, mongo does not
+            raise Unsupported("numeric list")
+        doc = {field: {"$in": list(value), **_not_array}}
+        if op == "not_in":
+            doc = {"$nor": [doc]}
+    elif op in ["*=", "=*"]:
+        pattern = "^" + re.escape(value) if op == "*=" else re.escape(value) + r"\z"
+        doc = {field: {"$regex": pattern, "$type": "string", **_not_array}}
+    else:
+        doc = {field: {_mongo_ops[op]: value, "$type": _mongo_types[type(value)], **_not_array}}
+
+    if guards:
+        return {"$and": guards + [doc]}
+
+    return doc
+
+
+def _mongo(exp):
+    op = exp.op
+
+    if op == "&":
+        return {"$and": list(map(_mongo, exp.args))}
+    elif op == "|":
+        return {"$or": list(map(_mongo, exp.args))}
+    elif op == "!":
+        return {"$nor": [_mongo(exp.arg)]}
+
+    return _mongo_leaf(exp)
+
+
+def to_mongo(filter) -> Pushdown:
+    """
+    Translates `filter` into a MongoDB query document. Arrays are never
+    traversed, types are matched strictly, and len(), regex,
+    case-insensitive, date and numeric list comparisons and wildcard
+    selectors are left in the residual.
+    """
+    pushed, unpushed = _split(filter, _mongo)
+
+    if not pushed:
+        query = {}
+    elif len(pushed) == 1:
+        query = pushed[0]
+    else:
+        query = {"$and": pushed}
+
+    return Pushdown(query, [], unpushed)
@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+from . import Filter
+
+CHUNK_SIZE = 1 << 20
+
+
+def _json_literal(s):
+    """
+    Returns `s` if any JSON encoding of it contains it verbatim, or None when
+    an encoder may escape part of it.
+    """
+    if not s or not s.isascii() or not s.isprintable() or any(c in s for c in '"\\/'):
+        return None
+
+    return s
+
+
+def _key_literals(keys):
+    literals = set()
+
+    for key in keys:
+        literal = _json_literal(key) if key != "*" else None
+        if literal is not None:
+            literals.add(f'"{literal}"')
+
+    return literals
+
+
+def _required_literals(exp):
+    """
+    Returns a set of strings that every JSON line matching `exp` must
+    contain: the keys a comparison has to find and the constants an equality
+    or prefix/suffix match has to see.
+    """
+    if exp is None:
+        return set()
+
+    op = exp.op
+
+    if op == "&":
+        return set().union(*map(_required_literals, exp.args))
+    elif op == "|":
+        return set.intersection(*map(_required_literals, exp.args))
+    elif op == "!":
+        return set()
+
+    skey = exp.key
+
+    if op in ["is", "not_in"]:
+        return _key_literals(skey[:-1])
+
+    literals = _key_literals(skey)
+    value = exp.value
+
+    if exp.stype == "plain":
+        if op in ["=", "*=", "=*"] and type(value) is str:
+            literal = _json_literal(value)
+            if literal is not None:
+                literals.add(literal)
+        elif op == "=" and type(value) is int:
+            literals.add(str(value))
+
+    return literals
+
+
+def _read_blocks(f, chunk_size, end=None):
+    """
+    Reads `f` in blocks of about `chunk_size` bytes and yields them cut at line
+    boundaries. Stops after the last line that starts before offset `end`.
+    """
+    pos = f.tell() if end is not None else 0
+    tail = b""
+
+    while end is None or pos < end:
+        block = f.read(chunk_size)
+        if isinstance(block, str):
+            block = block.encode()
+        if not block:
+            if tail:
+                yield tail
+            return
+
+        block = tail + block
+        cut = block.rfind(b"\n") + 1
+        if cut == 0:
+            tail = block
+            continue
+
+        data, tail = block[:cut], block[cut:]
+
+        if end is not None and pos + len(data) >= end:
+            yield data[:data.index(b"\n", end - pos - 1) + 1]
+            return
+
+        yield data
+        pos += len(data)
+
+
+def _match_blocks(f, blocks, needles):
+    match = f.match
+    loads = json.loads
+
+    for block in blocks:
+        block = block.decode()
+        if needles and not all(needle in block for needle in needles):
+            continue
+
+        for line in block.split("\n"):
+            if needles and not all(needle in line for needle in needles):
+                continue
+            if not line or line.isspace():
+                continue
+
+            obj = loads(line)
+            if match(obj):
+                yield obj
+
+
+def _match_range(filter_str, path, start, end, chunk_size, precheck):
+    f = Filter(filter_str)
+    needles = _required_literals(f.exp) if precheck else ()
+
+    with open(path, "rb") as fp:
+        if start > 0:
+            fp.seek(start - 1)
+            fp.readline()
+
+        return list(_match_blocks(f, _read_blocks(fp, chunk_size, end), needles))
+
+
+def _filter_parallel(f, path, workers, ordered, chunk_size, precheck):
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    size = os.path.getsize(path)
+    shard = max(chunk_size, -(-size // (workers * 8)))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_match_range, f.filter_str, path, start, min(start + shard, size), chunk_size, precheck)
+            for start in range(0, size, shard)
+        ]
+
+        for future in (futures if ordered else as_completed(futures)):
+            yield from future.result()
+
+
+def _filter_lines(f, lines, precheck):
+    needles = _required_literals(f.exp) if precheck else ()
+
+    for line in lines:
+        if isinstance(line, dict):
+            if f.match(line):
+                yield line
+            continue
+
+        if isinstance(line, bytes):
+            line = line.decode()
+
+        if not all(needle in line for needle in needles) or not line.strip():
+            continue
+
+        obj = json.loads(line)
+        if f.match(obj):
+            yield obj
+
+
+def filter_stream(filter, source, workers=None, ordered=True, chunk_size=CHUNK_SIZE, precheck=True):
+    """
+    Yields the records of a JSON Lines source that match `filter`, a `Filter`
+    or a filter string. `source` is a path ("-" for stdin), a binary file
+    object, or an iterable of lines or already decoded dicts.
+
+    Files are read in blocks of `chunk_size` bytes. Unless `precheck` is off,
+    blocks and lines are skipped without decoding when they lack a key or a
+    constant the filter needs, which assumes the producer does not
+    \\u-escape printable ASCII.
+
+    With `workers`, a file given by path is split into byte ranges that are
+    matched by a process pool; matches are yielded in file order unless
+    `ordered` is False.
+    """
+    f = filter if isinstance(filter, Filter) else Filter(filter)
+
+    if isinstance(source, (str, bytes, os.PathLike)) and source != "-":
+        if workers:
+            yield from _filter_parallel(f, source, workers, ordered, chunk_size, precheck)
+            return
+
+        with open(source, "rb") as fp:
+            needles = _required_literals(f.exp) if precheck else ()
+            yield from _match_blocks(f, _read_blocks(fp, chunk_size), needles)
+        return
+
+    if source == "-":
+        source = sys.stdin.buffer
+
+    if hasattr(source, "read"):
+        needles = _required_literals(f.exp) if precheck else ()
+        yield from _match_blocks(f, _read_blocks(source, chunk_size), needles)
+        return
+
+    yield from _filter_lines(f, source, precheck)
@@ -0,0 +1,238 @@
+import numpy as np
+from datetime import datetime
+from . import _compile_exp, _parse_date
+
+_dtype_kinds = {"i": "int", "u": "int", "f": "float", "b": "bool", "U": "str", "M": "date"}
+_type_kinds = {int: "int", float: "float", bool: "bool", str: "str", datetime: "date"}
+_kind_dtypes = {"int": np.int64, "float": np.float64, "bool": np.bool_, "str": np.str_, "date": "datetime64[us]"}
+_kind_fills = {"int": 0, "float": 0.0, "bool": False, "str": "", "date": datetime.min}
+_numeric_kinds = {"int", "float", "bool"}
+
+_np_ops = {
+    "=": np.equal,
+    "!=": np.not_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "~": lambda a, b: np.char.lower(a) == b.lower(),
+    "!~": lambda a, b: np.char.lower(a) != b.lower(),
+    "*=": np.char.startswith,
+    "=*": np.char.endswith,
+}
+
+
+def _to_list(col):
+    if isinstance(col, np.ndarray):
+        if col.dtype.kind == "M":
+            col = col.astype("datetime64[us]")
+        return col.tolist()
+
+    return list(col)
+
+
+def _typed_column(col):
+    """
+    Returns (kind, values, valid) for a column, where `kind` names the single
+    python type of its non-null values ("object" when there is none or more
+    than one), `values` is an array of that type and `valid` marks non-nulls.
+    """
+    if isinstance(col, np.ndarray) and col.dtype.kind != "O":
+        kind = _dtype_kinds.get(col.dtype.kind, "object")
+        if kind == "date":
+            return kind, col, ~np.isnat(col)
+        if kind == "object":
+            return kind, _to_list(col), np.ones(len(col), dtype=bool)
+        return kind, col, np.ones(len(col), dtype=bool)
+
+    values = _to_list(col)
+    valid = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+    types = set(map(type, values)) - {type(None)}
+
+    if not types:
+        return "null", values, valid
+
+    kind = _type_kinds.get(types.pop(), "object") if len(types) == 1 else "object"
+    if kind == "object":
+        return kind, values, valid
+
+    if kind == "date" and any(v.tzinfo is not None for v in values if v is not None):
+        return "object", values, valid
+
+    fill = _kind_fills[kind]
+    try:
+        array = np.array([fill if v is None else v for v in values], dtype=_kind_dtypes[kind])
+    except OverflowError:
+        return "object", values, valid
+
+    return kind, array, valid
+
+
+def _parse_dates(values):
+    """Parses an array of strings the way `compare` does, with NaT for failures."""
+    uniq, inverse = np.unique(values, return_inverse=True)
+    parsed = []
+
+    for value in uniq.tolist():
+        parsed.append(np.datetime64(_parse_date(value) or "NaT", "us"))
+
+    return np.array(parsed, dtype="datetime64[us]")[inverse]
+
+
+class _Batch:
+    def __init__(self, columns, size=None):
+        sizes = {len(col) for col in columns.values()}
+        if size is not None:
+            sizes.add(size)
+        if len(sizes) > 1:
+            raise ValueError(f"columns have different lengths: {sorted(sizes)}")
+
+        self.columns = columns
+        self.size = sizes.pop() if sizes else 0
+        self.typed_columns = {}
+        self.rows = None
+
+    def typed(self, key):
+        if key not in self.typed_columns:
+            self.typed_columns[key] = _typed_column(self.columns[key])
+
+        return self.typed_columns[key]
+
+    def get_rows(self):
+        if self.rows is None:
+            keys = list(self.columns)
+            columns = [_to_list(self.columns[key]) for key in keys]
+            self.rows = [dict(zip(keys, values)) for values in zip(*columns)]
+            if not keys:
+                self.rows = [{} for _ in range(self.size)]
+
+        return self.rows
+
+    def const(self, value):
+        return np.full(self.size, value, dtype=bool)
+
+
+def _mask_rows(exp, batch, todo=None):
+    check = _compile_exp(exp)
+    rows = batch.get_rows()
+
+    if todo is None:
+        return np.fromiter((check(row) for row in rows), dtype=bool, count=batch.size)
+
+    # only the rows still undecided, as match never evaluates the others and they may raise
+    result = batch.const(False)
+    for i in np.flatnonzero(todo).tolist():
+        result[i] = check(rows[i])
+
+    return result
+
+
+def _mask_in(kind, values, valid, expected_value, batch):
+    expected_kinds = {_type_kinds[type(v)] for v in expected_value}
+
+    if kind in _numeric_kinds and expected_kinds <= _numeric_kinds or kind == "str" and expected_kinds == {"str"}:
+        return valid & np.isin(values, list(expected_value))
+
+    return batch.const(False)
+
+
+def _mask_values(kind, values, valid, stype, op, expected_value, batch):
+    if stype == "len":
+        if kind != "str":
+            return batch.const(False)
+        return valid & _np_ops[op](np.char.str_len(values), expected_value)
+
+    expected_kind = _type_kinds[type(expected_value)]
+
+    if expected_kind == "date":
+        if kind == "str":
+            values = _parse_dates(values)
+            valid = valid & ~np.isnat(values)
+        elif kind != "date":
+            return batch.const(False)
+        return valid & _np_ops[op](values, np.datetime64(expected_value, "us"))
+
+    if kind != expected_kind:
+        return batch.const(False)
+
+    if op == "%":
+        return None
+
+    return valid & _np_ops[op](values, expected_value)
+
+
+def _mask_cmp(exp, batch):
+    """Evaluates a comparison over whole columns, or returns None if it cannot be vectorized."""
+    op = exp.op
+    expected_value = exp.value
+    skey = exp.key
+
+    if len(skey) != 1 or skey[0] == "*":
+        return None
+
+    field = skey[0]
+    if field not in batch.columns:
+        return batch.const(op in ["is", "not_in"])
+
+    kind, values, valid = batch.typed(field)
+
+    if op == "is":
+        return ~valid
+    if op == "is_not":
+        return valid.copy()
+    if kind == "null":
+        return batch.const(op == "not_in")
+
+    if op in ["in", "not_in"]:
+        if kind == "object":
+            return None
+        hits = _mask_in(kind, values, valid, expected_value, batch)
+        return hits if op == "in" else ~hits
+
+    if kind == "object":
+        return None
+
+    return _mask_values(kind, values, valid, exp.stype, op, expected_value, batch)
+
+
+def _mask_exp(exp, batch, todo=None):
+    """Evaluates `exp` over the rows in `todo` (all if None); the others are left undefined."""
+    op = exp.op
+
+    if op in ["&", "|"]:
+        result = _mask_exp(exp.args[0], batch, todo)
+        for arg in exp.args[1:]:
+            # & is decided where it is false, | where it is true
+            pending = result if op == "&" else ~result
+            if todo is not None:
+                pending = pending & todo
+            if not pending.any():
+                break
+            more = _mask_exp(arg, batch, pending)
+            result = result & more if op == "&" else result | more
+        return result
+    elif op == "!":
+        return ~_mask_exp(exp.arg, batch, todo)
+
+    result = _mask_cmp(exp, batch)
+    if result is None:
+        return _mask_rows(exp, batch, todo)
+
+    return result
+
+
+def mask(exp, columns, size=None):
+    """
+    Evaluates `exp` over columnar records, given as a dict of equally long
+    lists or numpy arrays, and returns a boolean numpy array with one entry
+    per record. A missing column or a None entry is a missing field.
+    Comparisons on top-level columns of a single python type become array
+    operations; regex matches, nested or wildcard selectors and mixed-type
+    columns fall back to matching row by row.
+    """
+    batch = _Batch(columns, size)
+
+    if exp is None:
+        return batch.const(True)
+
+    return _mask_exp(exp, batch)
@@ -1,22 +1,17 @@
-import requests
+from .token import TokenProvider, TokenError
 
 
 class Keycloak:
-    def __init__(self, host, realm, client_id, client_secret):
+    def __init__(self, host, realm, client_id, client_secret, session=None):
         self.client_id = client_id
         self.client_secret = client_secret
 
         self.token_endpoint = f"https://{host}/auth/realms/{realm}/protocol/openid-connect/token"
+        self.tokens = TokenProvider.shared(self.token_endpoint, self.client_id, self.client_secret,
+                                           session=session)
 
     def access_token(self):
-        h = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-
-        d = f"grant_type=client_credentials&client_id={self.client_id}&client_secret={self.client_secret}"
-        response = requests.request("POST", self.token_endpoint, headers=h, data=d)
-
-        if not response.ok:
-            return None, response.json()
-
-        return response.json()["access_token"], None
+        try:
+            return self.tokens.access_token(), None
+        except TokenError as e:
+            return None, e.args[0]
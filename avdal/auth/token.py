@@ -0,0 +1,264 @@
+import time
+import asyncio
+import threading
+from ..http.transport import session_for
+
+
+class TokenError(Exception):
+    """Raised with the token endpoint's JSON (or text) response when a grant fails."""
+
+
+class _TokenState:
+    """The token bookkeeping shared by the sync and async providers."""
+
+    _shared = {}
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, token_endpoint, client_id, client_secret, **kwargs):
+        """
+        Returns the provider shared by every caller of this endpoint and
+        client with the same settings; an injected session, say, gets a
+        provider of its own.
+        """
+        # settings left at None are the defaults, as if they were not passed
+        settings = tuple(sorted((name, value) for name, value in kwargs.items() if value is not None))
+        key = (cls, token_endpoint, client_id, client_secret, settings)
+
+        with cls._shared_lock:
+            provider = cls._shared.get(key)
+            if provider is None:
+                provider = cls._shared[key] = cls(token_endpoint, client_id, client_secret, **kwargs)
+
+            return provider
+
+    def _reset(self):
+        self.token = None
+        self.refresh_at = 0
+        self.usable_until = 0
+        self.refresh_token = None
+        self.refresh_expires_at = 0
+
+    def _form(self, grant):
+        data = dict(grant, client_id=self.client_id, client_secret=self.client_secret)
+        if self.scope:
+            data["scope"] = self.scope
+
+        return data
+
+    def _check(self, response, ok):
+        if not ok:
+            try:
+                raise TokenError(response.json())
+            except ValueError:
+                raise TokenError(response.text)
+
+        return response.json()
+
+    def _refresh_grant(self, now):
+        if self.refresh_token is not None and now < self.refresh_expires_at - self.margin:
+            return {"grant_type": "refresh_token", "refresh_token": self.refresh_token}
+
+    def _store(self, body, now):
+        expires_in = body.get("expires_in", 300)
+        self.token = body["access_token"]
+        self.refresh_at = now + max(expires_in - self.margin, expires_in / 2)
+        # leaves room for clock skew and the request that uses the token
+        self.usable_until = now + expires_in - min(5, expires_in / 10)
+        self.refresh_token = body.get("refresh_token")
+        self.refresh_expires_at = now + body.get("refresh_expires_in", 0) if self.refresh_token else 0
+
+
+class TokenProvider(_TokenState):
+    """
+    Fetches OAuth2/OIDC access tokens from `token_endpoint` with the
+    client_credentials grant and caches them. Concurrent callers share a
+    single request. Once a token has been fetched, a daemon thread refreshes
+    it `margin` seconds before it expires (halfway through, for tokens that
+    live less than twice that), with the refresh_token grant while the
+    refresh token is valid, so callers only wait on the endpoint for the
+    first token or when refreshing keeps failing. Without `refresh_ahead`,
+    the first caller after that point refreshes it instead.
+
+    Requests go through `session`, by default the pooled session of the
+    endpoint's host; `timeout` overrides the session's own.
+    """
+
+    def __init__(self, token_endpoint, client_id, client_secret, scope=None, margin=30, refresh_ahead=True,
+                 session=None, timeout=None):
+        self.token_endpoint = token_endpoint
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.margin = margin
+        self.refresh_ahead = refresh_ahead
+        self.session = session or session_for(token_endpoint)
+        self.timeout = timeout
+        self._reset()
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.refresher = None
+
+    def close(self):
+        self.closed.set()
+
+        if self.refresher is not None:
+            self.refresher.join()
+
+    def _valid(self, now):
+        if self.token is None:
+            return False
+
+        return now < (self.usable_until if self.refresher is not None else self.refresh_at)
+
+    def _request(self, grant):
+        response = self.session.post(self.token_endpoint, data=self._form(grant), timeout=self.timeout)
+        return self._check(response, response.ok)
+
+    def _fetch(self):
+        now = time.time()
+        body = None
+
+        grant = self._refresh_grant(now)
+        if grant is not None:
+            try:
+                body = self._request(grant)
+            except TokenError:
+                # the session may have ended on the server; start a new one
+                body = None
+
+        if body is None:
+            body = self._request({"grant_type": "client_credentials"})
+
+        self._store(body, now)
+
+        if self.refresh_ahead and self.refresher is None:
+            self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+            self.refresher.start()
+
+    def _refresh_loop(self):
+        backoff = 0
+
+        while not self.closed.wait(max(self.refresh_at - time.time(), backoff)):
+            with self.lock:
+                if self.token is not None and time.time() < self.refresh_at:
+                    continue
+                try:
+                    self._fetch()
+                    backoff = 0
+                except Exception:
+                    # callers still fetch on their own once the token is due
+                    backoff = min(max(backoff * 2, 1), 60)
+
+    def access_token(self) -> str:
+        if self._valid(time.time()):
+            return self.token
+
+        with self.lock:
+            if not self._valid(time.time()):
+                self._fetch()
+
+            return self.token
+
+    def invalidate(self):
+        """Drops the cached token, e.g. after the API rejected it."""
+        with self.lock:
+            self.token = None
+
+
+class AsyncTokenProvider(_TokenState):
+    """
+    The asyncio counterpart of `TokenProvider`, on an `httpx.AsyncClient`
+    (by default the loop's shared one from `avdal.http.aio`). Once the token
+    is due for a refresh, callers keep getting it while a background task
+    fetches the next one, until it is no longer usable.
+
+    A shared provider outlives event loops, e.g. across `asyncio.run` calls,
+    so its lock and refresh task are kept per loop, like the shared client.
+    """
+
+    def __init__(self, token_endpoint, client_id, client_secret, scope=None, margin=30, client=None):
+        self.token_endpoint = token_endpoint
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.scope = scope
+        self.margin = margin
+        self.client = client
+        self._reset()
+        self.locks = {}
+        self.refreshers = {}
+
+    async def close(self):
+        refresher = self.refreshers.pop(asyncio.get_running_loop(), None)
+        if refresher is not None:
+            refresher.cancel()
+
+    def _lock(self):
+        loop = asyncio.get_running_loop()
+
+        lock = self.locks.get(loop)
+        if lock is None:
+            # the locks and tasks of closed loops hold on to them; let them go
+            for closed in [other for other in list(self.locks) if other.is_closed()]:
+                self.locks.pop(closed, None)
+                self.refreshers.pop(closed, None)
+            lock = self.locks[loop] = asyncio.Lock()
+
+        return lock
+
+    async def _request(self, grant):
+        if self.client is None:
+            from ..http.aio import shared_client
+            client = shared_client()
+        else:
+            client = self.client
+
+        response = await client.post(self.token_endpoint, data=self._form(grant))
+        return self._check(response, not response.is_error)
+
+    async def _fetch(self):
+        now = time.time()
+        body = None
+
+        grant = self._refresh_grant(now)
+        if grant is not None:
+            try:
+                body = await self._request(grant)
+            except TokenError:
+                body = None
+
+        if body is None:
+            body = await self._request({"grant_type": "client_credentials"})
+
+        self._store(body, now)
+
+    async def _refresh(self):
+        async with self._lock():
+            if self.token is not None and time.time() < self.refresh_at:
+                return
+            try:
+                await self._fetch()
+            except Exception:
+                # callers fetch on their own once the token is no longer usable
+                pass
+
+    async def access_token(self) -> str:
+        now = time.time()
+
+        if self.token is not None and now < self.usable_until:
+            if now >= self.refresh_at:
+                loop = asyncio.get_running_loop()
+                refresher = self.refreshers.get(loop)
+                if refresher is None or refresher.done():
+                    self.refreshers[loop] = loop.create_task(self._refresh())
+            return self.token
+
+        async with self._lock():
+            if self.token is None or time.time() >= self.usable_until:
+                await self._fetch()
+
+            return self.token
+
+    def invalidate(self):
+        """Drops the cached token, e.g. after the API rejected it."""
+        self.token = None
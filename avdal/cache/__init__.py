@@ -11,5 +11,62 @@ class Cache(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def incr(self, key, amount=1):
+    def incr(self, key, amount=1, ttl=None):
+        """Adds `amount` to `key` and returns the result; a key it creates expires after `ttl` seconds."""
         raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def get_many(self, keys) -> list:
+        """Returns the values of `keys`, in order, with None for missing keys."""
+        return [self.get(key) for key in keys]
+
+    def set_many(self, items, ttl=None):
+        """Sets every key of the `items` dict; `ttl` applies to all keys, or is a dict of per-key TTLs."""
+        for key, value in items.items():
+            self.set(key, value, ttl.get(key) if isinstance(ttl, dict) else ttl)
+
+    def incr_many(self, amounts) -> list:
+        """Increments every key of the `amounts` dict by its amount and returns the new values, in order."""
+        return [self.incr(key, amount) for key, amount in amounts.items()]
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+
+class AsyncCache(ABC):
+    """The asyncio counterpart of `Cache`, with the same semantics."""
+
+    @abstractmethod
+    async def get(self, key):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def incr(self, key, amount=1, ttl=None):
+        raise NotImplementedError
+
+    async def delete(self, key):
+        raise NotImplementedError
+
+    async def get_many(self, keys) -> list:
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items, ttl=None):
+        for key, value in items.items():
+            await self.set(key, value, ttl.get(key) if isinstance(ttl, dict) else ttl)
+
+    async def incr_many(self, amounts) -> list:
+        return [await self.incr(key, amount) for key, amount in amounts.items()]
+
+    async def delete_many(self, keys):
+        for key in keys:
+            await self.delete(key)
+
+
+from .memoize import cached  # noqa: E402
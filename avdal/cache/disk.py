@@ -0,0 +1,254 @@
+import os
+import mmap
+import time
+import fcntl
+import struct
+import pickle
+import threading
+import contextlib
+from . import Cache
+
+# op, value kind, key length, value length, expiry (unix time, 0 for none)
+_HEADER = struct.Struct("<BBHId")
+_SET = 1
+_DELETE = 2
+
+_BYTES = 0
+_STR = 1
+_INT = 2
+_PICKLE = 3
+
+
+def _encode(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return _BYTES, bytes(value)
+    if isinstance(value, str):
+        return _STR, value.encode()
+    if type(value) is int:
+        return _INT, str(value).encode()
+
+    return _PICKLE, pickle.dumps(value)
+
+
+def _decode(kind, data):
+    if kind == _BYTES:
+        return bytes(data)
+    if kind == _STR:
+        return str(data, "utf-8")
+    if kind == _INT:
+        return int(data)
+
+    return pickle.loads(data)
+
+
+def _record(op, key, kind=_BYTES, data=b"", exp=None):
+    key = key.encode()
+    return _HEADER.pack(op, kind, len(key), len(data), exp or 0.0) + key + data
+
+
+class DiskCache(Cache):
+    """
+    A cache persisted in the directory `path` as an append-only log of set
+    and delete records, indexed in memory and read through a shared mmap of
+    the log. Several processes on one host can share a directory: writes
+    append under an exclusive flock and every process replays the records
+    others appended before it reads. `compact` rewrites the log with only the
+    live entries; it runs on its own once dead records make up more than
+    `compact_ratio` of a log larger than `min_compact_size` bytes.
+
+    Keys are strings. bytes, str and int values are stored as is, anything
+    else is pickled.
+    """
+
+    def __init__(self, path, compact_ratio=0.5, min_compact_size=1 << 20):
+        os.makedirs(path, exist_ok=True)
+
+        self.data_path = os.path.join(path, "data")
+        self.compact_ratio = compact_ratio
+        self.min_compact_size = min_compact_size
+        self.lock_fd = os.open(os.path.join(path, "lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        self.mutex = threading.RLock()
+        self.fd = None
+        self.map = None
+
+        with self._locked(exclusive=False):
+            pass
+
+    def close(self):
+        with self.mutex:
+            os.close(self.fd)
+            os.close(self.lock_fd)
+            self.fd = self.lock_fd = None
+            self.map = None
+
+    def _open(self):
+        if self.fd is not None:
+            os.close(self.fd)
+
+        self.fd = os.open(self.data_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self.inode = os.fstat(self.fd).st_ino
+        self.map = None
+        self.index = {}
+        self.end = 0
+        self.dead = 0
+
+    def _remap(self, size):
+        # the old mapping stays alive for as long as views into it do
+        self.map = mmap.mmap(self.fd, size, access=mmap.ACCESS_READ) if size else None
+
+    def _replay(self):
+        """Indexes the records appended since the last call, by any process."""
+        size = os.fstat(self.fd).st_size
+        if size <= self.end:
+            return
+
+        # read rather than mapped, so that writes do not remap; reads remap lazily
+        start = self.end
+        data = os.pread(self.fd, size - start, start)
+        pos = 0
+
+        while pos + _HEADER.size <= len(data):
+            op, kind, key_len, value_len, exp = _HEADER.unpack_from(data, pos)
+            key_end = pos + _HEADER.size + key_len
+            record_end = key_end + value_len
+            if record_end > len(data):
+                # a record torn by a crashed writer; the next write truncates it
+                break
+
+            key = data[pos + _HEADER.size:key_end].decode()
+            old = self.index.pop(key, None)
+            if old is not None:
+                self.dead += old[4]
+
+            if op == _SET:
+                self.index[key] = (start + key_end, value_len, kind, exp, record_end - pos)
+            else:
+                self.dead += record_end - pos
+
+            pos = record_end
+
+        self.end = start + pos
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        with self.mutex:
+            fcntl.flock(self.lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                if self.fd is None or os.stat(self.data_path).st_ino != self.inode:
+                    # another process compacted the log into a new file
+                    self._open()
+                self._replay()
+                yield
+            finally:
+                fcntl.flock(self.lock_fd, fcntl.LOCK_UN)
+
+    def _live(self, key, now):
+        entry = self.index.get(key)
+        if entry is None or entry[3] and entry[3] <= now:
+            return None
+
+        if self.map is None or len(self.map) < entry[0] + entry[1]:
+            self._remap(os.fstat(self.fd).st_size)
+
+        return entry
+
+    def _read(self, key, now):
+        entry = self._live(key, now)
+        if entry is None:
+            return None
+
+        offset, length, kind = entry[:3]
+        return _decode(kind, self.map[offset:offset + length])
+
+    def _append(self, records):
+        if os.fstat(self.fd).st_size > self.end:
+            os.ftruncate(self.fd, self.end)
+
+        os.write(self.fd, b"".join(records))
+        self._replay()
+
+        if self.end > self.min_compact_size and self.dead > self.compact_ratio * self.end:
+            self._compact()
+
+    def _compact(self):
+        now = time.time()
+        tmp_path = self.data_path + ".tmp"
+        self._remap(self.end)
+
+        with open(tmp_path, "wb") as f:
+            for key, (offset, length, kind, exp, _) in self.index.items():
+                if not exp or exp > now:
+                    f.write(_record(_SET, key, kind, self.map[offset:offset + length], exp))
+
+        os.replace(tmp_path, self.data_path)
+        self._open()
+        self._replay()
+
+    def compact(self):
+        with self._locked(exclusive=True):
+            self._compact()
+
+    def get(self, key):
+        with self._locked(exclusive=False):
+            return self._read(key, time.time())
+
+    def get_many(self, keys):
+        with self._locked(exclusive=False):
+            now = time.time()
+            return [self._read(key, now) for key in keys]
+
+    def view(self, key):
+        """
+        Returns a read-only memoryview of the stored bytes of `key`, straight
+        from the mapped log, or None. It stays valid after the key changes.
+        """
+        with self._locked(exclusive=False):
+            entry = self._live(key, time.time())
+            if entry is None:
+                return None
+
+            return memoryview(self.map)[entry[0]:entry[0] + entry[1]]
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        now = time.time()
+        records = []
+
+        for key, value in items.items():
+            key_ttl = ttl.get(key) if isinstance(ttl, dict) else ttl
+            records.append(_record(_SET, key, *_encode(value), None if key_ttl is None else now + key_ttl))
+
+        with self._locked(exclusive=True):
+            self._append(records)
+
+    def incr(self, key, amount=1, ttl=None):
+        return self.incr_many({key: amount}, ttl)[0]
+
+    def incr_many(self, amounts, ttl=None):
+        now = time.time()
+        records = []
+        values = []
+
+        with self._locked(exclusive=True):
+            for key, amount in amounts.items():
+                entry = self._live(key, now)
+                value = amount if entry is None else self._read(key, now) + amount
+                exp = (None if ttl is None else now + ttl) if entry is None else entry[3]
+
+                records.append(_record(_SET, key, *_encode(value), exp))
+                values.append(value)
+
+            self._append(records)
+
+        return values
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        with self._locked(exclusive=True):
+            records = [_record(_DELETE, key) for key in keys if key in self.index]
+            if records:
+                self._append(records)
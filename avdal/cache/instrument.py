@@ -0,0 +1,208 @@
+import time
+import bisect
+import random
+import threading
+from . import Cache
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class SpaceSaving:
+    """
+    Tracks the approximate `k` most frequent keys in constant memory: when a
+    new key arrives and all `k` slots are taken, it replaces the least
+    counted key and inherits its count, which it records as its error.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, key, count=1):
+        if key in self.counts:
+            self.counts[key] += count
+            return
+
+        if len(self.counts) < self.k:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        del self.errors[victim]
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+
+    def top(self, n=None):
+        """Returns (key, count, error) for the most counted keys, most counted first."""
+        ranked = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+        return [(key, count, self.errors[key]) for key, count in ranked]
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def snapshot(self):
+        cumulative, total = [], 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+
+        return {
+            "buckets": dict(zip([*self.buckets, float("inf")], cumulative)),
+            "sum": self.sum,
+            "count": total,
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Instrumented(Cache):
+    """
+    Wraps a cache to count hits, misses and sets, time every operation into a
+    latency histogram, and sample the keys read, at `sample_rate`, into a
+    top-`top_k` hot key sketch. Evictions and expirations come from the
+    wrapped cache's own `stats()` when it has one. Caches that are not
+    wrapped pay nothing; `enabled = False` turns a wrapper into a plain
+    pass-through.
+    """
+
+    def __init__(self, cache, name="default", sample_rate=0.01, top_k=20, buckets=LATENCY_BUCKETS):
+        self.cache = cache
+        self.name = name
+        self.enabled = True
+        self.sample_rate = sample_rate
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset(top_k)
+
+    def reset(self, top_k=None):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
+            self.sets = 0
+            self.latencies = {}
+            self.hot_keys = SpaceSaving(top_k or self.hot_keys.k)
+
+    def _record(self, op, elapsed, keys=(), hits=0, misses=0, sets=0):
+        sampled = [key for key in keys if random.random() < self.sample_rate]
+
+        with self.lock:
+            self.hits += hits
+            self.misses += misses
+            self.sets += sets
+
+            histogram = self.latencies.get(op)
+            if histogram is None:
+                histogram = self.latencies[op] = Histogram(self.buckets)
+            histogram.observe(elapsed)
+
+            for key in sampled:
+                self.hot_keys.add(key)
+
+    def get(self, key):
+        if not self.enabled:
+            return self.cache.get(key)
+
+        start = time.perf_counter()
+        value = self.cache.get(key)
+        hit = value is not None
+        self._record("get", time.perf_counter() - start, (key,), hits=hit, misses=not hit)
+
+        return value
+
+    def get_many(self, keys):
+        if not self.enabled:
+            return self.cache.get_many(keys)
+
+        keys = list(keys)
+        start = time.perf_counter()
+        values = self.cache.get_many(keys)
+        hits = sum(value is not None for value in values)
+        self._record("get_many", time.perf_counter() - start, keys, hits=hits, misses=len(keys) - hits)
+
+        return values
+
+    def _timed(self, op, fn, *args, sets=0):
+        if not self.enabled:
+            return fn(*args)
+
+        start = time.perf_counter()
+        result = fn(*args)
+        self._record(op, time.perf_counter() - start, sets=sets)
+
+        return result
+
+    def set(self, key, value, ttl=None):
+        return self._timed("set", self.cache.set, key, value, ttl, sets=1)
+
+    def set_many(self, items, ttl=None):
+        return self._timed("set_many", self.cache.set_many, items, ttl, sets=len(items))
+
+    def incr(self, key, amount=1, ttl=None):
+        return self._timed("incr", self.cache.incr, key, amount, ttl)
+
+    def incr_many(self, amounts):
+        return self._timed("incr_many", self.cache.incr_many, amounts)
+
+    def delete(self, key):
+        return self._timed("delete", self.cache.delete, key)
+
+    def delete_many(self, keys):
+        return self._timed("delete_many", self.cache.delete_many, keys)
+
+    def snapshot(self):
+        inner = self.cache.stats() if hasattr(self.cache, "stats") else {}
+
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "sets": self.sets,
+                "evictions": inner.get("evictions", 0),
+                "expirations": inner.get("expirations", 0),
+                "latency": {op: histogram.snapshot() for op, histogram in self.latencies.items()},
+                "hot_keys": [
+                    {"key": key, "count": round(count / self.sample_rate), "error": round(error / self.sample_rate)}
+                    for key, count, error in self.hot_keys.top()
+                ],
+            }
+
+    def prometheus(self, prefix="avdal_cache"):
+        """Renders the snapshot in the Prometheus text exposition format."""
+        s = self.snapshot()
+        cache = f'cache="{_label(self.name)}"'
+        lines = []
+
+        for metric in ["hits", "misses", "sets", "evictions", "expirations"]:
+            lines.append(f"# TYPE {prefix}_{metric}_total counter")
+            lines.append(f"{prefix}_{metric}_total{{{cache}}} {s[metric]}")
+
+        lines.append(f"# TYPE {prefix}_operation_seconds histogram")
+        for op, histogram in s["latency"].items():
+            labels = f'{cache},op="{op}"'
+            for bound, count in histogram["buckets"].items():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_operation_seconds_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"{prefix}_operation_seconds_sum{{{labels}}} {histogram['sum']}")
+            lines.append(f"{prefix}_operation_seconds_count{{{labels}}} {histogram['count']}")
+
+        lines.append(f"# TYPE {prefix}_hot_key_reads gauge")
+        for hot in s["hot_keys"]:
+            lines.append(f'{prefix}_hot_key_reads{{{cache},key="{_label(hot["key"])}"}} {hot["count"]}')
+
+        return "\n".join(lines) + "\n"
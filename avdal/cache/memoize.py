@@ -0,0 +1,160 @@
+import math
+import time
+import threading
+import functools
+
+_VALUE = 0
+_ERROR = 1
+
+
+class _Flight:
+    """A computation of one key that concurrent callers wait on instead of repeating."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _default_key(func):
+    prefix = f"{func.__module__}.{func.__qualname__}"
+
+    def key(*args, **kwargs):
+        for arg in [*args, *kwargs.values()]:
+            # the default repr is the object's address, e.g. `self` of a method
+            if type(arg).__repr__ is object.__repr__:
+                raise TypeError(f"{prefix}: cannot build a cache key from a {type(arg).__name__} argument; "
+                                f"pass key= to cached")
+
+        return f"{prefix}:{args!r}:{sorted(kwargs.items())!r}"
+
+    return key
+
+
+class _Memo:
+    """The entries and flights of one function memoized by `cached`."""
+
+    def __init__(self, func, cache, ttl, key, stale_ttl, negative_ttl, errors, serializer):
+        self.func = func
+        self.cache = cache
+        self.ttl = ttl
+        self.make_key = key or _default_key(func)
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.errors = errors
+        self.serializer = serializer
+        self.flights = {}
+        self.flights_lock = threading.Lock()
+
+    def load(self, k):
+        entry = self.cache.get(k)
+        if entry is None or self.serializer is None:
+            return entry
+
+        return self.serializer.loads(entry)
+
+    def store(self, k, fresh_ttl, kind, payload):
+        if fresh_ttl is None:
+            fresh_until, cache_ttl = None, None
+        else:
+            fresh_until = time.time() + fresh_ttl
+            cache_ttl = math.ceil(fresh_ttl + (self.stale_ttl if kind == _VALUE and payload is not None else 0))
+
+        entry = (fresh_until, kind, payload)
+        self.cache.set(k, entry if self.serializer is None else self.serializer.dumps(entry), cache_ttl)
+
+    def compute(self, k, args, kwargs):
+        try:
+            value = self.func(*args, **kwargs)
+        except self.errors as e:
+            if self.negative_ttl is not None:
+                self.store(k, self.negative_ttl, _ERROR, e)
+            raise
+
+        if value is not None:
+            self.store(k, self.ttl, _VALUE, value)
+        elif self.negative_ttl is not None:
+            self.store(k, self.negative_ttl, _VALUE, None)
+
+        return value
+
+    def begin(self, k):
+        """Returns the flight computing `k` and whether the caller has to run it."""
+        with self.flights_lock:
+            flight = self.flights.get(k)
+            if flight is not None:
+                return flight, False
+
+            flight = self.flights[k] = _Flight()
+            return flight, True
+
+    def run(self, k, flight, args, kwargs):
+        try:
+            flight.result = self.compute(k, args, kwargs)
+        except BaseException as e:
+            flight.error = e
+        finally:
+            with self.flights_lock:
+                del self.flights[k]
+            flight.done.set()
+
+    def refresh(self, k, args, kwargs):
+        flight, leader = self.begin(k)
+        if leader:
+            threading.Thread(target=self.run, args=(k, flight, args, kwargs), daemon=True).start()
+
+    def call(self, args, kwargs):
+        k = self.make_key(*args, **kwargs)
+
+        entry = self.load(k)
+        if entry is not None:
+            fresh_until, kind, payload = entry
+            if fresh_until is not None and fresh_until <= time.time():
+                self.refresh(k, args, kwargs)
+            if kind == _ERROR:
+                # raised again on every hit; without dropping the last traceback it grows by each raise
+                raise payload.with_traceback(None)
+            return payload
+
+        flight, leader = self.begin(k)
+        if leader:
+            self.run(k, flight, args, kwargs)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+
+        return flight.result
+
+
+def cached(cache, ttl=None, key=None, stale_ttl=0, negative_ttl=None, errors=(), serializer=None):
+    """
+    Memoizes a function in `cache`, any `avdal.cache.Cache`, for `ttl`
+    seconds (forever if None). `key` builds the cache key from the call's
+    arguments; by default it is the function's qualified name and the repr of
+    its arguments, which must not be the default `object` repr: that is an
+    address, not shared across processes and reused by other objects, so
+    methods need a `key` that says what about `self` matters.
+
+    Concurrent calls for a missing key in this process wait for a single call
+    of the function (single-flight). For `stale_ttl` seconds after an entry
+    goes stale, callers get the stale value while one background thread
+    recomputes it. With `negative_ttl`, None results and exceptions of the
+    types in `errors` are cached for that long, and the exceptions re-raised.
+
+    Entries are stored as a (fresh until, kind, value) triple; caches that
+    only store bytes, like `RedisCache`, need a `serializer` with `dumps` and
+    `loads`, such as `pickle` (or `json` when no exceptions are cached).
+    """
+
+    def decorator(func):
+        memo = _Memo(func, cache, ttl, key, stale_ttl, negative_ttl, errors, serializer)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return memo.call(args, kwargs)
+
+        return wrapper
+
+    return decorator
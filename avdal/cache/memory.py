@@ -1,59 +1,370 @@
 import time
+import sys
+import heapq
+import itertools
 import threading
-from . import Cache
+from collections import OrderedDict
+from . import Cache, AsyncCache
 
 
 class MemoryCache(Cache):
-    def __init__(self, autocleanup=True):
+    """
+    An in-memory cache. Expiry times are kept in a min-heap, so `cleanup`
+    only touches keys that have expired, and `get` drops an expired key when
+    it finds one. With `autocleanup`, a daemon thread runs `cleanup` every
+    `interval` seconds until `close` is called.
+    """
+
+    def __init__(self, autocleanup=True, interval=5):
         self.cache = {}
+        self.expiry = []
+        self.sequence = itertools.count()
         self.lock = threading.RLock()
+        self.closed = threading.Event()
+        self.cleanup_thread = None
 
         if autocleanup:
             def cleanup_loop():
-                while True:
+                while not self.closed.wait(interval):
                     self.cleanup()
-                    time.sleep(5)
 
-            self.cleanup_thread = threading.Thread(target=cleanup_loop)
+            self.cleanup_thread = threading.Thread(target=cleanup_loop, daemon=True)
             self.cleanup_thread.start()
 
-    def get(self, key):
-        self.lock.acquire()
-        value, ttl = self.cache.get(key, (None, None))
-        self.lock.release()
+    def close(self):
+        self.closed.set()
+
+        if self.cleanup_thread is not None:
+            self.cleanup_thread.join()
 
-        if ttl and ttl < int(time.time()):
+    def _get(self, key, now):
+        value, exp = self.cache.get(key, (None, None))
+
+        if exp and exp < now:
+            del self.cache[key]
             return None
 
         return value
 
+    def _set(self, key, value, exp):
+        self.cache[key] = (value, exp)
+
+        if exp is not None:
+            heapq.heappush(self.expiry, (exp, next(self.sequence), key))
+            if len(self.expiry) > 2 * len(self.cache) + 64:
+                self._compact()
+
+    def _incr(self, key, amount, now, ttl=None):
+        if self._get(key, now) is None:
+            self._set(key, amount, None if ttl is None else now + ttl)
+        else:
+            self.cache[key] = (self.cache[key][0] + amount, self.cache[key][1])
+
+        return self.cache[key][0]
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key, int(time.time()))
+
+    def get_many(self, keys):
+        now = int(time.time())
+
+        with self.lock:
+            return [self._get(key, now) for key in keys]
+
     def set(self, key, value, ttl=None):
         exp = None
 
         if ttl is not None:
             exp = int(time.time()) + ttl
 
-        self.lock.acquire()
-        self.cache[key] = (value, exp)
-        self.lock.release()
+        with self.lock:
+            self._set(key, value, exp)
 
-    def incr(self, key, amount=1):
-        self.lock.acquire()
+    def set_many(self, items, ttl=None):
+        now = int(time.time())
 
-        if key in self.cache:
-            self.cache[key] = (self.cache[key][0] + amount, self.cache[key][1])
-        else:
-            self.cache[key] = (amount, None)
+        with self.lock:
+            for key, value in items.items():
+                key_ttl = ttl.get(key) if isinstance(ttl, dict) else ttl
+                self._set(key, value, None if key_ttl is None else now + key_ttl)
+
+    def incr(self, key, amount=1, ttl=None):
+        with self.lock:
+            return self._incr(key, amount, int(time.time()), ttl)
+
+    def update(self, key, fn, ttl=None):
+        """
+        Atomically replaces the value of `key` with `new` where `fn(value)`,
+        called with None for a missing key, returns `(new, result)`, and
+        returns `result`. The new value expires after `ttl` seconds.
+        """
+        now = int(time.time())
 
-        self.lock.release()
+        with self.lock:
+            value, result = fn(self._get(key, now))
+            self._set(key, value, None if ttl is None else now + ttl)
+
+            return result
+
+    def incr_many(self, amounts):
+        now = int(time.time())
+
+        with self.lock:
+            return [self._incr(key, amount, now) for key, amount in amounts.items()]
+
+    def delete(self, key):
+        with self.lock:
+            self.cache.pop(key, None)
+
+    def delete_many(self, keys):
+        with self.lock:
+            for key in keys:
+                self.cache.pop(key, None)
+
+    def _compact(self):
+        """Rebuilds the heap without the entries of keys that were set again or deleted."""
+        self.expiry = [(exp, next(self.sequence), key) for key, (_, exp) in self.cache.items() if exp is not None]
+        heapq.heapify(self.expiry)
 
     def cleanup(self):
         now = int(time.time())
 
-        self.lock.acquire()
+        with self.lock:
+            while self.expiry and self.expiry[0][0] < now:
+                exp, _, key = heapq.heappop(self.expiry)
+
+                # the key may have been set again since this entry was pushed
+                if key in self.cache and self.cache[key][1] == exp:
+                    del self.cache[key]
+
+
+class AsyncMemoryCache(AsyncCache):
+    """
+    A `MemoryCache` for asyncio code. Operations never wait, so they run on
+    the event loop directly; instead of a cleanup thread, expired keys are
+    swept by `set` calls at most once every `interval` seconds.
+    """
+
+    def __init__(self, interval=5):
+        self.cache = MemoryCache(autocleanup=False)
+        self.interval = interval
+        self.last_cleanup = time.monotonic()
+
+    def _maybe_cleanup(self):
+        now = time.monotonic()
+
+        if now - self.last_cleanup >= self.interval:
+            self.last_cleanup = now
+            self.cache.cleanup()
+
+    async def get(self, key):
+        return self.cache.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.cache.set(key, value, ttl)
+        self._maybe_cleanup()
+
+    async def incr(self, key, amount=1, ttl=None):
+        return self.cache.incr(key, amount, ttl)
+
+    async def update(self, key, fn, ttl=None):
+        return self.cache.update(key, fn, ttl)
+
+    async def delete(self, key):
+        self.cache.delete(key)
+
+    async def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    async def set_many(self, items, ttl=None):
+        self.cache.set_many(items, ttl)
+        self._maybe_cleanup()
+
+    async def incr_many(self, amounts):
+        return self.cache.incr_many(amounts)
+
+    async def delete_many(self, keys):
+        self.cache.delete_many(keys)
+
+
+# the fewest entries and bytes a segment of a bounded ShardedMemoryCache is given
+MIN_SHARD_ENTRIES = 1024
+MIN_SHARD_BYTES = 4 << 20
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "bytes", "hits", "misses", "evictions", "expirations")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class ShardedMemoryCache(Cache):
+    """
+    An in-memory cache split into `shards` segments by key hash, each behind
+    its own lock, so threads working on different keys rarely wait on each
+    other. Each segment holds at most its share of `max_entries` entries and
+    `max_bytes` bytes, as measured by `sizeof` on keys and values (sizes are
+    only tracked when `max_bytes` is set), and evicts
+    its least recently used entries to stay within them. Expired entries are
+    dropped when they are read or evicted; there is no cleanup thread.
+
+    Since keys do not spread over the segments perfectly evenly, a segment
+    can start evicting before the whole cache is full, so the bounds are
+    approximate. To keep that small, a `max_entries` bound gets at most one
+    segment per `MIN_SHARD_ENTRIES` entries and a `max_bytes` bound at most
+    one per `MIN_SHARD_BYTES` bytes; bounds under twice that get a single
+    segment, an exact LRU. An entry bigger than a segment's share of
+    `max_bytes` is not stored and counts as an eviction; that share is at
+    least `MIN_SHARD_BYTES`, or the whole bound when it is smaller.
+    """
+
+    def __init__(self, shards=16, max_entries=None, max_bytes=None, sizeof=sys.getsizeof):
+        if max_entries is not None:
+            shards = max(1, min(shards, max_entries // MIN_SHARD_ENTRIES))
+        if max_bytes is not None:
+            shards = max(1, min(shards, max_bytes // MIN_SHARD_BYTES))
+
+        self.shards = [_Shard() for _ in range(shards)]
+        self.max_entries = None if max_entries is None else max(1, -(-max_entries // shards))
+        self.max_bytes = None if max_bytes is None else max(1, -(-max_bytes // shards))
+        self.sizeof = sizeof
+
+    def shard(self, key):
+        return self.shards[hash(key) % len(self.shards)]
+
+    def _get(self, shard, key, now):
+        entry = shard.entries.get(key)
+        if entry is None:
+            shard.misses += 1
+            return None
+
+        value, exp, size = entry
+        if exp is not None and exp <= now:
+            del shard.entries[key]
+            shard.bytes -= size
+            shard.expirations += 1
+            shard.misses += 1
+            return None
+
+        shard.entries.move_to_end(key)
+        shard.hits += 1
+
+        return value
+
+    def get(self, key):
+        shard = self.shard(key)
+
+        with shard.lock:
+            return self._get(shard, key, time.monotonic())
+
+    def get_many(self, keys):
+        """Looks up `keys` taking each segment's lock once."""
+        keys = list(keys)
+        values = [None] * len(keys)
+        by_shard = {}
+        now = time.monotonic()
+
+        for i, key in enumerate(keys):
+            by_shard.setdefault(hash(key) % len(self.shards), []).append(i)
+
+        for n, indexes in by_shard.items():
+            shard = self.shards[n]
+            with shard.lock:
+                for i in indexes:
+                    values[i] = self._get(shard, keys[i], now)
+
+        return values
+
+    def _store(self, shard, key, value, exp):
+        size = 0 if self.max_bytes is None else self.sizeof(key) + self.sizeof(value)
+
+        old = shard.entries.pop(key, None)
+        if old is not None:
+            shard.bytes -= old[2]
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            shard.evictions += 1
+            return
+
+        shard.entries[key] = (value, exp, size)
+        shard.bytes += size
+
+        while (self.max_entries is not None and len(shard.entries) > self.max_entries
+               or self.max_bytes is not None and shard.bytes > self.max_bytes):
+            _, (_, old_exp, old_size) = shard.entries.popitem(last=False)
+            shard.bytes -= old_size
+            if old_exp is not None and old_exp <= time.monotonic():
+                shard.expirations += 1
+            else:
+                shard.evictions += 1
+
+    def set(self, key, value, ttl=None):
+        exp = None if ttl is None else time.monotonic() + ttl
+        shard = self.shard(key)
+
+        with shard.lock:
+            self._store(shard, key, value, exp)
+
+    def incr(self, key, amount=1, ttl=None):
+        shard = self.shard(key)
+        now = time.monotonic()
+
+        with shard.lock:
+            value, exp, _ = shard.entries.get(key, (0, None, 0))
+            if exp is not None and exp <= now or key not in shard.entries:
+                value, exp = 0, None if ttl is None else now + ttl
+
+            value += amount
+            self._store(shard, key, value, exp)
+
+            return value
+
+    def update(self, key, fn, ttl=None):
+        """Like `MemoryCache.update`, under the lock of the key's segment only."""
+        shard = self.shard(key)
+        now = time.monotonic()
+
+        with shard.lock:
+            value, result = fn(self._get(shard, key, now))
+            self._store(shard, key, value, None if ttl is None else now + ttl)
+
+            return result
+
+    def delete(self, key):
+        shard = self.shard(key)
+
+        with shard.lock:
+            entry = shard.entries.pop(key, None)
+            if entry is not None:
+                shard.bytes -= entry[2]
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self.shards)
+
+    def clear(self):
+        for shard in self.shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes = 0
+
+    def stats(self):
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "entries": 0, "bytes": 0}
 
-        for key, (_, exp) in list(self.cache.items()):
-            if exp and exp < now:
-                del self.cache[key]
+        for shard in self.shards:
+            with shard.lock:
+                stats["hits"] += shard.hits
+                stats["misses"] += shard.misses
+                stats["evictions"] += shard.evictions
+                stats["expirations"] += shard.expirations
+                stats["entries"] += len(shard.entries)
+                stats["bytes"] += shard.bytes
 
-        self.lock.release()
+        return stats
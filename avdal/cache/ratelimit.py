@@ -0,0 +1,157 @@
+import math
+import time
+import uuid
+from collections import deque, namedtuple
+
+Decision = namedtuple("Decision", ["allowed", "remaining", "retry_after"])
+
+SLIDING_LOG_SCRIPT = """
+local now, window, limit, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count + cost > limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local retry = window
+    if oldest[2] then
+        retry = tonumber(oldest[2]) + window - now
+    end
+    return {0, limit - count, tostring(retry)}
+end
+for i = 1, cost do
+    redis.call('ZADD', KEYS[1], now, ARGV[5] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return {1, limit - count - cost, '0'}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local now, rate, capacity, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(state[1]) or capacity
+local at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(tokens), tostring(retry)}
+"""
+
+
+class _Limiter:
+    """
+    Runs each check in one atomic step: as a Lua script on a `RedisCache`,
+    or through `update`/`incr` on a memory cache, which hold the (segment)
+    lock for a constant amount of work.
+    """
+
+    script = None
+
+    def __init__(self, cache, prefix):
+        self.cache = cache
+        self.prefix = prefix
+        self.redis_script = None
+
+        if not hasattr(cache, "update"):
+            if not hasattr(cache, "client"):
+                raise TypeError(f"{type(cache).__name__}: expected a memory cache or a RedisCache")
+            if self.script is not None:
+                self.redis_script = cache.client.register_script(self.script)
+
+    def hit(self, key, cost=1) -> Decision:
+        raise NotImplementedError
+
+
+class FixedWindow(_Limiter):
+    """Allows `limit` hits per key in each window of `window` seconds."""
+
+    def __init__(self, cache, limit, window, prefix="ratelimit:fw:"):
+        super().__init__(cache, prefix)
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key, cost=1):
+        now = time.time()
+        index = int(now // self.window)
+        count = self.cache.incr(f"{self.prefix}{key}:{index}", cost, ttl=self.window)
+
+        if count <= self.limit:
+            return Decision(True, self.limit - count, 0.0)
+
+        return Decision(False, 0, (index + 1) * self.window - now)
+
+
+class SlidingLog(_Limiter):
+    """
+    Allows `limit` hits per key in any `window` seconds, keeping the time of
+    every allowed hit.
+    """
+
+    script = SLIDING_LOG_SCRIPT
+
+    def __init__(self, cache, limit, window, prefix="ratelimit:sl:"):
+        super().__init__(cache, prefix)
+        self.limit = limit
+        self.window = window
+
+    def hit(self, key, cost=1):
+        now = time.time()
+        k = f"{self.prefix}{key}"
+
+        if self.redis_script is not None:
+            args = [now, self.window, self.limit, cost, uuid.uuid4().hex]
+            allowed, remaining, retry = self.redis_script(keys=[k], args=args)
+            return Decision(bool(allowed), max(int(remaining), 0), float(retry))
+
+        def step(log):
+            log = log if log is not None else deque()
+            while log and log[0] <= now - self.window:
+                log.popleft()
+
+            if len(log) + cost > self.limit:
+                retry = log[0] + self.window - now if log else self.window
+                return log, Decision(False, max(self.limit - len(log), 0), retry)
+
+            log.extend([now] * cost)
+            return log, Decision(True, self.limit - len(log), 0.0)
+
+        return self.cache.update(k, step, ttl=math.ceil(self.window))
+
+
+class TokenBucket(_Limiter):
+    """
+    Refills each key's bucket of `capacity` tokens at `rate` tokens per
+    second; a hit takes `cost` tokens if the bucket has them.
+    """
+
+    script = TOKEN_BUCKET_SCRIPT
+
+    def __init__(self, cache, rate, capacity, prefix="ratelimit:tb:"):
+        super().__init__(cache, prefix)
+        self.rate = rate
+        self.capacity = capacity
+
+    def hit(self, key, cost=1):
+        now = time.time()
+        k = f"{self.prefix}{key}"
+
+        if self.redis_script is not None:
+            allowed, tokens, retry = self.redis_script(keys=[k], args=[now, self.rate, self.capacity, cost])
+            return Decision(bool(allowed), int(float(tokens)), float(retry))
+
+        def step(state):
+            tokens, at = state if state is not None else (self.capacity, now)
+            tokens = min(self.capacity, tokens + max(0.0, now - at) * self.rate)
+
+            if tokens < cost:
+                return (tokens, now), Decision(False, int(tokens), (cost - tokens) / self.rate)
+
+            return (tokens - cost, now), Decision(True, int(tokens - cost), 0.0)
+
+        return self.cache.update(k, step, ttl=math.ceil(self.capacity / self.rate))
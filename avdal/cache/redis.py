@@ -1,5 +1,19 @@
 import redis
-from . import Cache
+import redis.asyncio
+from . import Cache, AsyncCache
+
+# INCRBY that sets the expiry of a key it creates, in one round trip
+INCR_SCRIPT = """
+local value = redis.call('INCRBY', KEYS[1], ARGV[1])
+if ARGV[2] ~= '' and redis.call('PTTL', KEYS[1]) == -1 and value == tonumber(ARGV[1]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return value
+"""
+
+
+def _ttl_ms(ttl):
+    return "" if ttl is None else int(ttl * 1000)
 
 
 class RedisCache(Cache):
@@ -8,11 +22,122 @@ class RedisCache(Cache):
         self.port = port
         self.client = redis.Redis(host=self.host, port=self.port, password=pwd)
 
-    def incr(self, key, amount=1):
-        return self.client.incr(key, amount)
+    def incr(self, key, amount=1, ttl=None):
+        if ttl is None:
+            return self.client.incr(key, amount)
+
+        return self.client.eval(INCR_SCRIPT, 1, key, amount, _ttl_ms(ttl))
 
     def set(self, key, value, ttl=None):
         self.client.set(key, value, ttl)
 
     def get(self, key):
         return self.client.get(key)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+
+        return self.client.mget(keys)
+
+    def set_many(self, items, ttl=None):
+        if not isinstance(ttl, dict):
+            if ttl is None and items:
+                self.client.mset(items)
+                return
+            ttl = dict.fromkeys(items, ttl)
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, ttl.get(key))
+        pipe.execute()
+
+    def incr_many(self, amounts):
+        pipe = self.client.pipeline(transaction=False)
+        for key, amount in amounts.items():
+            pipe.incr(key, amount)
+
+        return pipe.execute()
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            self.client.delete(*keys)
+
+
+class AsyncRedisCache(AsyncCache):
+    """
+    A `RedisCache` for asyncio code on `redis.asyncio`. The connections come
+    from a pool of at most `max_connections`; the timeouts are in seconds and
+    `pool_kwargs` are passed on to `redis.asyncio.ConnectionPool`.
+    """
+
+    def __init__(self, host, port, pwd, max_connections=None, socket_timeout=None, socket_connect_timeout=None,
+                 health_check_interval=0, **pool_kwargs):
+        self.host = host
+        self.port = port
+        self.pool = redis.asyncio.ConnectionPool(
+            host=host,
+            port=port,
+            password=pwd,
+            max_connections=max_connections,
+            socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout,
+            health_check_interval=health_check_interval,
+            **pool_kwargs,
+        )
+        self.client = redis.asyncio.Redis(connection_pool=self.pool)
+
+    async def close(self):
+        await self.client.aclose()
+        await self.pool.disconnect()
+
+    async def incr(self, key, amount=1, ttl=None):
+        if ttl is None:
+            return await self.client.incr(key, amount)
+
+        return await self.client.eval(INCR_SCRIPT, 1, key, amount, _ttl_ms(ttl))
+
+    async def set(self, key, value, ttl=None):
+        await self.client.set(key, value, ttl)
+
+    async def get(self, key):
+        return await self.client.get(key)
+
+    async def delete(self, key):
+        await self.client.delete(key)
+
+    async def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return []
+
+        return await self.client.mget(keys)
+
+    async def set_many(self, items, ttl=None):
+        if not isinstance(ttl, dict):
+            if ttl is None and items:
+                await self.client.mset(items)
+                return
+            ttl = dict.fromkeys(items, ttl)
+
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, ttl.get(key))
+        await pipe.execute()
+
+    async def incr_many(self, amounts):
+        pipe = self.client.pipeline(transaction=False)
+        for key, amount in amounts.items():
+            pipe.incr(key, amount)
+
+        return await pipe.execute()
+
+    async def delete_many(self, keys):
+        keys = list(keys)
+        if keys:
+            await self.client.delete(*keys)
@@ -0,0 +1,147 @@
+import uuid
+import threading
+from . import Cache
+from .memory import ShardedMemoryCache
+
+INVALIDATION_CHANNEL = "avdal:cache:invalidate"
+
+
+class TieredCache(Cache):
+    """
+    A near cache: a bounded in-process L1 of at most `max_entries` entries in
+    front of `l2`, a `RedisCache`. Reads fill L1 for `l1_ttl` seconds; writes
+    go through to L2 and are published on `channel`, so that every other
+    `TieredCache` on the same Redis drops its L1 copy of the key. L1 copies
+    can be stale for at most `l1_ttl` seconds if a message is lost.
+    """
+
+    def __init__(self, l2, l1_ttl=5, max_entries=10000, channel=INVALIDATION_CHANNEL, invalidate=True):
+        self.l1 = ShardedMemoryCache(max_entries=max_entries)
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+        self.channel = channel
+        self.id = uuid.uuid4().hex
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.pubsub = None
+        self.listener = None
+
+        if invalidate:
+            self.pubsub = l2.client.pubsub(ignore_subscribe_messages=True)
+            self.pubsub.subscribe(**{channel: self._on_invalidate})
+            self.listener = self.pubsub.run_in_thread(sleep_time=0.01, daemon=True)
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener.join()
+            self.pubsub.close()
+
+    def _on_invalidate(self, message):
+        data = message["data"]
+        if isinstance(data, bytes):
+            data = data.decode()
+
+        sender, _, keys = data.partition(":")
+        if sender == self.id:
+            return
+
+        self._drop(keys.split("\0"))
+
+    def _drop(self, keys):
+        # a read that went to L2 before this must not fill L1 with what it got
+        with self.lock:
+            self.generation += 1
+            self.l1.delete_many(keys)
+
+    def _publish(self, keys):
+        if self.pubsub is not None:
+            self.l2.client.publish(self.channel, f"{self.id}:" + "\0".join(map(str, keys)))
+
+    def _fill(self, generation, items):
+        # skip the fill if a write or an invalidation happened while L2 was being read
+        with self.lock:
+            if generation != self.generation:
+                return
+
+            for key, value in items.items():
+                self.l1.set(key, value, self.l1_ttl)
+
+    def get(self, key):
+        return self.get_many([key])[0]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        values = self.l1.get_many(keys)
+        missing = [i for i, value in enumerate(values) if value is None]
+
+        if missing:
+            generation = self.generation
+            found = self.l2.get_many([keys[i] for i in missing])
+            hits = {}
+
+            for i, value in zip(missing, found):
+                values[i] = value
+                if value is not None:
+                    hits[keys[i]] = value
+
+            with self.lock:
+                self.l2_hits += len(hits)
+                self.l2_misses += len(missing) - len(hits)
+            self._fill(generation, hits)
+
+        return values
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items, ttl=None):
+        self.l2.set_many(items, ttl)
+        # dropped rather than filled, so that L1 holds what L2 returns (bytes)
+        self._drop(items)
+        self._publish(items)
+
+    def incr(self, key, amount=1, ttl=None):
+        value = self.l2.incr(key, amount, ttl)
+        self._drop([key])
+        self._publish([key])
+
+        return value
+
+    def incr_many(self, amounts):
+        values = self.l2.incr_many(amounts)
+        self._drop(amounts)
+        self._publish(amounts)
+
+        return values
+
+    def delete(self, key):
+        self.delete_many([key])
+
+    def delete_many(self, keys):
+        keys = list(keys)
+        self.l2.delete_many(keys)
+        self._drop(keys)
+        self._publish(keys)
+
+    def stats(self):
+        l1 = self.l1.stats()
+        l1_lookups = l1["hits"] + l1["misses"]
+        l2_lookups = self.l2_hits + self.l2_misses
+
+        return {
+            "l1": {
+                "hits": l1["hits"],
+                "misses": l1["misses"],
+                "hit_rate": l1["hits"] / l1_lookups if l1_lookups else 0.0,
+                "entries": l1["entries"],
+                "evictions": l1["evictions"],
+            },
+            "l2": {
+                "hits": self.l2_hits,
+                "misses": self.l2_misses,
+                "hit_rate": self.l2_hits / l2_lookups if l2_lookups else 0.0,
+            },
+        }
@@ -0,0 +1,13 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+def prefetch(*clients):
+    """
+    Runs the `prefetch` of every client at once, e.g. at startup, so that
+    their first reads do not wait on the network one after another.
+    """
+    if not clients:
+        return clients
+
+    with ThreadPoolExecutor(max_workers=len(clients)) as pool:
+        return tuple(pool.map(lambda client: client.prefetch(), clients))
@@ -0,0 +1,106 @@
+import asyncio
+from .iam import token_endpoint
+from .configs import role_uri
+from .globals import PERMA_URL
+from ..env import Environment
+from ..auth.token import AsyncTokenProvider
+from ..http.aio import shared_client
+from typing import TypeVar, Dict, Iterable
+
+T = TypeVar('T')
+
+
+class _AsyncClient:
+    def __init__(self, client=None):
+        self.client = client
+
+    def _client(self):
+        # the shared client is looked up per call, as it belongs to the running loop
+        return self.client or shared_client()
+
+
+class AsyncIAM(_AsyncClient):
+    def __init__(self, env: Environment, client=None):
+        super().__init__(client)
+        self.client_id = env.get("IAM_CLIENT_ID")
+        self.client_secret = env.get("IAM_CLIENT_SECRET")
+
+        self.token_endpoint = token_endpoint(env)
+        self.tokens = AsyncTokenProvider.shared(self.token_endpoint, self.client_id, self.client_secret,
+                                                client=client)
+
+    async def access_token(self):
+        return await self.tokens.access_token()
+
+
+class AsyncConfigs(_AsyncClient):
+    def __init__(self, env: Environment, client=None, concurrency=8):
+        super().__init__(client)
+        self.iam = AsyncIAM(env, client)
+        self.role_uri = role_uri(env)
+        self.concurrency = concurrency
+
+    async def load_role(self, name) -> Dict[str, T]:
+        token = await self.iam.access_token()
+        res = await self._client().get(self.role_uri.format(name), headers={
+            "Authorization": f"Bearer {token}",
+        })
+
+        if res.is_error:
+            raise Exception(res.json())
+
+        return res.json()
+
+    async def load_roles(self, names: Iterable[str], concurrency=None) -> Dict[str, Dict[str, T]]:
+        """Loads the configs of many roles, at most `concurrency` at a time."""
+        names = list(dict.fromkeys(names))
+        limit = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def load(name):
+            async with limit:
+                return await self.load_role(name)
+
+        return dict(zip(names, await asyncio.gather(*map(load, names))))
+
+
+class AsyncGlobals(_AsyncClient):
+    """
+    Fetches the globals on first use, or on `load()`. Like the shared token
+    providers, it can be used from several event loops, so its lock is kept
+    per loop.
+    """
+
+    def __init__(self, client=None, url=PERMA_URL):
+        super().__init__(client)
+        self.url = url
+        self.globals = None
+        self.vars = None
+        self.locks = {}
+
+    def _lock(self):
+        loop = asyncio.get_running_loop()
+
+        lock = self.locks.get(loop)
+        if lock is None:
+            # the locks of closed loops hold on to them; let them go
+            for closed in [other for other in list(self.locks) if other.is_closed()]:
+                self.locks.pop(closed, None)
+            lock = self.locks[loop] = asyncio.Lock()
+
+        return lock
+
+    async def load(self):
+        async with self._lock():
+            if self.globals is None:
+                res = await self._client().get(self.url)
+                res.raise_for_status()
+                self.globals = res.json()
+                self.vars = self.globals["vars"]
+
+        return self
+
+    async def get_var(self, name, default=None):
+        if self.vars is None:
+            await self.load()
+
+        return self.vars.get(name, default)
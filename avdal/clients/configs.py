@@ -1,26 +1,59 @@
-import requests as req
 from .iam import IAM
+from ..http.transport import session_for
 from ..env import Environment
-from typing import TypeVar, Dict
+from typing import TypeVar, Dict, Iterable
+from concurrent.futures import ThreadPoolExecutor
 
 T = TypeVar('T')
 
 
+def role_uri(env: Environment):
+    configs_protocol = env.get("CONFIGS_PROTOCOL", default="https")
+    configs_host = env.get("CONFIGS_HOST", default="configs.avd.al")
+
+    return f"{configs_protocol}://{configs_host}/api/v1/roles/{{}}/configs"
+
+
 class Configs:
-    def __init__(self, env: Environment):
-        iam = IAM(env)
-        configs_protocol = env.get("CONFIGS_PROTOCOL", default="https")
-        configs_host = env.get("CONFIGS_HOST", default="configs.avd.al")
+    def __init__(self, env: Environment, session=None, cache=None):
+        """
+        `cache` is an optional `avdal.http.cache.ResponseCache` for the role
+        configs. Nothing is fetched until a role is loaded or `prefetch` runs.
+        """
+        self.iam = IAM(env, session)
+        self.role_uri = role_uri(env)
+        self.session = session or session_for(self.role_uri)
+        self.cache = cache
 
-        self.role_uri = f"{configs_protocol}://{configs_host}/api/v1/roles/{{}}/configs"
-        self.token = iam.access_token()
+    @property
+    def token(self):
+        return self.iam.access_token()
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
 
     def load_role(self, name) -> Dict[str, T]:
-        res = req.get(self.role_uri.format(name), headers={
-            "Authorization": f"Bearer {self.token}",
-        })
+        if self.cache is not None:
+            return self.cache.get(self.role_uri.format(name), headers=self._headers)
+
+        res = self.session.get(self.role_uri.format(name), headers=self._headers())
 
         if not res.ok:
             raise Exception(res.json())
 
         return res.json()
+
+    def load_roles(self, names: Iterable[str], concurrency=8) -> Dict[str, Dict[str, T]]:
+        """Loads the configs of many roles, at most `concurrency` at a time."""
+        names = list(dict.fromkeys(names))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(names)))) as pool:
+            return dict(zip(names, pool.map(self.load_role, names)))
+
+    def prefetch(self, roles=()):
+        """Fetches the token and then `roles`, which only pays off with a `cache`."""
+        self.iam.prefetch()
+        if roles:
+            self.load_roles(roles)
+
+        return self
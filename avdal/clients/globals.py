@@ -1,12 +1,37 @@
-import requests
+import threading
+from ..http.transport import session_for
 
 PERMA_URL = "https://avd.al/globals.json"
 
 
 class Globals:
-    def __init__(self):
-        self.globals = requests.get(PERMA_URL).json()
-        self.vars = self.globals["vars"]
+    """Fetches the globals on first use, or on `prefetch()`."""
+
+    def __init__(self, session=None, cache=None):
+        self.session = session
+        self.cache = cache
+        self.lock = threading.Lock()
+        self._globals = None
+
+    @property
+    def globals(self):
+        if self._globals is None:
+            with self.lock:
+                if self._globals is None:
+                    if self.cache is not None:
+                        self._globals = self.cache.get(PERMA_URL)
+                    else:
+                        self._globals = (self.session or session_for(PERMA_URL)).get(PERMA_URL).json()
+
+        return self._globals
+
+    @property
+    def vars(self):
+        return self.globals["vars"]
+
+    def prefetch(self):
+        self.globals
+        return self
 
     def get_var(self, name, default=None):
         return self.vars.get(name, default)
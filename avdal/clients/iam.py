@@ -1,27 +1,27 @@
-import requests
 from ..env import Environment
+from ..auth.token import TokenProvider
 
 
-class IAM:
-    def __init__(self, env: Environment):
-        realm = env.get("IAM_REALM")
-        host = env.get("IAM_HOST", default="iam.avd.al")
-        protocol = env.get("IAM_PROTOCOL", default="https")
+def token_endpoint(env: Environment):
+    realm = env.get("IAM_REALM")
+    host = env.get("IAM_HOST", default="iam.avd.al")
+    protocol = env.get("IAM_PROTOCOL", default="https")
+
+    return f"{protocol}://{host}/auth/realms/{realm}/protocol/openid-connect/token"
+
 
+class IAM:
+    def __init__(self, env: Environment, session=None):
         self.client_id = env.get("IAM_CLIENT_ID")
         self.client_secret = env.get("IAM_CLIENT_SECRET")
 
-        self.token_endpoint = f"{protocol}://{host}/auth/realms/{realm}/protocol/openid-connect/token"
+        self.token_endpoint = token_endpoint(env)
+        self.tokens = TokenProvider.shared(self.token_endpoint, self.client_id, self.client_secret,
+                                           session=session)
 
     def access_token(self):
-        h = {
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
-
-        d = f"grant_type=client_credentials&client_id={self.client_id}&client_secret={self.client_secret}"
-        response = requests.request("POST", self.token_endpoint, headers=h, data=d)
-
-        if not response.ok:
-            raise Exception(response.json())
+        return self.tokens.access_token()
 
-        return response.json()["access_token"]
+    def prefetch(self):
+        self.access_token()
+        return self
@@ -1,8 +1,40 @@
 import os
 import json
+import time
+import uuid
+import queue
+import random
 import hashlib
+import threading
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import Mail, Personalization, From, To
+from ..cache.memory import ShardedMemoryCache
+from ..cache.ratelimit import TokenBucket
+
+# the most personalizations SendGrid accepts in one request
+MAX_PERSONALIZATIONS = 1000
+
+
+def _address(value):
+    """
+    Returns an address given as a string, an (email, name) tuple or an Email
+    as an [email, name] pair, which survives a round trip through JSON.
+    """
+    if isinstance(value, str):
+        return [value, None]
+    if hasattr(value, "email"):
+        return [value.email, value.name]
+
+    email, name = (list(value) + [None])[:2]
+    return [email, name]
+
+
+def _addresses(value):
+    """Returns one address or a list of them as a list of [email, name] pairs."""
+    if isinstance(value, list):
+        return [_address(v) for v in value]
+
+    return [_address(value)]
 
 
 class SendgridEmailer:
@@ -10,53 +42,265 @@ class SendgridEmailer:
                  deadletter_dir: str = None,
                  liveletter_dir: str = None,
                  logger=None,
-                 noop: bool = False):
+                 noop: bool = False,
+                 host: str = None):
 
         assert api_key, "API key is required"
 
-        self.client = SendGridAPIClient(api_key)
+        self.client = SendGridAPIClient(api_key, host=host) if host else SendGridAPIClient(api_key)
         self.deadletter_dir = deadletter_dir
         self.liveletter_dir = liveletter_dir
         self.logger = logger
         self.noop = noop
 
-        os.makedirs(self.deadletter_dir, exist_ok=True)
-        os.makedirs(self.liveletter_dir, exist_ok=True)
+        for dir in [self.deadletter_dir, self.liveletter_dir]:
+            if dir:
+                os.makedirs(dir, exist_ok=True)
 
-    def save_letter(self, email: Mail, dir: str) -> None:
-        encoded = json.dumps(email.get(), sort_keys=True).encode()
+    def save_letter(self, email, dir: str) -> None:
+        letter = email if isinstance(email, dict) else email.get()
+        encoded = json.dumps(letter, sort_keys=True).encode()
         hash = hashlib.md5(encoded).hexdigest()
         filename = os.path.join(dir, f"{hash}.json")
 
         try:
             with open(filename, "w") as f:
-                json.dump(email.get(), f, indent=4)
+                json.dump(letter, f, indent=4)
         except Exception as e:
             if self.logger:
                 self.logger.error(e)
 
+    def _deliver(self, email) -> bool:
+        try:
+            if not self.noop:
+                self.client.send(email)
+            return True
+        except Exception as e:
+            if self.logger:
+                self.logger.error(e)
+            return False
+
     def send_email(self, sender, receiver, subject, body) -> bool:
         if self.logger:
-            self.logger.info(f"Sending email. Body=[{body}]")
+            self.logger.info(f"Sending email. Subject=[{subject}]")
 
         email = Mail(from_email=sender,
                      to_emails=receiver,
                      subject=subject,
                      plain_text_content=body)
 
+        if not self._deliver(email):
+            if self.deadletter_dir:
+                self.save_letter(email, self.deadletter_dir)
+            return False
+
+        if self.logger:
+            self.logger.info(f"Sent an email.")
+        if self.liveletter_dir:
+            self.save_letter(email, self.liveletter_dir)
+
+        return True
+
+    def replay_deadletters(self):
+        """
+        Sends every letter in `deadletter_dir` again, removing the ones that
+        go through. Returns the number sent and the number that failed again.
+        """
+        sent = failed = 0
+
+        for name in sorted(os.listdir(self.deadletter_dir)):
+            path = os.path.join(self.deadletter_dir, name)
+            if not name.endswith(".json"):
+                continue
+
+            with open(path) as f:
+                letter = json.load(f)
+
+            if self._deliver(letter):
+                os.remove(path)
+                if self.liveletter_dir:
+                    self.save_letter(letter, self.liveletter_dir)
+                sent += 1
+            else:
+                failed += 1
+
+        return sent, failed
+
+
+class QueuedSendgridEmailer(SendgridEmailer):
+    """
+    A `SendgridEmailer` whose `send_email` only queues the email, in a queue
+    of at most `max_queue` emails, and returns. With `spool_dir`, queued
+    emails are also kept there until they are sent or dead-lettered, and the
+    ones a previous process left behind are queued again on start.
+
+    `workers` threads drain the queue. Each takes up to `batch_size` emails,
+    waiting at most `batch_wait` seconds for more, and sends the ones that
+    share a sender, subject and body in one request, with a personalization
+    per email. Requests are limited to `rate` per second and retried
+    `retries` times with jittered exponential backoff, unless SendGrid
+    rejected them as invalid, before the letter goes to `deadletter_dir`.
+    """
+
+    def __init__(self, api_key: str,
+                 deadletter_dir: str = None,
+                 liveletter_dir: str = None,
+                 logger=None,
+                 noop: bool = False,
+                 host: str = None,
+                 spool_dir: str = None,
+                 max_queue: int = 10000,
+                 workers: int = 4,
+                 batch_size: int = MAX_PERSONALIZATIONS,
+                 batch_wait: float = 0.05,
+                 rate: float = None,
+                 retries: int = 3,
+                 backoff: float = 0.5,
+                 backoff_max: float = 30):
+
+        super().__init__(api_key, deadletter_dir, liveletter_dir, logger, noop, host)
+
+        self.spool_dir = spool_dir
+        self.queue = queue.Queue(max_queue)
+        self.batch_size = min(batch_size, MAX_PERSONALIZATIONS)
+        self.batch_wait = batch_wait
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.limiter = TokenBucket(ShardedMemoryCache(shards=1), rate, max(rate, 1)) if rate else None
+        self.closed = threading.Event()
+        self.workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+
+        for worker in self.workers:
+            worker.start()
+
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+            self._requeue_spool()
+
+    def _requeue_spool(self):
+        paths = [os.path.join(self.spool_dir, name) for name in os.listdir(self.spool_dir) if name.endswith(".json")]
+
+        for path in sorted(paths, key=os.path.getmtime):
+            with open(path) as f:
+                self.queue.put((path, json.load(f)))
+
+    def _spool(self, message):
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(message, f)
+        os.replace(path + ".tmp", path)
+
+        return path
+
+    def send_email(self, sender, receiver, subject, body, timeout=None) -> bool:
+        """
+        Queues the email, waiting up to `timeout` seconds (forever if None)
+        for room in the queue. Returns False if there was none.
+        """
+        message = {"sender": _address(sender), "receiver": _addresses(receiver), "subject": subject, "body": body}
+        path = self._spool(message) if self.spool_dir else None
+
         try:
-            if not self.noop:
-                self.client.send(email)
+            self.queue.put((path, message), timeout=timeout)
+            return True
+        except queue.Full:
+            if path:
+                os.remove(path)
             if self.logger:
-                self.logger.info(f"Sent an email.")
+                self.logger.error(f"Email queue is full. Subject=[{subject}]")
+            return False
+
+    def flush(self):
+        """Waits until every queued email has been sent or dead-lettered."""
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.closed.set()
+
+        for worker in self.workers:
+            worker.join()
+
+    def _throttle(self):
+        while self.limiter is not None:
+            decision = self.limiter.hit("send")
+            if decision.allowed:
+                return
+            time.sleep(decision.retry_after)
+
+    def _deliver(self, email) -> bool:
+        for attempt in range(self.retries + 1):
+            self._throttle()
+            try:
+                if not self.noop:
+                    self.client.send(email)
+                return True
+            except Exception as e:
+                if self.logger:
+                    self.logger.error(e)
+
+                status = getattr(e, "status_code", None)
+                if attempt == self.retries or status is not None and status < 500 and status != 429:
+                    return False
+
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff * 2 ** attempt)))
+
+        return False
+
+    def _take(self):
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _send_batch(self, messages):
+        first = messages[0]
+        email = Mail(from_email=From(*first["sender"]), subject=first["subject"], plain_text_content=first["body"])
+
+        for message in messages:
+            personalization = Personalization()
+            for receiver in message["receiver"]:
+                personalization.add_to(To(*receiver))
+            email.add_personalization(personalization)
+
+        if self._deliver(email):
+            if self.logger:
+                self.logger.info(f"Sent {len(messages)} emails. Subject=[{first['subject']}]")
             if self.liveletter_dir:
                 self.save_letter(email, self.liveletter_dir)
+        elif self.deadletter_dir:
+            self.save_letter(email, self.deadletter_dir)
 
-            return True
-        except Exception as e:
-            if self.deadletter_dir:
-                self.save_letter(email, self.deadletter_dir)
-            if self.logger:
-                self.logger.error(e)
+    def _work(self):
+        while not self.closed.is_set():
+            batch = self._take()
 
-            return False
+            try:
+                groups = {}
+                for path, message in batch:
+                    key = json.dumps([message["sender"], message["subject"], message["body"]])
+                    groups.setdefault(key, []).append(message)
+
+                for messages in groups.values():
+                    self._send_batch(messages)
+
+                for path, _ in batch:
+                    if path:
+                        os.remove(path)
+            except Exception as e:
+                # left in the spool for the next start
+                if self.logger:
+                    self.logger.error(e)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
@@ -2,11 +2,11 @@ import os
 import re
 import sys
 import json
-import requests
 from datetime import datetime
 from PIL import Image
 from queue import Queue
 from typing import Iterator
+from .http.transport import session_for
 
 
 class TraversalOptions:
@@ -126,14 +126,13 @@ def rename_files(dir, func, noop=False, **kwargs):
             os.rename(entry.path, target)
 
 
-def readj(path: str):
+def readj(path: str, session=None):
     if path == "-":
         return json.load(sys.stdin)
     elif path.startswith("http://") or path.startswith("https://"):
-        resp = requests.get(path)
+        resp = (session or session_for(path)).get(path)
         if not resp.ok:
-            raise f"GET {path}: request failed with status={
-                resp.status_code} body={resp.text}"
+            raise Exception(f"GET {path}: request failed with status={resp.status_code} body={resp.text}")
         return resp.json()
     else:
         with open(path, "r") as f:
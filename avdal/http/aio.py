@@ -0,0 +1,97 @@
+import random
+import asyncio
+import weakref
+import httpx
+from .transport import DEFAULT_TIMEOUT, RETRY_STATUSES
+
+IDEMPOTENT_METHODS = frozenset(["GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"])
+
+
+class RetryTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps an httpx transport to retry idempotent requests on transport errors
+    and `RETRY_STATUSES`, and every request on connect errors, with the same
+    full-jitter backoff as `transport.JitteredRetry`. A Retry-After header in
+    seconds is honored up to `backoff_max`.
+    """
+
+    def __init__(self, transport, retries=3, backoff_factor=0.5, backoff_max=10):
+        self.transport = transport
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None and retry_after.isdigit():
+            return min(int(retry_after), self.backoff_max)
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** attempt))
+
+    async def handle_async_request(self, request):
+        idempotent = request.method in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+
+            try:
+                response = await self.transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if last:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except httpx.TransportError:
+                if last or not idempotent:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            if last or not idempotent or response.status_code not in RETRY_STATUSES:
+                return response
+
+            await response.aclose()
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def new_client(max_connections=100, max_keepalive=20, timeout=DEFAULT_TIMEOUT, retries=3,
+               backoff_factor=0.5) -> httpx.AsyncClient:
+    """
+    Returns an `httpx.AsyncClient` whose pool holds up to `max_connections`
+    connections, `max_keepalive` of them kept alive between requests, with
+    `timeout` and retries as in `transport.new_session`.
+    """
+    if isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+    transport = RetryTransport(httpx.AsyncHTTPTransport(limits=limits), retries, backoff_factor)
+
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+# connections belong to the loop that opened them, so each loop gets its own client
+_clients = weakref.WeakKeyDictionary()
+
+
+def shared_client(**kwargs) -> httpx.AsyncClient:
+    """
+    Returns the client shared by every async client on the running loop,
+    made by `new_client(**kwargs)` on first use; later `kwargs` are ignored.
+    """
+    loop = asyncio.get_running_loop()
+
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = _clients[loop] = new_client(**kwargs)
+
+    return client
+
+
+async def close_shared_client():
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
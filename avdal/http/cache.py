@@ -0,0 +1,124 @@
+import json
+import time
+import threading
+from collections import namedtuple
+from .transport import session_for
+from ..cache.disk import DiskCache
+
+Entry = namedtuple("Entry", ["body", "etag", "last_modified", "checked_at"])
+
+
+class ResponseCache:
+    """
+    Keeps the JSON bodies of GET responses in memory and, given `path`, in a
+    `DiskCache` there, so that a new process starts from the copy on disk
+    without a round trip. Copies older than `refresh_interval` seconds are
+    revalidated with If-None-Match/If-Modified-Since, by a daemon thread or,
+    without `background`, by the next `get`. While the server fails, the last
+    good copy keeps being served and is retried an interval later.
+    """
+
+    def __init__(self, path=None, refresh_interval=300, background=True, session=None, logger=None):
+        self.disk = DiskCache(path) if path else None
+        self.refresh_interval = refresh_interval
+        self.background = background
+        self.session = session
+        self.logger = logger
+        self.entries = {}
+        self.headers = {}
+        self.lock = threading.Lock()
+        self.closed = threading.Event()
+        self.refresher = None
+
+    def close(self):
+        self.closed.set()
+
+        if self.refresher is not None:
+            self.refresher.join()
+        if self.disk is not None:
+            self.disk.close()
+
+    def _entry(self, url):
+        entry = self.entries.get(url)
+        if entry is None and self.disk is not None:
+            stored = self.disk.get(url)
+            if stored is not None:
+                entry = self.entries[url] = Entry(*stored)
+
+        return entry
+
+    def _request_headers(self, url, entry):
+        headers = self.headers.get(url)
+        headers = dict((headers() if callable(headers) else headers) or {})
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        return headers
+
+    def _revalidate(self, url, entry):
+        headers = self._request_headers(url, entry)
+
+        now = time.time()
+        try:
+            res = (self.session or session_for(url)).get(url, headers=headers)
+            if res.status_code == 304 and entry is not None:
+                fresh = entry._replace(checked_at=now)
+            elif res.ok:
+                fresh = Entry(res.content, res.headers.get("ETag"), res.headers.get("Last-Modified"), now)
+            else:
+                raise Exception(f"GET {url}: request failed with status={res.status_code} body={res.text}")
+        except Exception as e:
+            if entry is None:
+                raise
+            if self.logger:
+                self.logger.error(e)
+
+            # served as is until it is due again; not persisted, so other processes still revalidate it
+            self.entries[url] = entry._replace(checked_at=now)
+            return entry
+
+        self.entries[url] = fresh
+        if self.disk is not None:
+            self.disk.set(url, tuple(fresh))
+
+        return fresh
+
+    def _stale(self, entry, now):
+        return now - entry.checked_at >= self.refresh_interval
+
+    def _refresh_loop(self):
+        while True:
+            due = min((entry.checked_at for entry in list(self.entries.values())), default=time.time())
+            if self.closed.wait(due + self.refresh_interval - time.time()):
+                return
+
+            for url in list(self.headers):
+                entry = self.entries.get(url)
+                if entry is None or self._stale(entry, time.time()):
+                    try:
+                        self._revalidate(url, entry)
+                    except Exception as e:
+                        if self.logger:
+                            self.logger.error(e)
+
+    def get(self, url, headers=None):
+        """
+        Returns the JSON body of `url`. `headers` can be a function, called
+        only when a request is sent, e.g. to put a fresh token in them.
+        """
+        self.headers[url] = headers
+        entry = self._entry(url)
+
+        if entry is None or not self.background and self._stale(entry, time.time()):
+            entry = self._revalidate(url, entry)
+
+        if self.background and self.refresher is None:
+            with self.lock:
+                if self.refresher is None:
+                    self.refresher = threading.Thread(target=self._refresh_loop, daemon=True)
+                    self.refresher.start()
+
+        return json.loads(entry.body)
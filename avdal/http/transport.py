@@ -0,0 +1,82 @@
+import random
+import threading
+import requests
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) seconds
+DEFAULT_TIMEOUT = (3.05, 10)
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    """
+    Retries idempotent requests on connection errors and `RETRY_STATUSES`,
+    sleeping a random time between zero and the exponential backoff (full
+    jitter), so that clients that failed together do not retry together.
+    """
+
+    def get_backoff_time(self):
+        return random.uniform(0, super().get_backoff_time())
+
+
+class TimeoutAdapter(HTTPAdapter):
+    """Applies `timeout` to every request sent without one."""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, timeout=None, **kwargs):
+        return super().send(request, timeout=self.timeout if timeout is None else timeout, **kwargs)
+
+
+def new_session(pool_maxsize=10, timeout=DEFAULT_TIMEOUT, retries=3, backoff_factor=0.5) -> requests.Session:
+    """
+    Returns a session that keeps up to `pool_maxsize` connections alive per
+    host, times requests out after `timeout` (a number or a (connect, read)
+    pair), and retries idempotent ones up to `retries` times.
+    """
+    retry = JitteredRetry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = TimeoutAdapter(timeout, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["Accept-Encoding"] = "gzip, deflate"
+
+    return session
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def session_for(url, **kwargs) -> requests.Session:
+    """
+    Returns the session shared by every client of the host of `url`, made by
+    `new_session(**kwargs)` on first use; later `kwargs` are ignored.
+    """
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = new_session(**kwargs)
+
+        return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,10 +1,33 @@
+import io
+import os
 import json
+import time
+import tempfile
+import threading
 import unittest
+import contextlib
 from avdal import annotations
 from avdal import rbac
 from avdal.env import DotEnv
 from avdal.dict import AttrDict
-from avdal.aql import Filter
+from avdal import aql
+from avdal.aql import Filter, _eval_exp
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 
 def fails(f, *args, **kwargs):
@@ -178,3 +201,1362 @@ class TestQF(unittest.TestCase):
             filter = Filter(q)
             actual = filter.match(obj, debug=True)
             self.assertEqual(should_match, actual, msg=f"q: {q}")
+
+    def test_nodes(self):
+        from avdal.aql import nodes
+
+        exp = Filter("a = 1 & (b.c in ['x', 'y'] | !len(d) > 2) & e is null").exp
+        self.assertIsInstance(exp, nodes.And)
+        self.assertEqual(["Or", "Null"], [type(arg).__name__ for arg in exp.args[1:]])
+        self.assertEqual({
+            "arg1": {
+                "arg1": {"selector": {"key": ["a"], "type": "plain"}, "op": "=", "value": 1},
+                "op": "&",
+                "arg2": {
+                    "arg1": {"selector": {"key": ["b", "c"], "type": "plain"}, "op": "in", "value": ["x", "y"]},
+                    "op": "|",
+                    "arg2": {"op": "!", "arg1": {"selector": {"key": ["d"], "type": "len"}, "op": ">", "value": 2}},
+                },
+            },
+            "op": "&",
+            "arg2": {"selector": {"key": ["e"], "type": "plain"}, "op": "is", "value": None},
+        }, exp.to_dict())
+        self.assertFalse(hasattr(exp.args[0], "__dict__"))
+
+        values = list(range(20000))
+        exp = Filter(f"a in {values} & " + " & ".join(f"k{i} = {i}" for i in range(2000))).exp
+        self.assertEqual(tuple(values), exp.args[0].value)
+        self.assertEqual(2001, len(exp.args))
+
+    def test_compiled_matches_interpreter(self):
+        objs = [
+            {"a": 3, "b": "abcd", "c": [1, 2], "d": {"e": {"f": "1"}}, "g": None},
+            {"a": 3.0, "b": "ABCD", "d": {"e": 1}, "h": "2023-11-26T11:28:17"},
+            {"a": "3", "c": "xy", "d": None, "h": "not a date"},
+            {},
+        ]
+        queries = [
+            "a = 3", "a != 3", "a > 2 & a < 4", "a = 3.0 | b ~ 'abcd'",
+            "!(a in [3, 4])", "a not_in [3]", "b *= 'ab' & b =* 'cd'",
+            "b % '[a-z]+'", "b !~ 'abcd'", "len(c) = 2", "len(b) >= 2",
+            "d.e.f = '1'", "d.e.* = '1'", "d.e is null", "g is null",
+            "g is_not null", "* = 3", "* is null", "* in ['3', 'xy']",
+            "* not_in [3]", "h > 2023-11-25", "h < 2023-11-25", "c in [1, 2]",
+            "c not_in [1]", "d in ['x']",
+        ]
+
+        def outcome(f, *args):
+            try:
+                return f(*args)
+            except Exception as e:
+                return type(e)
+
+        for q in queries:
+            f = Filter(q)
+            for obj in objs:
+                self.assertEqual(outcome(_eval_exp, obj, f.exp), outcome(f.match, obj), msg=f"q: {q} obj: {obj}")
+
+        # the planner must not move an operand that may raise ahead of one that decides the chain
+        from datetime import timezone
+
+        objs = [
+            {"x": "b", "y": [1]},
+            {"x": "a", "y": [1]},
+            {"x": "a", "h": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+            {"x": "b", "h": datetime(2024, 1, 1, tzinfo=timezone.utc), "a": 1},
+        ]
+        queries = [
+            "x % 'a' & * in [1]", "x % 'b' | * not_in [1]", "x % 'a' & h > 2023-11-25",
+            "x % 'b' | h < 2023-11-25 | a = 1", "(x % 'a' | x % 'c') & * in [1] & a = 1",
+        ]
+
+        for q in queries:
+            for f in [Filter(q), Filter(q, warmup=2)]:
+                for obj in objs * 2:
+                    self.assertEqual(outcome(_eval_exp, obj, f.exp), outcome(f.match, obj), msg=f"q: {q} obj: {obj}")
+
+    def test_constants_are_prepared_once(self):
+        import re
+
+        self.assertRaises(re.error, Filter, "a % '('")
+        self.assertTrue(Filter("a % 'x+y' & b ~ 'ABC' & c in ['p', 'q']").match({"a": "xxy", "b": "aBc", "c": "q"}))
+        self.assertTrue(Filter("d > 2023-01-01").match({"d": "2023-06-01T00:00:00"}))
+        self.assertTrue(Filter("d > 2023-01-01").match({"d": "2023-06-01 12:00"}))
+        self.assertFalse(Filter("d > 2023-01-01").match({"d": ["2023-06-01"]}))
+
+    def test_benchmark_compiled(self):
+        q = "(k1 = '1' | k2 < 0) & k3 > 1.0 & k4 > 2023-11-30 & k5 is null & d.e in [1, 2, 3]"
+        objs = [{"k1": str(i % 3), "k2": i, "k3": 2.5, "k4": "2023-12-31", "d": {"e": i % 5}} for i in range(2000)]
+        f = Filter(q)
+
+        start = time.perf_counter()
+        interpreted = [_eval_exp(obj, f.exp) for obj in objs]
+        interpreted_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        compiled = [f.match(obj) for obj in objs]
+        compiled_time = time.perf_counter() - start
+
+        print(f"aql: interpreted={interpreted_time:.4f}s compiled={compiled_time:.4f}s "
+              f"speedup={interpreted_time / compiled_time:.1f}x")
+
+        self.assertEqual(interpreted, compiled)
+
+    def test_parse_cache(self):
+        aql.parse_cache_clear()
+        aql.parse_cache_resize(2)
+
+        try:
+            f1 = Filter("a = 1")
+            f2 = Filter("a = 1")
+            self.assertIs(f1.exp, f2.exp)
+
+            Filter("b = 1")
+            Filter("c = 1")
+            info = aql.parse_cache_info()
+            self.assertEqual((1, 3, 2), (info["hits"], info["misses"], info["size"]))
+
+            Filter("a = 1")
+            self.assertEqual(4, aql.parse_cache_info()["misses"])
+        finally:
+            aql.parse_cache_resize(1024)
+
+    def test_parser_table_is_current(self):
+        from avdal.aql import _parser_table
+
+        self.assertEqual(aql._grammar_sha256(), _parser_table.GRAMMAR_SHA256,
+                         msg="run `make aql-table` to regenerate avdal/aql/_parser_table.py")
+
+    def test_binop_precedence(self):
+        # & and | bind equally tight and associate to the left.
+        self.assertTrue(Filter("a = 1 | b = 1 & c = 1").match({"a": 1, "c": 1}))
+        self.assertFalse(Filter("a = 1 | b = 1 & c = 1").match({"a": 1}))
+        self.assertTrue(Filter("a = 1 & b = 1 | c = 1").match({"c": 1}))
+        self.assertTrue(Filter("!a = 1 & b = 1").match({"b": 1}))
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_mask(self):
+        rows = [
+            {"i": 1, "f": 1.5, "s": "abc", "d": "2023-11-26T11:28:17", "n": {"a": 1}, "m": 1, "b": True},
+            {"i": 2, "f": 2.5, "s": "ABD", "d": "2023-10-01", "n": {"a": 2}, "m": "1", "b": False},
+            {"i": 3, "f": None, "s": "xyz", "d": "bad", "n": None, "m": None, "b": True},
+            {"i": None, "f": 4.0, "s": None, "d": None, "n": {"a": 3}, "m": 2.0, "b": False},
+        ]
+        keys = list(rows[0])
+        lists = {k: [row[k] for row in rows] for k in keys}
+        arrays = dict(lists,
+                      f=np.array([1.5, 2.5, np.nan, 4.0]),
+                      s=np.array(["abc", "ABD", "xyz", "q"]),
+                      b=np.array([True, False, True, False]),
+                      d=np.array(["2023-11-26T11:28", "2023-10-01", "NaT", "2024-01-01"], dtype="datetime64[m]"))
+        dates = [datetime(2023, 11, 26, 11, 28), datetime(2023, 10, 1), None, datetime(2024, 1, 1)]
+        arows = [dict(row, f=f, s=s, d=d) for row, f, s, d in zip(rows, arrays["f"].tolist(), arrays["s"].tolist(), dates)]
+
+        queries = [
+            "i = 1", "i > 1 & i <= 3", "i = 1.0", "f > 2.0", "f != 2.5", "s = 'abc'", "s ~ 'abd'", "s !~ 'abd'",
+            "s *= 'ab'", "s =* 'z'", "s % '[A-Z]+'", "len(s) = 3", "len(i) = 1", "d > 2023-11-01", "d < 2023-11-01",
+            "i in [1, 3]", "i not_in [1, 3]", "f in [1.5]", "s in ['abc', 'xyz']", "s not_in ['abc']", "m in [1, 2]",
+            "m = 1", "m is null", "i is_not null", "missing is null", "missing = 1", "missing not_in [1]",
+            "n.a = 2", "n.a > 1 | i = 1", "!(i = 1) & s is_not null", "* = 1", "b = 1", "b in [1]",
+        ]
+
+        for columns, objs in [(lists, rows), (arrays, arows)]:
+            for q in queries:
+                f = Filter(q)
+                expected = [f.match(obj) for obj in objs]
+                self.assertEqual(expected, f.mask(columns).tolist(), msg=f"q: {q}")
+
+        # rows decided by an earlier operand never reach a later one, which would raise on them
+        columns = {"i": [1, 2, 3], "t": [[1], "a", "b"]}
+        objs = [{"i": 1, "t": [1]}, {"i": 2, "t": "a"}, {"i": 3, "t": "b"}]
+        for q in ["i != 1 & * not_in ['a']", "i = 1 | * not_in ['a']", "!(i = 1 | * in ['a'])"]:
+            f = Filter(q)
+            self.assertEqual([f.match(obj) for obj in objs], f.mask(columns).tolist(), msg=f"q: {q}")
+
+        self.assertEqual([True] * 4, Filter("").mask(lists).tolist())
+        self.assertRaises(ValueError, Filter("i = 1").mask, {"a": [1], "b": [1, 2]})
+
+    def test_filter_stream(self):
+        records = [{"id": i, "name": f"user{i}", "tags": ["a"] * (i % 3), "meta": {"ok": i % 2 == 0}} for i in range(500)]
+        lines = [json.dumps(r) for r in records]
+        queries = ["name *= 'user1' & len(tags) > 1", "id = 7 | meta.ok is null", "!(id < 490)", "name = 'nope'", ""]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "records.jsonl")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n\n")
+
+            for q in queries:
+                expected = [r for r in records if Filter(q).match(r)]
+
+                self.assertEqual(expected, list(aql.filter_stream(q, path, chunk_size=1000)), msg=q)
+                self.assertEqual(expected, list(aql.filter_stream(Filter(q), lines)), msg=q)
+                self.assertEqual(expected, list(aql.filter_stream(q, records)), msg=q)
+                self.assertEqual(expected, list(aql.filter_stream(q, io.BytesIO("\n".join(lines).encode()))), msg=q)
+                self.assertEqual(expected, list(aql.filter_stream(q, path, workers=2, chunk_size=700)), msg=q)
+                self.assertEqual(sorted(r["id"] for r in expected),
+                                 sorted(r["id"] for r in aql.filter_stream(q, path, workers=2, ordered=False, chunk_size=700)))
+
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                from avdal.aql.__main__ import main
+                main(["id > 497", path])
+            self.assertEqual([498, 499], [json.loads(line)["id"] for line in out.getvalue().splitlines()])
+
+    def test_filter_stream_literals(self):
+        from avdal.aql.stream import _required_literals
+
+        exp = Filter("a.b = 'x' & (c = 1 | c = 2) & d *= 'y' & e ~ 'Z' & !(f = 'w') & g = 'has/slash'").exp
+        self.assertEqual({'"a"', '"b"', "x", '"c"', '"d"', "y", '"e"', '"g"'}, _required_literals(exp))
+
+    def test_planner(self):
+        from avdal.aql import planner
+
+        plan = planner.optimize(Filter("name % '.*foo.*' & (status = 'active' & tags in ['a']) & x is null").exp)
+        self.assertEqual("&", plan.op)
+        self.assertEqual(["is", "=", "in", "%"], [arg.op for arg in plan.args])
+
+        plan = planner.optimize(Filter("(a = 1 | (b % 'x' | c = 2)) & d = 3").exp)
+        self.assertEqual(["=", "|"], [arg.op for arg in plan.args])
+        self.assertEqual(["=", "=", "%"], [arg.op for arg in plan.args[1].args])
+
+        objs = [{"a": i % 4, "b": "x" * (i % 3), "c": i % 5, "d": 3 if i % 2 else None, "s": str(i)} for i in range(200)]
+        queries = ["b % 'x+' & a = 1 & c in [1, 2, 3]", "a = 1 | b *= 'xx' | c = 0 | d is null",
+                   "!(a = 1 & b % 'x') | (c = 2 & s =* '2')", "s ~ '1' & a > 0 & a < 3 & d is_not null"]
+
+        for q in queries:
+            expected = [_eval_exp(obj, Filter(q).exp) for obj in objs]
+            self.assertEqual(expected, [Filter(q).match(obj) for obj in objs], msg=q)
+            adaptive = Filter(q, warmup=20)
+            self.assertEqual(expected, [adaptive.match(obj) for obj in objs], msg=q)
+
+    def test_collection(self):
+        import random
+
+        rnd = random.Random(7)
+        records = [{
+            "id": i,
+            "user": {"name": rnd.choice(["ann", "bob", "cid", None]), "age": rnd.choice([20, 30, 40, 30.0, "30"])},
+            "tags": ["t"] * rnd.randrange(4),
+            "at": rnd.choice(["2023-01-05T10:00:00", "2023-06-01", "bad", datetime(2023, 3, 1), None]),
+            "flag": rnd.choice([True, 1, 0]),
+        } for i in range(300)]
+
+        c = aql.Collection(records)
+        c.add_index("user.name")
+        c.add_index("user.age", kind="sorted")
+        c.add_index("at", kind="sorted")
+        c.add_index("tags", kind="len")
+        c.add_index("flag")
+
+        queries = [
+            "user.name = 'ann'", "user.name in ['ann', 'bob'] & user.age > 25", "user.age = 30", "user.age = 30.0",
+            "user.age >= 30 & user.age < 40", "at > 2023-02-01", "at <= 2023-03-01 | user.name = 'cid'",
+            "len(tags) > 1 & !(user.name = 'bob')", "flag = 1", "flag in [1]", "user.name is null", "id < 10",
+            "len(tags) = 0 | user.age < 30", "",
+        ]
+
+        def check():
+            live = [r for r in records if r is not None]
+            for q in queries:
+                self.assertEqual([r for r in live if Filter(q).match(r)], c.query(q), msg=q)
+
+        check()
+
+        for id in range(0, 300, 7):
+            c.delete(id)
+            records[id] = None
+        for id in range(1, 300, 11):
+            if records[id] is None:
+                continue
+            records[id] = dict(records[id], user={"name": "ann", "age": 40}, tags=[])
+            c.update(id, records[id])
+        for i in range(20):
+            record = {"user": {"name": "bob", "age": 30}, "tags": ["x"], "at": "2023-12-31"}
+            records.append(record)
+            self.assertEqual(len(records) - 1, c.insert(record))
+
+        check()
+        self.assertEqual(len([r for r in records if r is not None]), len(c))
+
+    def test_pushdown(self):
+        import random
+        import sqlite3
+        from avdal.aql import pushdown
+
+        rnd = random.Random(11)
+        records = [{
+            "id": i,
+            "name": rnd.choice(["ann", "bob", "annie", "it's", "", None]),
+            "score": rnd.choice([1, 2, 2.5, "2", True, None]),
+            "user": rnd.choice([{"age": rnd.choice([20, 30, "30", None]), "tags": ["a"] * rnd.randrange(3)}, [1], "x", None]),
+            "at": rnd.choice(["2023-01-05", "2023-06-01", None]),
+        } for i in range(200)]
+
+        queries = [
+            "name = 'ann'", "name != 'ann'", "name *= 'ann'", "name =* 'ie'", "name =* ''", "name in ['ann', 'bob']",
+            "name not_in ['ann']", "name is null", "name is_not null", "!(name = 'bob') & score > 1", "score = 2",
+            "score in [1, 2]", "score not_in [2.5]", "score >= 2 | user.age = 30", "user.age = '30'",
+            "user.age is null", "len(user.tags) > 1", "len(name) = 3", "name ~ 'ANN'", "name % 'a.*' & score < 3",
+            "at > 2023-02-01 & id < 100", "user.* = 30", "!(user.age is_not null | name = 'ann')", "",
+        ]
+
+        db = sqlite3.connect(":memory:")
+        db.execute("create table docs (rowid integer primary key, data, name, score, user, at, id)")
+        for i, r in enumerate(records):
+            score = int(r["score"]) if type(r["score"]) is bool else r["score"]
+            db.execute("insert into docs values (?, ?, ?, ?, ?, ?, ?)", (
+                i, json.dumps(r), r["name"], score, json.dumps(r["user"]), r["at"], r["id"]))
+
+        for q in queries:
+            expected = [r for r in records if Filter(q).match(r)]
+
+            p = pushdown.to_sql(q, column="data")
+            rows = db.execute(f"select data from docs where {p.query} order by rowid", p.params)
+            self.assertEqual(expected, [r for r in map(json.loads, (row[0] for row in rows)) if p.match(r)], msg=q)
+
+            if "score" in q:
+                # plain columns cannot tell True from 1
+                continue
+
+            p = pushdown.to_sql(q)
+            rows = db.execute(f"select rowid from docs where {p.query} order by rowid", p.params)
+            self.assertEqual(expected, [records[i] for (i,) in rows if p.match(records[i])], msg=q)
+
+        p = pushdown.to_sql("name ~ 'ann' & score = 2 & user.* = 1")
+        self.assertEqual(["name ~ 'ann'", "user.* = 1"], p.unpushed)
+        self.assertEqual('IFNULL(typeof("score") IS \'integer\' AND "score" = :p0, 0)', p.query)
+        self.assertEqual({"p0": 2}, p.params)
+
+        # typed columns convert what is compared with them to their affinity
+        records = [{"a": a, "s": s} for a in [1, 2, None] for s in ["1", "2.0", "x", None]]
+        db.execute("create table typed (rowid integer primary key, a integer, s text)")
+        for i, r in enumerate(records):
+            db.execute("insert into typed values (?, ?, ?)", (i, r["a"], r["s"]))
+
+        for q in ["s not_in [1]", "s in [1]", "s in [2.0]", "s in ['1', 'x']", "a in ['1']", "a not_in ['1', '2']",
+                  "a not_in [2]", "a in [1.0]", "s = 1", "a = '1'", "a >= 1 & s = 'x'", "len(s) = 1"]:
+            expected = [r for r in records if Filter(q).match(r)]
+            p = pushdown.to_sql(q)
+            rows = db.execute(f"select rowid from typed where {p.query} order by rowid", p.params)
+            self.assertEqual(expected, [records[i] for (i,) in rows if p.match(records[i])], msg=q)
+
+        p = pushdown.to_mongo("user.age >= 30 & name in ['ann'] & len(name) = 3")
+        self.assertEqual({"$and": [
+            {"$and": [
+                {"user": {"$type": "object"}},
+                {"user.age": {"$gte": 30, "$type": ["int", "long"], "$not": {"$type": "array"}}},
+            ]},
+            {"name": {"$in": ["ann"], "$not": {"$type": "array"}}},
+        ]}, p.query)
+        self.assertEqual(["len(name) = 3"], p.unpushed)
+        self.assertEqual({}, pushdown.to_mongo("name % 'x'").query)
+
+
+class TestCache(unittest.TestCase):
+    def test_sharded_memory_cache(self):
+        from avdal.cache.memory import ShardedMemoryCache
+
+        c = ShardedMemoryCache(shards=1, max_entries=3)
+        for key in "abc":
+            c.set(key, key.upper())
+        self.assertEqual("A", c.get("a"))
+        c.set("d", "D")
+        self.assertEqual([None, "A", "C", "D"], [c.get(key) for key in "bacd"])
+        self.assertEqual(2, c.incr("n", 2))
+        self.assertEqual(5, c.incr("n", 3))
+        self.assertEqual(3, len(c))
+
+        c.set("t", 1, ttl=0)
+        self.assertIsNone(c.get("t"))
+        stats = c.stats()
+        self.assertEqual((4, 2, 3, 1), (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]))
+
+        c = ShardedMemoryCache(shards=4, max_bytes=4000, sizeof=lambda v: len(v))
+        for i in range(100):
+            c.set(f"k{i:04}", "x" * 95)
+        self.assertLessEqual(c.stats()["bytes"], 4000)
+        self.assertEqual(40, len(c))
+        self.assertEqual("x" * 95, c.get("k0099"))
+        c.set("big", "x" * 4000)
+        self.assertIsNone(c.get("big"))
+
+        c = ShardedMemoryCache(max_bytes=1000)
+        c.set("k", "v")
+        self.assertEqual("v", c.get("k"))
+
+        # an entry may take up a segment's share of max_bytes, at least MIN_SHARD_BYTES
+        c = ShardedMemoryCache(max_bytes=16 << 20, sizeof=len)
+        self.assertEqual(4, len(c.shards))
+        c.set("2m", "x" * (2 << 20))
+        c.set("5m", "x" * (5 << 20))
+        self.assertEqual((True, None, 1), (c.get("2m") is not None, c.get("5m"), c.stats()["evictions"]))
+
+        # small bounds are exact, larger ones evict only when close to full
+        for max_entries, keys in [(100, 100), (2000, 2000), (20000, 17000)]:
+            c = ShardedMemoryCache(max_entries=max_entries)
+            for i in range(keys):
+                c.set(f"k{i}", i)
+            self.assertEqual((keys, 0), (len(c), c.stats()["evictions"]))
+        self.assertEqual([1, 1, 16], [len(ShardedMemoryCache(max_entries=n).shards) for n in [100, 2000, 20000]])
+
+    def test_benchmark_sharded_memory_cache(self):
+        from avdal.cache.memory import MemoryCache, ShardedMemoryCache
+
+        def run(cache, threads=8, ops=20000):
+            def worker(seed):
+                for i in range(ops):
+                    key = (seed * 7919 + i) % 1000
+                    if i % 10 == 0:
+                        cache.set(key, i)
+                    else:
+                        cache.get(key)
+
+            workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+            start = time.perf_counter()
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            return threads * ops / (time.perf_counter() - start)
+
+        single = run(MemoryCache(autocleanup=False))
+        # large enough a bound for 16 segments
+        sharded = ShardedMemoryCache(max_entries=16384)
+        striped = run(sharded)
+        print(f"cache: single lock={single:.0f} ops/s sharded={striped:.0f} ops/s {sharded.stats()}")
+
+        self.assertEqual(16, len(sharded.shards))
+        self.assertEqual(0, sharded.stats()["evictions"])
+
+    def test_memory_cache_expiry(self):
+        from avdal.cache.memory import MemoryCache
+
+        c = MemoryCache(autocleanup=False)
+        now = int(time.time())
+        c.set("a", 1, ttl=-5)
+        c.set(1, 2, ttl=-5)
+        c.set("b", 3, ttl=-5)
+        c.set("b", 4, ttl=60)
+        c.set("c", 5)
+        self.assertIsNone(c.get("a"))
+        self.assertNotIn("a", c.cache)
+
+        c.cleanup()
+        self.assertEqual({"b", "c"}, set(c.cache))
+        self.assertEqual([now + 60], [exp for exp, _, _ in c.expiry])
+
+        for i in range(1000):
+            c.set("d", i, ttl=60)
+        self.assertLess(len(c.expiry), 100)
+
+        c = MemoryCache(interval=0.01)
+        c.set("a", 1, ttl=-5)
+        time.sleep(0.1)
+        self.assertEqual({}, c.cache)
+        self.assertTrue(c.cleanup_thread.daemon)
+        c.close()
+        self.assertFalse(c.cleanup_thread.is_alive())
+
+    def test_cached(self):
+        import pickle
+        import traceback
+        from avdal.cache import cached
+        from avdal.cache.memory import MemoryCache
+
+        caches = [(MemoryCache(autocleanup=False), None)]
+        try:
+            import fakeredis
+            from avdal.cache.redis import RedisCache
+
+            redis_cache = RedisCache("localhost", 6379, None)
+            redis_cache.client = fakeredis.FakeRedis()
+            caches.append((redis_cache, pickle))
+        except ImportError:
+            pass
+
+        for cache, serializer in caches:
+            calls = []
+
+            @cached(cache, ttl=60, serializer=serializer, negative_ttl=60, errors=(KeyError,))
+            def load(name):
+                calls.append(name)
+                time.sleep(0.05)
+                if name == "missing":
+                    return None
+                if name == "bad":
+                    raise KeyError(name)
+                return {"name": name, "n": len(calls)}
+
+            threads = [threading.Thread(target=load, args=("a",)) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(["a"], calls)
+            self.assertEqual({"name": "a", "n": 1}, load("a"))
+
+            self.assertIsNone(load("missing"))
+            self.assertIsNone(load("missing"))
+            self.assertRaises(KeyError, load, "bad")
+            self.assertRaises(KeyError, load, "bad")
+            self.assertEqual(["a", "missing", "bad"], calls)
+
+            depths = []
+            for _ in range(20):
+                try:
+                    load("bad")
+                except KeyError as e:
+                    depths.append(len(traceback.extract_tb(e.__traceback__)))
+            self.assertEqual([depths[0]] * 20, depths)
+
+            @cached(cache, ttl=0, stale_ttl=60, key=lambda: "stale", serializer=serializer)
+            def counter():
+                calls.append("counter")
+                return len(calls)
+
+            first = counter()
+            self.assertEqual(first, counter())
+            for _ in range(100):
+                if counter() != first:
+                    break
+                time.sleep(0.01)
+            self.assertNotEqual(first, counter())
+
+            # an address in the key would never be shared, and could be reused by another object
+            class Roles:
+                def __init__(self, host):
+                    self.host = host
+
+                @cached(cache, ttl=60, serializer=serializer)
+                def unkeyed(self, name):
+                    return name
+
+                @cached(cache, ttl=60, key=lambda self, name: f"roles:{self.host}:{name}", serializer=serializer)
+                def load(self, name):
+                    calls.append(name)
+                    return f"{self.host}/{name}"
+
+            self.assertRaises(TypeError, Roles("h1").unkeyed, "web")
+            self.assertEqual(["h1/web", "h1/web", "h2/web"], [Roles(h).load("web") for h in ["h1", "h1", "h2"]])
+            self.assertEqual(2, calls.count("web"))
+
+    def test_bulk_operations(self):
+        from avdal.cache.memory import MemoryCache, ShardedMemoryCache
+
+        caches = [MemoryCache(autocleanup=False), ShardedMemoryCache(shards=4)]
+        try:
+            import fakeredis
+            from avdal.cache.redis import RedisCache
+
+            redis_cache = RedisCache("localhost", 6379, None)
+            redis_cache.client = fakeredis.FakeRedis()
+            caches.append(redis_cache)
+        except ImportError:
+            redis_cache = None
+
+        for cache in caches:
+            cache.set_many({"a": "1", "b": "2", "c": "3"})
+            cache.set_many({"d": "4", "e": "5"}, ttl={"d": 100})
+            values = cache.get_many(["a", "x", "c", "d", "e"])
+            if cache is redis_cache:
+                values = [v if v is None else v.decode() for v in values]
+            self.assertEqual(["1", None, "3", "4", "5"], values)
+
+            self.assertEqual([2, 5], cache.incr_many({"n": 2, "m": 5}))
+            self.assertEqual([3, 5], cache.incr_many({"n": 1, "m": 0}))
+
+            cache.delete_many(["a", "b", "n"])
+            cache.delete("c")
+            self.assertEqual([None, None, None], cache.get_many(["a", "c", "n"]))
+            self.assertEqual([], cache.get_many([]))
+
+        self.assertEqual(3, caches[0].incr("z", 3))
+        caches[0].set_many({"p": 1, "q": 2}, ttl={"p": -5})
+        self.assertEqual([None, 2], caches[0].get_many(["p", "q"]))
+
+        if redis_cache is not None:
+            self.assertGreater(redis_cache.client.ttl("d"), 0)
+            self.assertEqual(-1, redis_cache.client.ttl("e"))
+
+    def test_async_caches(self):
+        import asyncio
+        from avdal.cache.memory import AsyncMemoryCache
+
+        caches = [AsyncMemoryCache(interval=0)]
+        try:
+            import fakeredis
+            from avdal.cache.redis import AsyncRedisCache
+
+            redis_cache = AsyncRedisCache("localhost", 6379, None, max_connections=4, socket_timeout=1)
+            self.assertEqual(4, redis_cache.pool.max_connections)
+            redis_cache.client = fakeredis.FakeAsyncRedis()
+            caches.append(redis_cache)
+        except ImportError:
+            pass
+
+        async def check(cache):
+            await cache.set("a", "1")
+            await cache.set("b", "2", ttl=100)
+            self.assertEqual(3, await cache.incr("n", 3))
+            self.assertEqual(5, await cache.incr("n", 2))
+            await cache.set_many({"c": "3", "d": "4"}, ttl={"c": 100})
+            values = await cache.get_many(["a", "b", "x", "c", "d"])
+            self.assertEqual(["1", "2", None, "3", "4"], [v.decode() if isinstance(v, bytes) else v for v in values])
+            self.assertEqual([6, 1], await cache.incr_many({"n": 1, "m": 1}))
+            await cache.delete("a")
+            await cache.delete_many(["b", "c"])
+            self.assertEqual([None, None, None], await cache.get_many(["a", "b", "c"]))
+
+        for cache in caches:
+            asyncio.run(check(cache))
+
+        expiring = AsyncMemoryCache(interval=0)
+        asyncio.run(expiring.set("a", 1, ttl=-5))
+        asyncio.run(expiring.set("b", 1))
+        self.assertEqual({"b"}, set(expiring.cache.cache))
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    def test_tiered_cache(self):
+        from avdal.cache.redis import RedisCache
+        from avdal.cache.tiered import TieredCache
+
+        server = fakeredis.FakeServer()
+        tiers = []
+        for _ in range(2):
+            l2 = RedisCache("localhost", 6379, None)
+            l2.client = fakeredis.FakeRedis(server=server)
+            tiers.append(TieredCache(l2, l1_ttl=60, max_entries=100))
+        a, b = tiers
+
+        try:
+            a.set_many({f"k{i}": i for i in range(50)})
+            # wait for b to see the invalidation, which would skip its fills
+            for _ in range(100):
+                if b.generation:
+                    break
+                time.sleep(0.01)
+            for _ in range(20):
+                for i in range(50):
+                    self.assertEqual(str(i).encode(), b.get(f"k{i}"))
+            stats = b.stats()
+            self.assertLess(stats["l2"]["hits"], 60)
+            self.assertGreater(stats["l1"]["hit_rate"], 0.9)
+
+            a.set("k1", "new")
+            self.assertEqual(2, a.incr("n", 2))
+            for _ in range(100):
+                if b.get("k1") == b"new":
+                    break
+                time.sleep(0.01)
+            self.assertEqual(b"new", b.get("k1"))
+            self.assertEqual(b"2", b.get("n"))
+
+            b.delete("k2")
+            self.assertIsNone(b.get("k2"))
+            for _ in range(100):
+                if a.l1.get("k2") is None:
+                    break
+                time.sleep(0.01)
+            self.assertIsNone(a.get("k2"))
+            self.assertEqual([b"3", None], a.get_many(["k3", "missing"]))
+
+            # a read of L2 that overlaps a local write does not put the old value back in L1
+            get_many = a.l2.get_many
+            read = threading.Event()
+
+            def slow_get_many(keys):
+                values = get_many(keys)
+                read.set()
+                time.sleep(0.1)
+                return values
+
+            a.l1.delete("k4")
+            a.l2.get_many = slow_get_many
+            reader = threading.Thread(target=a.get, args=("k4",))
+            reader.start()
+            read.wait()
+            a.set("k4", "new")
+            reader.join()
+            a.l2.get_many = get_many
+            self.assertEqual(b"new", a.get("k4"))
+        finally:
+            for tier in tiers:
+                tier.close()
+
+    def test_rate_limiters(self):
+        from avdal.cache import ratelimit
+        from avdal.cache.memory import MemoryCache, ShardedMemoryCache
+
+        backends = [MemoryCache(autocleanup=False), ShardedMemoryCache()]
+        if fakeredis is not None:
+            from avdal.cache.redis import RedisCache
+
+            redis_cache = RedisCache("localhost", 6379, None)
+            redis_cache.client = fakeredis.FakeRedis()
+            backends.append(redis_cache)
+
+        for cache in backends:
+            limiters = [
+                ratelimit.FixedWindow(cache, limit=5, window=3600),
+                ratelimit.SlidingLog(cache, limit=5, window=3600),
+                ratelimit.TokenBucket(cache, rate=0.001, capacity=5),
+            ]
+            for limiter in limiters:
+                name = f"{type(cache).__name__} {type(limiter).__name__}"
+                decisions = [limiter.hit("user") for _ in range(6)]
+                self.assertEqual([True] * 5 + [False], [d.allowed for d in decisions], msg=name)
+                self.assertEqual([4, 3, 2, 1, 0], [d.remaining for d in decisions[:5]], msg=name)
+                self.assertGreater(decisions[-1].retry_after, 0, msg=name)
+                self.assertTrue(limiter.hit("other", cost=5).allowed, msg=name)
+                self.assertFalse(limiter.hit("other").allowed, msg=name)
+
+            window = ratelimit.FixedWindow(cache, limit=1, window=0.05)
+            self.assertTrue(window.hit("w").allowed)
+            self.assertFalse(window.hit("w").allowed)
+            time.sleep(0.06)
+            self.assertTrue(window.hit("w").allowed)
+
+        for cache in backends[:2]:
+            bucket = ratelimit.TokenBucket(cache, rate=100, capacity=2)
+            self.assertEqual([True, True, False], [bucket.hit("b").allowed for _ in range(3)])
+            time.sleep(0.02)
+            self.assertTrue(bucket.hit("b").allowed)
+
+        if fakeredis is not None:
+            key = "ratelimit:fw:user:" + str(int(time.time() // 3600))
+            self.assertGreater(redis_cache.client.pttl(key), 0)
+
+        self.assertRaises(TypeError, ratelimit.FixedWindow, object(), 1, 1)
+
+    def test_benchmark_rate_limiters(self):
+        from avdal.cache import ratelimit
+        from avdal.cache.memory import ShardedMemoryCache
+
+        backends = [ShardedMemoryCache()]
+        if fakeredis is not None:
+            from avdal.cache.redis import RedisCache
+
+            redis_cache = RedisCache("localhost", 6379, None)
+            redis_cache.client = fakeredis.FakeRedis()
+            backends.append(redis_cache)
+
+        for cache in backends:
+            for limiter in [ratelimit.FixedWindow(cache, 100, 1), ratelimit.SlidingLog(cache, 100, 1),
+                            ratelimit.TokenBucket(cache, 100, 100)]:
+                n = 20000 if cache is backends[0] else 500
+                start = time.perf_counter()
+                for i in range(n):
+                    limiter.hit(i % 50)
+                rate = n / (time.perf_counter() - start)
+                print(f"ratelimit: {type(cache).__name__} {type(limiter).__name__} {rate:.0f} decisions/s")
+
+    def test_disk_cache(self):
+        import mmap
+        import multiprocessing
+        from avdal.cache.disk import DiskCache
+
+        with tempfile.TemporaryDirectory() as tmp:
+            c = DiskCache(tmp, min_compact_size=10000)
+            c.set("a", b"bytes")
+            c.set("s", "text")
+            c.set("d", {"x": [1, 2]})
+            c.set("gone", "x", ttl=-1)
+            self.assertEqual([b"bytes", "text", {"x": [1, 2]}, None, None], c.get_many(["a", "s", "d", "gone", "nope"]))
+            self.assertEqual(3, c.incr("n", 3, ttl=60))
+            self.assertEqual(5, c.incr("n", 2))
+
+            view = c.view("a")
+            self.assertIsInstance(view.obj, mmap.mmap)
+            self.assertEqual(b"bytes", view.tobytes())
+            c.set("a", b"other")
+            self.assertEqual(b"bytes", view.tobytes())
+
+            c.delete("s")
+            c.set_many({"t1": "1", "t2": "2"}, ttl={"t1": -1})
+            self.assertEqual([None, None, "2"], c.get_many(["s", "t1", "t2"]))
+
+            reopened = DiskCache(tmp)
+            self.assertEqual([b"other", 5, "2"], reopened.get_many(["a", "n", "t2"]))
+
+            for i in range(500):
+                c.set(f"k{i % 10}", "x" * 100)
+            size = os.path.getsize(os.path.join(tmp, "data"))
+            self.assertLess(size, 10000 * 1.5)
+            reopened.set("after", "compaction")
+            self.assertEqual(["x" * 100, "compaction", b"other"], c.get_many(["k9", "after", "a"]))
+
+            c.compact()
+            self.assertEqual(["x" * 100, 5, "2"], reopened.get_many(["k1", "n", "t2"]))
+            self.assertEqual(b"bytes", view.tobytes())
+
+            with multiprocessing.get_context("fork").Pool(4) as pool:
+                pool.starmap(_disk_cache_incr, [(tmp, 200)] * 4)
+            self.assertEqual(800, c.get("counter"))
+
+            c.close()
+            reopened.close()
+
+    def test_instrumented_cache(self):
+        from avdal.cache.instrument import Instrumented, SpaceSaving
+        from avdal.cache.memory import MemoryCache, ShardedMemoryCache
+
+        sketch = SpaceSaving(3)
+        for key in "abacadaeafagabab":
+            sketch.add(key)
+        self.assertEqual([("a", 8, 0)], sketch.top(1))
+        self.assertEqual("b", sketch.top()[1][0])
+
+        c = Instrumented(ShardedMemoryCache(max_entries=16, shards=1), name="users", sample_rate=1.0, top_k=3)
+        c.set_many({f"k{i}": i for i in range(20)})
+        for i in range(100):
+            c.get("k19" if i % 2 else f"k{i % 30}")
+        c.incr("n")
+
+        s = c.snapshot()
+        self.assertEqual(100, s["hits"] + s["misses"])
+        self.assertEqual(20, s["sets"])
+        self.assertEqual(5, s["evictions"])
+        self.assertEqual("k19", s["hot_keys"][0]["key"])
+        self.assertEqual(100, s["latency"]["get"]["count"])
+        self.assertEqual(1, s["latency"]["incr"]["count"])
+
+        text = c.prometheus()
+        self.assertIn('avdal_cache_hits_total{cache="users"} %d' % s["hits"], text)
+        self.assertIn('avdal_cache_operation_seconds_bucket{cache="users",op="get",le="+Inf"} 100', text)
+        self.assertIn('avdal_cache_hot_key_reads{cache="users",key="k19"}', text)
+
+        raw = MemoryCache(autocleanup=False)
+        raw.set("k", 1)
+        wrapped = Instrumented(raw)
+        for enabled in [False, True]:
+            wrapped.enabled = enabled
+            self.assertEqual([1] * 10, [wrapped.get("k") for _ in range(10)])
+        self.assertEqual(10, wrapped.snapshot()["hits"])
+
+
+class TestTokenProvider(unittest.TestCase):
+    def test_token_provider(self):
+        from avdal.auth.token import TokenProvider, TokenError
+
+        issued = []
+
+        def token(request):
+            form = request["form"]
+            if form.get("client_secret") != "secret":
+                return 401, {"error": "unauthorized_client"}
+            time.sleep(0.05)
+            issued.append(form["grant_type"])
+            return 200, {"access_token": f"t{len(issued)}", "expires_in": 1, "refresh_token": f"r{len(issued)}",
+                         "refresh_expires_in": 60}
+
+        with _StubServer({("POST", "/token"): token}) as server:
+            tokens = TokenProvider(server.url + "/token", "client", "secret", margin=0.5)
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(tokens.access_token())) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(["t1"] * 8, results)
+            self.assertEqual(["client_credentials"], issued)
+
+            # refreshed in the background at half the 1s lifetime, with the refresh token
+            time.sleep(0.7)
+            self.assertEqual(["client_credentials", "refresh_token"], issued[:2])
+            refreshes = [r["form"] for r in server.requests if r["form"]["grant_type"] == "refresh_token"]
+            self.assertEqual("r1", refreshes[0]["refresh_token"])
+            # served from memory, without a request of its own
+            requests = len(server.requests)
+            self.assertEqual("t2", tokens.access_token())
+            self.assertEqual(requests, len(server.requests))
+            tokens.close()
+
+            lazy = TokenProvider(server.url + "/token", "client", "secret", margin=0.5, refresh_ahead=False)
+            self.assertEqual(lazy.access_token(), lazy.access_token())
+            self.assertIsNone(lazy.refresher)
+
+            bad = TokenProvider(server.url + "/token", "client", "wrong")
+            with self.assertRaises(TokenError) as e:
+                bad.access_token()
+            self.assertEqual({"error": "unauthorized_client"}, e.exception.args[0])
+
+            self.assertIs(TokenProvider.shared(server.url, "a", "b"), TokenProvider.shared(server.url, "a", "b"))
+
+    def test_iam_uses_shared_tokens(self):
+        from avdal.env import Environment
+        from avdal.clients.iam import IAM
+        from avdal.clients.configs import Configs
+
+        calls = []
+
+        def token(request):
+            calls.append(request)
+            return 200, {"access_token": "abc", "expires_in": 300}
+
+        def role(request):
+            return 200, {"token": request["headers"]["Authorization"]}
+
+        with _StubServer({("POST", "/auth/realms/r1/protocol/openid-connect/token"): token,
+                          ("GET", "/api/v1/roles/web/configs"): role}) as server:
+            host = server.url.split("//")[1]
+            env = Environment({"IAM_REALM": "r1", "IAM_HOST": host, "IAM_PROTOCOL": "http", "IAM_CLIENT_ID": "c",
+                               "IAM_CLIENT_SECRET": "s", "CONFIGS_HOST": host, "CONFIGS_PROTOCOL": "http"})
+
+            self.assertEqual("abc", IAM(env).access_token())
+            configs = [Configs(env) for _ in range(5)]
+            self.assertEqual({"token": "Bearer abc"}, configs[0].load_role("web"))
+            self.assertEqual(1, len(calls))
+            self.assertIs(IAM(env).tokens, IAM(env, session=None).tokens)
+
+            # an injected session is used, not dropped in favor of the first caller's
+            from avdal.auth.keycloak import Keycloak
+            from avdal.http.transport import new_session
+
+            session = new_session()
+            self.assertIs(session, IAM(env, session=session).tokens.session)
+            self.assertIs(session, Configs(env, session=session).iam.tokens.session)
+            self.assertIsNot(IAM(env).tokens, IAM(env, session=session).tokens)
+            keycloak = Keycloak(host, "r1", "c", "s", session=session)
+            self.assertIs(session, keycloak.tokens.session)
+            self.assertEqual("abc", Configs(env, session=session).iam.access_token())
+            self.assertEqual(2, len(calls))
+
+            IAM(env).tokens.close()
+            IAM(env, session=session).tokens.close()
+
+
+class TestTransport(unittest.TestCase):
+    def test_session(self):
+        import requests
+        from avdal.http.transport import new_session, session_for, JitteredRetry
+
+        failures = [503, 503]
+
+        def flaky(request):
+            return (failures.pop(), {"error": "busy"}) if failures else (200, {"ok": True})
+
+        def slow(request):
+            time.sleep(0.5)
+            return 200, {}
+
+        routes = {
+            ("GET", "/flaky"): flaky,
+            ("POST", "/flaky"): lambda request: (503, {"error": "busy"}),
+            ("GET", "/slow"): slow,
+            ("GET", "/json"): lambda request: (200, {"a": 1}),
+        }
+
+        with _StubServer(routes) as server:
+            s = new_session(backoff_factor=0.01)
+
+            # idempotent calls are retried, others are not
+            self.assertEqual(s.get(server.url + "/flaky").json(), {"ok": True})
+            self.assertEqual(len(server.requests), 3)
+            self.assertEqual(s.post(server.url + "/flaky").status_code, 503)
+            self.assertEqual(len(server.requests), 4)
+
+            # one kept-alive connection, asking for gzip
+            for _ in range(3):
+                s.get(server.url + "/json")
+            self.assertEqual(len({r["client"] for r in server.requests[-3:]}), 1)
+            self.assertIn("gzip", server.requests[-1]["headers"]["Accept-Encoding"])
+
+            start = time.time()
+            with self.assertRaises(requests.RequestException):
+                new_session(timeout=(1, 0.1), retries=0).get(server.url + "/slow")
+            self.assertLess(time.time() - start, 0.4)
+
+            self.assertIs(session_for(server.url + "/a"), session_for(server.url + "/b?c=d"))
+            self.assertIsNot(session_for(server.url), session_for("http://localhost:1"))
+
+            from avdal.clients.globals import Globals
+            from avdal.clients import globals as module
+
+            url, module.PERMA_URL = module.PERMA_URL, server.url + "/json"
+            try:
+                routes[("GET", "/json")] = lambda request: (200, {"vars": {"x": 1}})
+                self.assertEqual(Globals(session=s).get_var("x"), 1)
+            finally:
+                module.PERMA_URL = url
+
+        retry = JitteredRetry(total=5, backoff_factor=1)
+        for _ in range(3):
+            retry = retry.increment("GET", "/", error=ConnectionError())
+        for _ in range(100):
+            self.assertTrue(0 <= retry.get_backoff_time() <= 4)
+
+    @unittest.skipIf(httpx is None, "httpx is not installed")
+    def test_async_clients(self):
+        import asyncio
+        from avdal.env import Environment
+        from avdal.clients.configs import Configs
+        from avdal.clients.aio import AsyncIAM, AsyncConfigs, AsyncGlobals
+        from avdal.http.aio import new_client
+
+        tokens = []
+        active = [0, 0]
+        lock = threading.Lock()
+        failures = [503]
+
+        def token(request):
+            tokens.append(request)
+            return 200, {"access_token": "abc", "expires_in": 300}
+
+        def role(request):
+            with lock:
+                active[0] += 1
+                active[1] = max(active)
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return 200, {"role": request["path"].split("/")[4], "token": request["headers"]["Authorization"]}
+
+        names = [f"r{i}" for i in range(6)]
+        routes = {("GET", f"/api/v1/roles/{name}/configs"): role for name in names}
+        routes[("POST", "/auth/realms/r2/protocol/openid-connect/token")] = token
+        routes[("GET", "/globals.json")] = lambda request: ((failures.pop(), None) if failures
+                                                            else (200, {"vars": {"x": 1}}))
+
+        with _StubServer(routes) as server:
+            host = server.url.split("//")[1]
+            env = Environment({"IAM_REALM": "r2", "IAM_HOST": host, "IAM_PROTOCOL": "http", "IAM_CLIENT_ID": "c",
+                               "IAM_CLIENT_SECRET": "s", "CONFIGS_HOST": host, "CONFIGS_PROTOCOL": "http"})
+
+            async def main():
+                async with new_client(backoff_factor=0.01) as client:
+                    self.assertEqual("abc", await AsyncIAM(env, client).access_token())
+
+                    configs = AsyncConfigs(env, client)
+                    roles = await configs.load_roles(names + ["r0"], concurrency=2)
+                    self.assertEqual(names, list(roles))
+                    self.assertEqual({"role": "r3", "token": "Bearer abc"}, roles["r3"])
+                    self.assertEqual(2, active[1])
+
+                    # a 503 on the GET is retried
+                    g = AsyncGlobals(client, url=server.url + "/globals.json")
+                    self.assertEqual(1, await g.get_var("x"))
+                    self.assertIsNone(await g.get_var("y"))
+                    self.assertEqual(2, len([r for r in server.requests if r["path"] == "/globals.json"]))
+
+            asyncio.run(main())
+            self.assertEqual(1, len(tokens))
+
+            # a shared provider outlives its loop; callers racing for a new token in the next one still work
+            iam = AsyncIAM(env)
+
+            async def race():
+                iam.tokens.invalidate()
+                return await asyncio.gather(*[iam.access_token() for _ in range(5)])
+
+            for _ in range(2):
+                self.assertEqual(["abc"] * 5, asyncio.run(race()))
+            self.assertEqual(3, len(tokens))
+
+            # so do globals whose load failed in an earlier loop while other callers waited for it
+            g = AsyncGlobals(url=server.url + "/globals.json")
+
+            async def load_all():
+                async with new_client(retries=0) as client:
+                    g.client = client
+                    return await asyncio.gather(*[g.get_var("x") for _ in range(3)], return_exceptions=True)
+
+            failures.extend([503] * 3)
+            self.assertTrue(all(isinstance(r, Exception) for r in asyncio.run(load_all())))
+            self.assertEqual([1] * 3, asyncio.run(load_all()))
+
+            client = new_client()
+            self.assertIs(client, AsyncIAM(env, client).tokens.client)
+
+            active[1] = 0
+            roles = Configs(env).load_roles(names, concurrency=3)
+            self.assertEqual([{"role": name, "token": "Bearer abc"} for name in names], list(roles.values()))
+            self.assertEqual(3, active[1])
+
+    def test_response_cache(self):
+        from avdal.env import Environment
+        from avdal.clients.configs import Configs
+        from avdal.clients.globals import Globals
+        from avdal.http.cache import ResponseCache
+        from avdal.http.transport import new_session
+
+        state = {"version": 1, "status": 200}
+
+        def role(request):
+            etag = f'"v{state["version"]}"'
+            if state["status"] != 200:
+                return state["status"], {"error": "down"}
+            if request["headers"].get("If-None-Match") == etag:
+                return 304, None, {"ETag": etag}
+            return 200, {"version": state["version"]}, {"ETag": etag}
+
+        routes = {
+            ("POST", "/auth/realms/r3/protocol/openid-connect/token"):
+                lambda request: (200, {"access_token": "abc", "expires_in": 300}),
+            ("GET", "/api/v1/roles/web/configs"): role,
+        }
+
+        def role_requests():
+            return [r for r in server.requests if r["path"] == "/api/v1/roles/web/configs"]
+
+        def wait_for(condition):
+            for _ in range(200):
+                if condition():
+                    return
+                time.sleep(0.01)
+
+        with _StubServer(routes) as server, tempfile.TemporaryDirectory() as path:
+            host = server.url.split("//")[1]
+            env = Environment({"IAM_REALM": "r3", "IAM_HOST": host, "IAM_PROTOCOL": "http", "IAM_CLIENT_ID": "c",
+                               "IAM_CLIENT_SECRET": "s", "CONFIGS_HOST": host, "CONFIGS_PROTOCOL": "http"})
+
+            cache = ResponseCache(path, refresh_interval=0.1, session=new_session(backoff_factor=0.01))
+            configs = Configs(env, cache=cache)
+            self.assertEqual({"version": 1}, configs.load_role("web"))
+            self.assertEqual({"version": 1}, configs.load_role("web"))
+            self.assertEqual(1, len(role_requests()))
+
+            # revalidated in the background, with the token and the ETag
+            wait_for(lambda: len(role_requests()) >= 2)
+            self.assertEqual('"v1"', role_requests()[1]["headers"]["If-None-Match"])
+            self.assertEqual("Bearer abc", role_requests()[1]["headers"]["Authorization"])
+
+            state["version"] = 2
+            wait_for(lambda: configs.load_role("web") == {"version": 2})
+            self.assertEqual({"version": 2}, configs.load_role("web"))
+
+            # the last good copy outlives the server
+            state["status"] = 503
+            count = len(role_requests())
+            wait_for(lambda: len(role_requests()) > count + 1)
+            self.assertEqual({"version": 2}, configs.load_role("web"))
+            cache.close()
+
+            # a cold start reads the disk, with no requests at all
+            count = len(server.requests)
+            cache = ResponseCache(path, refresh_interval=60, background=False)
+            self.assertEqual({"version": 2}, Configs(env, cache=cache).load_role("web"))
+            self.assertEqual(count, len(server.requests))
+            cache.close()
+
+            routes[("GET", "/globals.json")] = lambda request: (200, {"vars": {"x": 1}}, {"ETag": '"g"'})
+            from avdal.clients import globals as module
+            url, module.PERMA_URL = module.PERMA_URL, server.url + "/globals.json"
+            try:
+                cache = ResponseCache(background=False, refresh_interval=0, session=new_session(retries=0))
+                self.assertEqual(1, Globals(cache=cache).get_var("x"))
+                self.assertEqual(1, Globals(cache=cache).get_var("x"))
+                self.assertEqual('"g"', server.requests[-1]["headers"]["If-None-Match"])
+            finally:
+                module.PERMA_URL = url
+
+    def test_lazy_clients(self):
+        import sys
+        import subprocess
+        from avdal.env import Environment
+        from avdal.clients import prefetch
+        from avdal.clients.configs import Configs
+        from avdal.clients.globals import Globals
+        from avdal.clients import globals as module
+
+        active = [0, 0]
+        lock = threading.Lock()
+
+        def slow(payload):
+            def route(request):
+                with lock:
+                    active[0] += 1
+                    active[1] = max(active)
+                time.sleep(0.2)
+                with lock:
+                    active[0] -= 1
+                return 200, payload
+            return route
+
+        routes = {
+            ("POST", "/auth/realms/r4/protocol/openid-connect/token"):
+                slow({"access_token": "abc", "expires_in": 300}),
+            ("GET", "/globals.json"): slow({"vars": {"x": 1}}),
+        }
+
+        with _StubServer(routes) as server:
+            host = server.url.split("//")[1]
+            env = Environment({"IAM_REALM": "r4", "IAM_HOST": host, "IAM_PROTOCOL": "http", "IAM_CLIENT_ID": "c",
+                               "IAM_CLIENT_SECRET": "s", "CONFIGS_HOST": host, "CONFIGS_PROTOCOL": "http"})
+            url, module.PERMA_URL = module.PERMA_URL, server.url + "/globals.json"
+            try:
+                g, configs = Globals(), Configs(env)
+                self.assertEqual([], server.requests)
+
+                # both loaded at once
+                prefetch(g, configs)
+                self.assertEqual(2, active[1])
+                self.assertEqual(2, len(server.requests))
+
+                self.assertEqual(1, g.get_var("x"))
+                self.assertEqual("abc", configs.token)
+                self.assertEqual(2, len(server.requests))
+            finally:
+                module.PERMA_URL = url
+
+        # the startup path of a CLI: imports and constructs, never reads; port 9 fails fast if it were called
+        script = ("from avdal.env import Environment\n"
+                  "from avdal.clients.configs import Configs\n"
+                  "from avdal.clients.globals import Globals\n"
+                  "env = {'IAM_HOST': '127.0.0.1:9', 'IAM_REALM': 'r', 'IAM_CLIENT_ID': 'c', 'IAM_CLIENT_SECRET': 's',"
+                  " 'CONFIGS_HOST': '127.0.0.1:9'}\n"
+                  "Configs(Environment(env)); Globals()\n")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+
+
+class TestSendgrid(unittest.TestCase):
+    def test_queued_emailer(self):
+        from avdal.clients.sendgrid import QueuedSendgridEmailer
+
+        accepted = []
+        state = {"failures": [503], "reject": True}
+
+        def send(request):
+            letter = json.loads(request["body"])
+            if letter["subject"] == "bad" and state["reject"]:
+                return 400, {"errors": [{"message": "invalid"}]}
+            if state["failures"]:
+                return state["failures"].pop(), {"errors": []}
+            accepted.append(letter)
+            return 202, None
+
+        def receivers(subject):
+            return sorted(to["email"] for letter in accepted if letter["subject"] == subject
+                          for p in letter["personalizations"] for to in p["to"])
+
+        with _StubServer({("POST", "/v3/mail/send"): send}) as server, tempfile.TemporaryDirectory() as tmp:
+            dead, spool = os.path.join(tmp, "dead"), os.path.join(tmp, "spool")
+            options = dict(deadletter_dir=dead, host=server.url, spool_dir=spool, backoff=0.01)
+
+            emailer = QueuedSendgridEmailer("key", workers=2, **options)
+            for i in range(100):
+                self.assertTrue(emailer.send_email("a@x.com", f"u{i:03}@x.com", "hi", "body"))
+            emailer.send_email("a@x.com", "v@x.com", "bad", "body")
+            emailer.close()
+
+            self.assertEqual([f"u{i:03}@x.com" for i in range(100)], receivers("hi"))
+            self.assertLess(len(accepted), 10)
+            self.assertEqual("Bearer key", server.requests[0]["headers"]["Authorization"])
+            # rejected requests are dead-lettered without retries
+            self.assertEqual(1, len([r for r in server.requests if json.loads(r["body"])["subject"] == "bad"]))
+            self.assertEqual(1, len(os.listdir(dead)))
+            self.assertEqual([], os.listdir(spool))
+
+            state["reject"] = False
+            self.assertEqual((1, 0), emailer.replay_deadletters())
+            self.assertEqual(["v@x.com"], receivers("bad"))
+            self.assertEqual([], os.listdir(dead))
+
+            # emails a process queued but never sent are sent by the next one
+            stopped = QueuedSendgridEmailer("key", workers=0, **options)
+            for i in range(3):
+                stopped.send_email("a@x.com", f"w{i}@x.com", "later", "body")
+            # (email, name) tuples, as Mail takes them
+            stopped.send_email(("a@x.com", "A"), ("t0@x.com", "T"), "named", "body")
+            stopped.send_email(("a@x.com", "A"), [("t1@x.com", "T"), "t2@x.com"], "named", "body")
+            self.assertEqual(5, len(os.listdir(spool)))
+            QueuedSendgridEmailer("key", workers=1, **options).close()
+            self.assertEqual(["w0@x.com", "w1@x.com", "w2@x.com"], receivers("later"))
+            self.assertEqual(["t0@x.com", "t1@x.com", "t2@x.com"], receivers("named"))
+            named = [letter for letter in accepted if letter["subject"] == "named"]
+            self.assertEqual([{"email": "a@x.com", "name": "A"}], [letter["from"] for letter in named])
+            self.assertIn([{"email": "t1@x.com", "name": "T"}, {"email": "t2@x.com"}],
+                          [p["to"] for p in named[0]["personalizations"]])
+            self.assertEqual([], os.listdir(spool))
+
+            # a full queue turns emails away
+            stopped = QueuedSendgridEmailer("key", workers=0, max_queue=1, host=server.url)
+            self.assertTrue(stopped.send_email("a@x.com", "x@x.com", "s", "b", timeout=0))
+            self.assertFalse(stopped.send_email("a@x.com", "x@x.com", "s", "b", timeout=0))
+
+            limited = QueuedSendgridEmailer("key", host=server.url, rate=5, batch_size=1, workers=2)
+            start = time.perf_counter()
+            for i in range(7):
+                limited.send_email("a@x.com", "x@x.com", f"s{i}", "b")
+            limited.close()
+            self.assertGreater(time.perf_counter() - start, 0.3)
+
+
+class _StubServer:
+    """
+    A local HTTP server for client tests. `routes` maps (method, path) to a
+    function of the parsed request that returns (status, json body[, headers]).
+    """
+
+    def __init__(self, routes):
+        import http.server
+        import urllib.parse
+
+        server = self
+        self.routes = routes
+        self.requests = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def handle_request(self, method):
+                url = urllib.parse.urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode() if length else ""
+                request = {
+                    "method": method,
+                    "path": url.path,
+                    "query": dict(urllib.parse.parse_qsl(url.query)),
+                    "headers": dict(self.headers),
+                    "form": dict(urllib.parse.parse_qsl(body)),
+                    "body": body,
+                    "client": self.client_address,
+                }
+                server.requests.append(request)
+
+                route = server.routes.get((method, url.path))
+                result = route(request) if route else (404, {"error": "not found"})
+                status, payload = result[:2]
+                headers = result[2] if len(result) > 2 else {}
+                data = json.dumps(payload).encode() if payload is not None else b""
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self.handle_request("GET")
+
+            def do_POST(self):
+                self.handle_request("POST")
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        # clients that time out hang up before the response is written
+        self.httpd.handle_error = lambda request, client_address: None
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _disk_cache_incr(path, n):
+    from avdal.cache.disk import DiskCache
+
+    c = DiskCache(path, min_compact_size=2000)
+    for _ in range(n):
+        c.incr("counter")
+    c.close()